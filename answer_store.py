@@ -0,0 +1,121 @@
+"""
+Pre-generated answers for the AI Educational Tutor application.
+
+pregenerate.py answers every subject's example questions ahead of time and
+writes the answers here. The app looks questions up before calling the model,
+so clicking an example costs neither model latency nor quota. Answers are keyed
+by model, subject, subject context, prompt template and normalized question, so
+a changed model, subject description or prompt is simply a miss until the next
+run. When collect_custom_subjects is on, custom subjects created in the app are
+recorded here too (up to a cap), so scheduled runs also cover their generated
+example questions.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+from cache import hash_text, normalize_question
+from config import PREGENERATED_CONFIG, SYSTEM_PROMPT_TEMPLATE
+
+# Bumped when the key or table layout changes; older stores are cleared on open
+SCHEMA_VERSION = 1
+
+def pregenerated_key(subject: str, subject_context: str, question: str, model_name: str) -> str:
+    """Key of a stored answer; changes whenever the model or the prompt that produced it would change"""
+    return hash_text("\x1f".join([
+        model_name, hash_text(SYSTEM_PROMPT_TEMPLATE), subject, subject_context, normalize_question(question)
+    ]))
+
+class AnswerStore:
+    """SQLite store of pre-generated answers and of custom subjects to pre-generate for"""
+
+    def __init__(self, path: str, max_custom_subjects: int = 200):
+        self.path = path
+        self.max_custom_subjects = max_custom_subjects
+        self._local = threading.local()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Keys from older versions can no longer be looked up; regenerate rather than migrate
+            conn.executescript("DROP TABLE IF EXISTS answers; DROP TABLE IF EXISTS custom_subjects;")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "key TEXT PRIMARY KEY, subject TEXT NOT NULL, question TEXT NOT NULL, "
+            "answer TEXT NOT NULL, model TEXT, created REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS custom_subjects ("
+            "name TEXT NOT NULL, description TEXT NOT NULL, context TEXT NOT NULL, "
+            "icon TEXT NOT NULL, created REAL NOT NULL, PRIMARY KEY (name, context));"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection (Streamlit runs each session's script on its own thread)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Stored answer for a key, if any"""
+        row = self._connection().execute("SELECT answer FROM answers WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def has(self, key: str) -> bool:
+        """Check whether an answer is stored for a key"""
+        return self._connection().execute("SELECT 1 FROM answers WHERE key = ?", (key,)).fetchone() is not None
+
+    def put(self, key: str, subject: str, question: str, answer: str, model: Optional[str] = None) -> None:
+        """Store (or replace) the answer for a key"""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers (key, subject, question, answer, model, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, subject, question, answer, model, time.time())
+            )
+
+    def count(self) -> int:
+        """Number of stored answers"""
+        return self._connection().execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def register_custom_subject(self, name: str, info: Dict) -> bool:
+        """Remember a custom subject for the next pre-generation run; False if already known or the store is full"""
+        # Answers are keyed by name and context, so each distinct pair is its own entry
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO custom_subjects (name, description, context, icon, created) "
+                "SELECT ?, ?, ?, ?, ? WHERE (SELECT COUNT(*) FROM custom_subjects) < ?",
+                (name, info["description"], info["context"], info["icon"], time.time(), self.max_custom_subjects)
+            )
+            return cursor.rowcount > 0
+
+    def iter_custom_subjects(self) -> Iterator[Dict]:
+        """Yield every recorded custom subject as {name, description, context, icon}"""
+        rows = self._connection().execute(
+            "SELECT name, description, context, icon FROM custom_subjects ORDER BY created"
+        ).fetchall()
+        for name, description, context, icon in rows:
+            yield {"name": name, "description": description, "context": context, "icon": icon}
+
+_answer_store = None
+_answer_store_lock = threading.Lock()
+
+def get_answer_store() -> Optional[AnswerStore]:
+    """Return the process-wide answer store, or None when pre-generated answers are disabled"""
+    global _answer_store
+    if not PREGENERATED_CONFIG.get("enabled", True):
+        return None
+    with _answer_store_lock:
+        if _answer_store is None:
+            _answer_store = AnswerStore(
+                PREGENERATED_CONFIG["path"],
+                max_custom_subjects=PREGENERATED_CONFIG.get("max_custom_subjects", 200)
+            )
+        return _answer_store
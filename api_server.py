@@ -0,0 +1,472 @@
+"""
+HTTP JSON API for the AI Educational Tutor application.
+
+An aiohttp service for programmatic clients such as an LMS integration. Each
+client creates a session and asks questions in it; answers come back as JSON
+or, when requested, as server-sent events while they are generated. Sessions
+keep their own history and reference documents, and the exchanges are stored
+in the same session store as the Streamlit app. Connections are handled on
+the event loop, and only questions being answered hold a worker thread, so
+one process serves hundreds of concurrent clients with a bounded number of
+model calls.
+
+    python api_server.py --port 8080
+
+Routes:
+    GET    /health
+    GET    /metrics
+    GET    /subjects
+    POST   /sessions
+    GET    /sessions/{session_id}?limit=50
+    DELETE /sessions/{session_id}
+    POST   /sessions/{session_id}/questions      {"question", "subject", "stream"}
+    GET    /sessions/{session_id}/references
+    POST   /sessions/{session_id}/references     multipart file upload or {"name", "text"}
+    DELETE /sessions/{session_id}/references/{doc_id}
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import hmac
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from aiohttp import web
+
+from config import API_SERVER_CONFIG, SESSION_STORE_CONFIG
+from dispatcher import classify_error
+from documents import PDF_AVAILABLE, extract_text_cached, hash_file
+from metrics import get_metrics
+from reference_store import ReferenceStore
+from session_store import get_session_store
+from utils import validate_question
+
+# HTTP status for each error class of a failed model call
+ERROR_STATUS = {"quota": 429, "timeout": 504, "unavailable": 503, "other": 502}
+
+FILE_TYPES = {".txt": "text/plain", ".pdf": "application/pdf"}
+
+class UploadedFile(io.BytesIO):
+    """In-memory upload with the name attribute the extractors expect"""
+
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+
+def json_error(error_class, message: str, headers: Optional[Dict[str, str]] = None) -> web.HTTPException:
+    """An aiohttp HTTP exception with a JSON error body"""
+    return error_class(text=json.dumps({"error": message}), content_type="application/json", headers=headers)
+
+def sse_event(event: str, data: Dict) -> bytes:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+def upload_file_type(filename: str, content_type: Optional[str]) -> Optional[str]:
+    """MIME type the extractors understand, from the part's type or the file extension"""
+    if content_type in FILE_TYPES.values():
+        return content_type
+    return FILE_TYPES.get(os.path.splitext(filename or "")[1].lower())
+
+class APISession:
+    """History, reference documents and tutor handle of one API client"""
+
+    def __init__(self, session_id: str, tutor, chat_history: Optional[List[Dict]] = None):
+        self.id = session_id
+        self.tutor = tutor
+        self.chat_history = chat_history or []
+        self.references = ReferenceStore()
+        self.files = []
+        # Questions in one session are answered in order so each sees the previous answer
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+class SessionRegistry:
+    """In-memory sessions, least recently used first, reloaded from the session store on demand"""
+
+    def __init__(self, tutor_factory, max_sessions: int, idle_seconds: float):
+        self.tutor_factory = tutor_factory
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._sessions = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self) -> None:
+        """Drop idle sessions and the least recently used ones beyond the limit"""
+        cutoff = time.monotonic() - self.idle_seconds
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) <= self.max_sessions and oldest.last_used >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+
+    def _add(self, session: APISession) -> APISession:
+        self._sessions[session.id] = session
+        self._evict()
+        return session
+
+    def create(self) -> APISession:
+        """Start a new session, persisted when the session store is enabled"""
+        store = get_session_store()
+        session_id = None
+        if store is not None:
+            try:
+                session_id = store.create_session()
+            except sqlite3.Error:
+                pass
+        return self._add(APISession(session_id or uuid.uuid4().hex, self.tutor_factory()))
+
+    def get(self, session_id: str) -> Optional[APISession]:
+        """Return a live session, reloading its latest exchanges from the store if it was dropped"""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return session
+        store = get_session_store()
+        if store is None:
+            return None
+        try:
+            if not store.has_session(session_id):
+                return None
+            exchanges, _ = store.load_page(session_id, limit=SESSION_STORE_CONFIG["initial_load"])
+        except sqlite3.Error:
+            return None
+        return self._add(APISession(session_id, self.tutor_factory(), exchanges))
+
+class TutorAPI:
+    """Route handlers plus the concurrency limits shared by all clients"""
+
+    def __init__(self, tutor_factory, subjects_provider, config: Dict = API_SERVER_CONFIG):
+        self.subjects_provider = subjects_provider
+        self.max_queued = config["max_queued_requests"]
+        self.sessions = SessionRegistry(tutor_factory, config["max_sessions"], config["session_idle_seconds"])
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=config["max_concurrent_requests"], thread_name_prefix="api"
+        )
+        self._slots = asyncio.Semaphore(config["max_concurrent_requests"])
+        self.in_flight = 0
+        self.queued = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait for one of the bounded request slots, refusing new work when the queue is full"""
+        if self.queued >= self.max_queued:
+            raise json_error(web.HTTPServiceUnavailable, "Server is busy, retry shortly", {"Retry-After": "1"})
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def run_blocking(self, fn, *args):
+        """Run a blocking call (model request, extraction, indexing) on the worker pool"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(fn, *args))
+
+    def session_or_404(self, request: web.Request) -> APISession:
+        session = self.sessions.get(request.match_info["session_id"])
+        if session is None:
+            raise json_error(web.HTTPNotFound, "Unknown session")
+        return session
+
+    @staticmethod
+    async def json_body(request: web.Request) -> Dict:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise json_error(web.HTTPBadRequest, "Request body must be JSON")
+        if not isinstance(body, dict):
+            raise json_error(web.HTTPBadRequest, "Request body must be a JSON object")
+        return body
+
+    def record_exchange(self, session: APISession, question: str, subject: str, answer: str) -> Dict:
+        """Append an exchange to the session history and the session store"""
+        exchange = {
+            "id": uuid.uuid4().hex,
+            "question": question,
+            "answer": answer,
+            "subject": subject,
+            "timestamp": time.time()
+        }
+        session.chat_history.append(exchange)
+        store = get_session_store()
+        if store is not None:
+            try:
+                store.append(session.id, exchange)
+            except sqlite3.Error:
+                # Persistence is best-effort; the session continues in memory
+                pass
+        return exchange
+
+    # --- Service ---------------------------------------------------------------
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "status": "ok",
+            "sessions": len(self.sessions),
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+        })
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=get_metrics().render_prometheus(), content_type="text/plain")
+
+    async def subjects(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            name: {
+                "description": info.get("description", ""),
+                "icon": info.get("icon", ""),
+                "example_questions": info.get("example_questions", []),
+            }
+            for name, info in self.subjects_provider().items()
+        })
+
+    # --- Sessions ----------------------------------------------------------------
+
+    async def create_session(self, request: web.Request) -> web.Response:
+        session = self.sessions.create()
+        return web.json_response({"session_id": session.id}, status=201)
+
+    async def get_session(self, request: web.Request) -> web.Response:
+        session = self.session_or_404(request)
+        try:
+            limit = max(0, int(request.query.get("limit", 50)))
+        except ValueError:
+            raise json_error(web.HTTPBadRequest, "limit must be an integer")
+        return web.json_response({
+            "session_id": session.id,
+            "total": len(session.chat_history),
+            "exchanges": session.chat_history[-limit:] if limit else [],
+            "references": session.files,
+        })
+
+    async def clear_session(self, request: web.Request) -> web.Response:
+        session = self.session_or_404(request)
+        async with session.lock:
+            session.chat_history = []
+            if session.tutor.memory:
+                session.tutor.memory.reset()
+            store = get_session_store()
+            if store is not None:
+                try:
+                    store.clear_session(session.id)
+                except sqlite3.Error:
+                    pass
+        return web.Response(status=204)
+
+    # --- Questions ---------------------------------------------------------------
+
+    async def ask(self, request: web.Request) -> web.StreamResponse:
+        session = self.session_or_404(request)
+        body = await self.json_body(request)
+        question = str(body.get("question") or "").strip()
+        subject = str(body.get("subject") or "")
+        is_valid, message = validate_question(question)
+        if not is_valid:
+            raise json_error(web.HTTPBadRequest, message)
+        if subject not in self.subjects_provider():
+            raise json_error(web.HTTPBadRequest, f"Unknown subject: {subject or '(none)'}")
+        stream = bool(body.get("stream")) or "text/event-stream" in request.headers.get("Accept", "")
+
+        async with session.lock:
+            async with self.slot():
+                if stream:
+                    return await self.answer_stream(request, session, question, subject)
+                try:
+                    answer, source = await self.run_blocking(
+                        session.tutor.answer, question, subject, session.chat_history, session.references
+                    )
+                except Exception as e:
+                    error_class = classify_error(e)
+                    return web.json_response(
+                        {"error": session.tutor.format_error(e), "error_class": error_class},
+                        status=ERROR_STATUS[error_class]
+                    )
+                exchange = self.record_exchange(session, question, subject, answer)
+                return web.json_response({"exchange": exchange, "source": source})
+
+    async def answer_stream(self, request: web.Request, session: APISession,
+                            question: str, subject: str) -> web.StreamResponse:
+        """Send the answer as 'chunk' events, then a 'done' event with the stored exchange"""
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+        await response.prepare(request)
+
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        disconnected = threading.Event()
+
+        def produce() -> None:
+            """Iterate the blocking generator on a worker thread and hand chunks to the event loop"""
+            try:
+                for text in session.tutor.answer_stream(question, subject, session.chat_history, session.references):
+                    if disconnected.is_set():
+                        return
+                    loop.call_soon_threadsafe(events.put_nowait, ("chunk", text))
+                loop.call_soon_threadsafe(events.put_nowait, ("end", None))
+            except Exception as e:
+                loop.call_soon_threadsafe(events.put_nowait, ("error", e))
+
+        producer = loop.run_in_executor(self.executor, produce)
+        parts = []
+        try:
+            while True:
+                kind, value = await events.get()
+                if kind == "chunk":
+                    parts.append(value)
+                    await response.write(sse_event("chunk", {"text": value}))
+                elif kind == "end":
+                    exchange = self.record_exchange(session, question, subject, "".join(parts))
+                    await response.write(sse_event("done", {"exchange": exchange}))
+                    break
+                else:
+                    error_class = classify_error(value)
+                    await response.write(sse_event("error", {
+                        "error": session.tutor.format_error(value), "error_class": error_class
+                    }))
+                    break
+            await response.write_eof()
+        except (ConnectionResetError, asyncio.CancelledError):
+            # The client went away; stop reading the model stream and keep the slot until the thread is done
+            disconnected.set()
+            await asyncio.shield(producer)
+            raise
+        return response
+
+    # --- Reference documents -----------------------------------------------------
+
+    async def list_references(self, request: web.Request) -> web.Response:
+        session = self.session_or_404(request)
+        return web.json_response({"documents": session.files})
+
+    async def add_references(self, request: web.Request) -> web.Response:
+        session = self.session_or_404(request)
+        documents = []
+        if request.content_type.startswith("multipart/"):
+            reader = await request.multipart()
+            while True:
+                part = await reader.next()
+                if part is None:
+                    break
+                if not part.filename:
+                    continue
+                file_type = upload_file_type(part.filename, part.headers.get("Content-Type"))
+                if file_type is None or (file_type == "application/pdf" and not PDF_AVAILABLE):
+                    raise json_error(web.HTTPUnsupportedMediaType, f"Unsupported file type: {part.filename}")
+                documents.append((part.filename, file_type, await part.read()))
+        else:
+            body = await self.json_body(request)
+            if not body.get("name") or not isinstance(body.get("text"), str):
+                raise json_error(web.HTTPBadRequest, "Send a multipart file upload or {\"name\", \"text\"}")
+            documents.append((str(body["name"]), None, body["text"]))
+        if not documents:
+            raise json_error(web.HTTPBadRequest, "No files in the upload")
+
+        added = []
+        async with self.slot():
+            for name, file_type, data in documents:
+                if file_type is None:
+                    content, content_hash, size = data, None, len(data.encode("utf-8"))
+                else:
+                    upload = UploadedFile(data, name)
+                    content_hash = hash_file(upload)
+                    content = await self.run_blocking(extract_text_cached, upload, file_type, content_hash)
+                    size = len(data)
+                # Indexing chunks the text (and may embed it), so it also runs off the event loop
+                doc_id = await self.run_blocking(session.references.add, name, content, content_hash)
+                file_info = {"id": doc_id, "name": name, "size": size, "hash": content_hash}
+                session.files.append(file_info)
+                added.append(file_info)
+        return web.json_response({"documents": added}, status=201)
+
+    async def remove_reference(self, request: web.Request) -> web.Response:
+        session = self.session_or_404(request)
+        doc_id = request.match_info["doc_id"]
+        if not any(file_info["id"] == doc_id for file_info in session.files):
+            raise json_error(web.HTTPNotFound, "Unknown document")
+        session.files = [file_info for file_info in session.files if file_info["id"] != doc_id]
+        session.references.remove(doc_id)
+        return web.Response(status=204)
+
+@web.middleware
+async def require_token(request: web.Request, handler):
+    """Check the bearer token on every route except /health when one is configured"""
+    token = request.app["token"]
+    if token and request.path != "/health":
+        supplied = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(supplied.encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+            raise json_error(web.HTTPUnauthorized, "Missing or invalid bearer token")
+    return await handler(request)
+
+def create_app(config: Dict = API_SERVER_CONFIG, tutor_factory=None, subjects_provider=None) -> web.Application:
+    """Build the aiohttp application"""
+    if tutor_factory is None or subjects_provider is None:
+        from app import EducationalTutor, get_all_subjects
+        tutor_factory = tutor_factory or EducationalTutor
+        subjects_provider = subjects_provider or get_all_subjects
+
+    api = TutorAPI(tutor_factory, subjects_provider, config)
+    application = web.Application(middlewares=[require_token], client_max_size=config["max_upload_bytes"])
+    application["token"] = config.get("token")
+    application["api"] = api
+
+    metrics = get_metrics()
+    metrics.register_gauge("tutor_api_in_flight", "API questions being answered", lambda: api.in_flight)
+    metrics.register_gauge("tutor_api_queued", "API questions waiting for a slot", lambda: api.queued)
+
+    application.router.add_get("/health", api.health)
+    application.router.add_get("/metrics", api.metrics)
+    application.router.add_get("/subjects", api.subjects)
+    application.router.add_post("/sessions", api.create_session)
+    application.router.add_get("/sessions/{session_id}", api.get_session)
+    application.router.add_delete("/sessions/{session_id}", api.clear_session)
+    application.router.add_post("/sessions/{session_id}/questions", api.ask)
+    application.router.add_get("/sessions/{session_id}/references", api.list_references)
+    application.router.add_post("/sessions/{session_id}/references", api.add_references)
+    application.router.add_delete("/sessions/{session_id}/references/{doc_id}", api.remove_reference)
+
+    async def shutdown_executor(application: web.Application) -> None:
+        api.executor.shutdown(wait=False, cancel_futures=True)
+
+    application.on_cleanup.append(shutdown_executor)
+    return application
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Serve the API from the command line"""
+    parser = argparse.ArgumentParser(description="Serve the tutor as an HTTP JSON/SSE API")
+    parser.add_argument("--host", default=API_SERVER_CONFIG["host"])
+    parser.add_argument("--port", type=int, default=API_SERVER_CONFIG["port"])
+    args = parser.parse_args(argv)
+
+    from model_client import get_api_key, get_model_client
+    if not get_api_key():
+        print("GOOGLE_API_KEY is not set (see .env.sample)", file=sys.stderr)
+        return 1
+    # Connect to the model while the server starts instead of on the first question
+    get_model_client().start_warm_up()
+    web.run_app(create_app(), host=args.host, port=args.port)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
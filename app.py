@@ -1,136 +1,384 @@
 import streamlit as st
-import google.generativeai as genai
-from dotenv import load_dotenv
-import os
-from typing import List, Dict, Any
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
 import time
-from config import SUBJECTS, APP_CONFIG, API_CONFIG, UI_MESSAGES, SYSTEM_PROMPT_TEMPLATE
+import uuid
+import io
+import sqlite3
+from config import SUBJECTS, APP_CONFIG, UI_CONFIG, SESSION_STORE_CONFIG, PREGENERATED_CONFIG, METRICS_CONFIG, API_CONFIG, CONTEXT_CACHE_CONFIG, DISPATCHER_CONFIG, MEMORY_CONFIG, UI_MESSAGES, SUMMARY_PROMPT_TEMPLATE
 from utils import (
-    format_timestamp, truncate_text, export_chat_history, 
-    validate_question, display_chat_statistics, safe_get_subject_info
+    truncate_text, count_tokens_estimate,
+    validate_question, display_chat_statistics, safe_get_subject_info, build_custom_subject
 )
 from styles import apply_custom_styling
+from model_client import get_api_key, get_model_client
+from dispatcher import get_dispatcher, classify_error
+from documents import PDF_AVAILABLE, extract_text_cached, hash_file
+from prompt_builder import get_prompt_builder
+from conversation_memory import ConversationMemory
+from context_cache import get_context_cache
+from token_counter import truncate_to_tokens
+from rendering import get_rendered_cache
+from session_store import get_session_store
+from metrics import get_metrics, start_metrics_server
+from profiling import checkpoint, profile_rerun
+from history_export import EXPORT_FORMATS, available_compressions, export_filename, export_mime, export_session, write_export
+from reference_store import ReferenceStore, as_reference_store
+from cache import get_response_cache, make_cache_key, make_context_fingerprint, hash_text
+from singleflight import get_single_flight
+from answer_store import get_answer_store, pregenerated_key
 
-# Try to import PDF processing libraries
+# Semantic caching needs NumPy for the local embeddings
 try:
-    import PyPDF2
-    PDF_AVAILABLE = True
+    from semantic_cache import get_semantic_cache
+    SEMANTIC_CACHE_AVAILABLE = True
 except ImportError:
-    PDF_AVAILABLE = False
-    
-import io
-
-# Load environment variables
-load_dotenv()
-
-# Configure Gemini API
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if GOOGLE_API_KEY:
-    genai.configure(api_key=GOOGLE_API_KEY)
+    SEMANTIC_CACHE_AVAILABLE = False
 
 class EducationalTutor:
+    """Lightweight per-session handle around the shared, process-wide model client"""
+    
     def __init__(self):
-        # Configure the model with additional parameters for Gemini 2.0 Flash
-        generation_config = {
-            "temperature": API_CONFIG.get("temperature", 0.7),
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": API_CONFIG.get("max_tokens", 8192),
-        }
-        
-        # Try to use Gemini 2.0 Flash, fall back to stable model if not available
-        try:
-            self.model = genai.GenerativeModel(
-                model_name=API_CONFIG["model_name"],
-                generation_config=generation_config
-            )
-            self.model_name = API_CONFIG["model_name"]
-        except Exception as e:
-            # Fallback to stable Gemini model
-            fallback_model = "gemini-pro"
-            st.warning(f"⚠️ Gemini 2.0 Flash not available, using {fallback_model} instead. Error: {str(e)}")
-            self.model = genai.GenerativeModel(
-                model_name=fallback_model,
-                generation_config=generation_config
-            )
-            self.model_name = fallback_model
-            
+        self.model = get_model_client()
+        self.dispatcher = get_dispatcher()
+        self.prompt_builder = get_prompt_builder()
+        self.context_cache = get_context_cache(self.model)
+        self.memory = ConversationMemory(
+            summarizer=self.summarize_exchanges,
+            window=API_CONFIG["max_chat_history"],
+            max_summary_tokens=MEMORY_CONFIG["max_summary_tokens"],
+            fold_every=MEMORY_CONFIG["fold_every"],
+            fold_input_tokens=MEMORY_CONFIG["fold_input_tokens"],
+            fold_answer_tokens=MEMORY_CONFIG["fold_answer_tokens"],
+            max_fold_calls=MEMORY_CONFIG["max_fold_calls"]
+        ) if MEMORY_CONFIG.get("enabled", True) else None
         self.subjects = SUBJECTS
+        self.cache = get_response_cache()
+        self.semantic_cache = get_semantic_cache() if SEMANTIC_CACHE_AVAILABLE else None
+        self.single_flight = get_single_flight()
+        self.answer_store = get_answer_store()
+        self.metrics = get_metrics()
     
-    def create_system_prompt(self, subject: str, chat_history: List[Dict], reference_content: str = "") -> str:
-        """Create a structured prompt for the Gemini API"""
+    @property
+    def model_name(self) -> str:
+        """Name of the model currently serving requests"""
+        return self.model.model_name
+    
+    def get_subject_context(self, subject: str) -> str:
+        """Context description for a default or custom subject"""
         # Get subject context from both default and custom subjects
         all_subjects = get_all_subjects()
-        subject_context = all_subjects.get(subject, {}).get("context", subject)
-        
-        system_prompt = SYSTEM_PROMPT_TEMPLATE.format(
+        # Outside a session (pre-generation jobs) custom subjects are passed in through self.subjects
+        subject_info = all_subjects.get(subject) or self.subjects.get(subject, {})
+        return subject_info.get("context", subject)
+    
+    def get_summary(self, subject: str, chat_history: List[Dict]) -> str:
+        """Older exchanges are summarized in the background; use whatever summary is ready"""
+        if not self.memory:
+            return ""
+        self.memory.update(chat_history)
+        return self.memory.get_summary(subject)
+    
+    def create_system_prompt(self, subject: str, chat_history: List[Dict], reference_content: Union[str, ReferenceStore] = "", question: str = "") -> str:
+        """Create a structured prompt for the Gemini API"""
+        # Reference material, summary and history are sized to the input-token budget
+        return self.prompt_builder.build_system_prompt(
+            subject,
+            self.get_subject_context(subject),
+            chat_history,
+            as_reference_store(reference_content),
+            question,
+            self.get_summary(subject, chat_history)
+        )
+    
+    def summarize_exchanges(self, subject: str, previous_summary: str, exchanges: List[Dict]) -> str:
+        """Fold exchanges into the running summary with a short, low-temperature model call"""
+        max_tokens = MEMORY_CONFIG["max_summary_tokens"]
+        prompt = SUMMARY_PROMPT_TEMPLATE.format(
             subject=subject,
-            subject_context=subject_context
+            previous_summary=previous_summary or "(none yet)",
+            exchanges="\n\n".join(
+                f"Q: {exchange['question']}\nA: {truncate_to_tokens(exchange['answer'], MEMORY_CONFIG['fold_answer_tokens'])}"
+                for exchange in exchanges
+            ),
+            max_words=int(max_tokens * 0.75)
         )
+        response = self.dispatcher.call_sync(
+            self.model.generate_content,
+            prompt,
+            generation_config={"temperature": 0.2, "max_output_tokens": max_tokens},
+            estimated_tokens=count_tokens_estimate(prompt),
+            timeout=DISPATCHER_CONFIG["request_timeout_seconds"]
+        )
+        return response.text
+    
+    def build_full_prompt(self, question: str, subject: str, chat_history: List[Dict], reference_content: Union[str, ReferenceStore] = "") -> str:
+        """Combine the system prompt with the current question"""
+        with self.metrics.timed("prompt_build"):
+            system_prompt = self.create_system_prompt(subject, chat_history, reference_content, question)
+            return system_prompt + self.prompt_builder.format_question(question)
+    
+    def prepare_request(self, question: str, subject: str, chat_history: List[Dict], reference_content: Union[str, ReferenceStore] = ""):
+        """Return the model, the prompt to send and the tokens of the cached prefix in front of it"""
+        if self.context_cache:
+            references = as_reference_store(reference_content)
+            subject_context = self.get_subject_context(subject)
+            model_name = CONTEXT_CACHE_CONFIG.get("model_name") or self.model_name
+            key = hash_text(f"{model_name}\x1f{subject}\x1f{subject_context}\x1f{references.fingerprint()}")
+            with self.metrics.timed("context_cache"):
+                cached = self.context_cache.get_model(
+                    key,
+                    model_name,
+                    lambda: self.prompt_builder.build_cached_prefix(
+                        subject, subject_context, references, CONTEXT_CACHE_CONFIG["max_tokens"]
+                    )
+                )
+            if cached is not None:
+                # Retrieved chunks (when the prefix holds only part of the material), summary, history and question
+                with self.metrics.timed("prompt_build"):
+                    suffix = self.prompt_builder.build_uncached_suffix(
+                        chat_history, question, self.get_summary(subject, chat_history),
+                        None if cached.complete else references,
+                        CONTEXT_CACHE_CONFIG["max_request_tokens"] - cached.tokens
+                    )
+                return cached.model, suffix, cached.tokens
+        return self.model, self.build_full_prompt(question, subject, chat_history, reference_content), 0
+    
+    def format_error(self, error: Exception) -> str:
+        """Map an API exception to a user-facing message"""
+        error_class = classify_error(error)
+        self.metrics.increment("tutor_errors_total", **{"class": error_class})
+        if error_class == "quota":
+            return UI_MESSAGES["quota_exceeded"]
+        elif error_class == "timeout":
+            return UI_MESSAGES["timeout_error"]
+        else:
+            return f"{UI_MESSAGES['general_error']}\n\nError details: {str(error)}"
+    
+    def lookup_cached_answer(self, question: str, subject: str, chat_history: List[Dict], reference_content: Union[str, ReferenceStore] = "") -> Optional[str]:
+        """Return a cached answer for this question, checking exact then semantic matches"""
+        reference_fingerprint = as_reference_store(reference_content).fingerprint()
+        subject_context = self.get_subject_context(subject)
+        if self.cache:
+            cached = self.cache.get(make_cache_key(subject, subject_context, question, reference_fingerprint, chat_history))
+            if cached is not None:
+                return cached
+        if self.semantic_cache:
+            context = make_context_fingerprint(subject_context, reference_fingerprint, chat_history)
+            return self.semantic_cache.get(subject, context, question)
+        return None
+    
+    def lookup_pregenerated(self, question: str, subject: str, chat_history: List[Dict], reference_content: Union[str, ReferenceStore] = "") -> Optional[str]:
+        """Return the pre-generated answer for an example question, if one is stored"""
+        # Answers were generated without reference material, so documents always go to the model
+        if not self.answer_store or as_reference_store(reference_content):
+            return None
+        if chat_history and not PREGENERATED_CONFIG.get("serve_with_history", True):
+            return None
+        try:
+            return self.answer_store.get(
+                pregenerated_key(subject, self.get_subject_context(subject), question, self.model_name)
+            )
+        except sqlite3.Error:
+            return None
+    
+    def lookup_stored_answer(self, question: str, subject: str, chat_history: List[Dict], reference_content: Union[str, ReferenceStore] = "") -> Optional[Tuple[str, str]]:
+        """Return (answer, source) from the pre-generated store or the caches, if either has one"""
+        pregenerated = self.lookup_pregenerated(question, subject, chat_history, reference_content)
+        if pregenerated is not None:
+            return pregenerated, "pregenerated"
+        cached = self.lookup_cached_answer(question, subject, chat_history, reference_content)
+        if cached is not None:
+            return cached, "cache"
+        return None
+    
+    def store_answer(self, question: str, subject: str, chat_history: List[Dict], reference_content: Union[str, ReferenceStore], answer: str) -> None:
+        """Remember a successful answer in the enabled caches"""
+        reference_fingerprint = as_reference_store(reference_content).fingerprint()
+        subject_context = self.get_subject_context(subject)
+        if self.cache:
+            self.cache.set(make_cache_key(subject, subject_context, question, reference_fingerprint, chat_history), answer)
+        if self.semantic_cache:
+            context = make_context_fingerprint(subject_context, reference_fingerprint, chat_history)
+            self.semantic_cache.set(subject, context, question, answer)
+    
+    def generate(self, full_prompt: str, stream: bool = False, model=None, cached_tokens: int = 0):
+        """Send a prompt through the rate-limited dispatcher; streaming returns an iterator of chunks"""
+        # Cached prefix tokens still count against the input-token quota
+        estimated_tokens = count_tokens_estimate(full_prompt) + cached_tokens
+        if stream:
+            # Iterated inside the dispatcher so the whole generation holds a concurrency slot
+            return self.dispatcher.stream_sync(
+                (model or self.model).generate_content,
+                full_prompt,
+                stream=True,
+                estimated_tokens=estimated_tokens,
+                timeout=DISPATCHER_CONFIG["request_timeout_seconds"]
+            )
+        return self.dispatcher.call_sync(
+            (model or self.model).generate_content,
+            full_prompt,
+            estimated_tokens=estimated_tokens,
+            timeout=DISPATCHER_CONFIG["request_timeout_seconds"]
+        )
+    
+    def generate_answer(self, question: str, subject: str, chat_history: List[Dict], reference_content: Union[str, ReferenceStore], stream: bool, started: float) -> Iterator[str]:
+        """Call the model and yield the answer (chunk by chunk when streaming), then cache it"""
+        model, prompt, cached_tokens = self.prepare_request(question, subject, chat_history, reference_content)
+        
+        if not stream:
+            answer = self.generate(prompt, model=model, cached_tokens=cached_tokens).text
+            self.metrics.increment("tutor_requests_total", source="model")
+            self.store_answer(question, subject, chat_history, reference_content, answer)
+            yield answer
+            return
         
-        # Add reference content if available
-        if reference_content and reference_content.strip():
-            system_prompt += f"\n\nReference Material:\nThe user has provided the following reference material to help answer questions:\n\n{reference_content[:2000]}{'...' if len(reference_content) > 2000 else ''}\n\nPlease use this reference material when relevant to answer questions."
+        parts = []
+        response = self.generate(prompt, stream=True, model=model, cached_tokens=cached_tokens)
+        for chunk in response:
+            # Chunks without text parts (e.g. safety metadata) raise on .text
+            try:
+                text = chunk.text
+            except ValueError:
+                continue
+            if text:
+                if not parts:
+                    self.metrics.observe("first_chunk", time.perf_counter() - started)
+                parts.append(text)
+                yield text
         
-        # Add chat history for context
-        if chat_history:
-            system_prompt += "\n\nPrevious conversation context:\n"
-            max_history = API_CONFIG["max_chat_history"]
-            for i, exchange in enumerate(chat_history[-max_history:]):
-                system_prompt += f"Q{i+1}: {exchange['question']}\n"
-                system_prompt += f"A{i+1}: {exchange['answer'][:200]}...\n\n"
+        self.metrics.increment("tutor_requests_total", source="model")
+        if parts:
+            self.store_answer(question, subject, chat_history, reference_content, "".join(parts))
+    
+    def coalesce(self, question: str, subject: str, chat_history: List[Dict], reference_content: Union[str, ReferenceStore], produce) -> Iterator[str]:
+        """Share one model call among identical questions pending at the same time"""
+        if not self.single_flight:
+            return produce()
+        key = make_cache_key(
+            subject, self.get_subject_context(subject), question,
+            as_reference_store(reference_content).fingerprint(), chat_history
+        )
+        return self.single_flight.stream(key, produce, DISPATCHER_CONFIG["request_timeout_seconds"])
+    
+    def answer(self, question: str, subject: str, chat_history: List[Dict], reference_content: Union[str, ReferenceStore] = "") -> Tuple[str, str]:
+        """Return the answer and where it came from ('pregenerated', 'cache', 'model' or 'coalesced'); API errors are raised"""
+        started = time.perf_counter()
+        stored = self.lookup_stored_answer(question, subject, chat_history, reference_content)
+        if stored is not None:
+            self.metrics.increment("tutor_requests_total", source=stored[1])
+            self.metrics.observe("request", time.perf_counter() - started)
+            return stored
+        
+        led = []
+        def produce():
+            led.append(True)
+            return self.generate_answer(question, subject, chat_history, reference_content, False, started)
+        
+        try:
+            answer = "".join(self.coalesce(question, subject, chat_history, reference_content, produce))
+        finally:
+            self.metrics.observe("request", time.perf_counter() - started)
         
-        return system_prompt
+        if not led:
+            self.metrics.increment("tutor_requests_total", source="coalesced")
+            return answer, "coalesced"
+        return answer, "model"
     
-    def get_response(self, question: str, subject: str, chat_history: List[Dict], reference_content: str = "") -> str:
+    def get_response(self, question: str, subject: str, chat_history: List[Dict], reference_content: Union[str, ReferenceStore] = "") -> str:
         """Get response from Gemini API"""
         try:
-            system_prompt = self.create_system_prompt(subject, chat_history, reference_content)
-            full_prompt = f"{system_prompt}\n\nCurrent question: {question}\n\nPlease provide a comprehensive answer:"
-            
-            response = self.model.generate_content(full_prompt)
-            return response.text
+            answer, _ = self.answer(question, subject, chat_history, reference_content)
+        except Exception as e:
+            return self.format_error(e)
+        return answer
+    
+    def answer_stream(self, question: str, subject: str, chat_history: List[Dict], reference_content: Union[str, ReferenceStore] = "") -> Iterator[str]:
+        """Yield the answer chunk by chunk as it is generated; API errors are raised"""
+        started = time.perf_counter()
+        stored = self.lookup_stored_answer(question, subject, chat_history, reference_content)
+        if stored is not None:
+            self.metrics.increment("tutor_requests_total", source=stored[1])
+            self.metrics.observe("request", time.perf_counter() - started)
+            yield stored[0]
+            return
+        
+        led = []
+        def produce():
+            led.append(True)
+            return self.generate_answer(question, subject, chat_history, reference_content, True, started)
+        
+        try:
+            yield from self.coalesce(question, subject, chat_history, reference_content, produce)
+        finally:
+            self.metrics.observe("request", time.perf_counter() - started)
         
+        if not led:
+            self.metrics.increment("tutor_requests_total", source="coalesced")
+    
+    def get_response_stream(self, question: str, subject: str, chat_history: List[Dict], reference_content: Union[str, ReferenceStore] = "") -> Iterator[str]:
+        """Stream the response from Gemini API chunk by chunk as it is generated"""
+        streamed = False
+        try:
+            for text in self.answer_stream(question, subject, chat_history, reference_content):
+                streamed = True
+                yield text
         except Exception as e:
-            error_str = str(e).lower()
-            if "quota" in error_str or "limit" in error_str:
-                return UI_MESSAGES["quota_exceeded"]
-            elif "timeout" in error_str:
-                return UI_MESSAGES["timeout_error"]
-            else:
-                return f"{UI_MESSAGES['general_error']}\n\nError details: {str(e)}"
+            # Keep whatever was already streamed and append the error below it
+            yield ("\n\n" if streamed else "") + self.format_error(e)
 
-def extract_text_from_pdf(pdf_file):
-    """Extract text from uploaded PDF file"""
-    if not PDF_AVAILABLE:
-        return "PDF processing not available. Please install PyPDF2: pip install PyPDF2"
-    
+def restore_session():
+    """Reattach to the persisted session named in the URL and load its latest exchanges"""
+    st.session_state.session_id = None
+    st.session_state.history_cursor = None
+    store = get_session_store()
+    session_id = st.query_params.get("session")
+    if store is None or not session_id:
+        return
     try:
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
-    except Exception as e:
-        return f"Error reading PDF: {str(e)}"
+        if not store.has_session(session_id):
+            return
+        exchanges, cursor = store.load_page(session_id, limit=SESSION_STORE_CONFIG["initial_load"])
+    except sqlite3.Error:
+        return
+    st.session_state.session_id = session_id
+    st.session_state.chat_history = exchanges
+    st.session_state.history_cursor = cursor
 
-def extract_text_from_txt(txt_file):
-    """Extract text from uploaded TXT file"""
+def load_earlier_history():
+    """Prepend the next page of persisted exchanges to the chat history"""
     try:
-        # Try different encodings
-        for encoding in ['utf-8', 'latin-1', 'cp1252']:
-            try:
-                txt_file.seek(0)
-                content = txt_file.read().decode(encoding)
-                return content
-            except UnicodeDecodeError:
-                continue
-        return "Error: Could not decode the text file"
-    except Exception as e:
-        return f"Error reading TXT file: {str(e)}"
+        exchanges, cursor = get_session_store().load_page(
+            st.session_state.session_id,
+            before=st.session_state.history_cursor,
+            limit=SESSION_STORE_CONFIG["page_size"]
+        )
+    except sqlite3.Error:
+        return
+    st.session_state.chat_history = exchanges + st.session_state.chat_history
+    st.session_state.history_cursor = cursor
+    # Summaries track positions in the history, so rebuild them for the longer list
+    if st.session_state.tutor.memory:
+        st.session_state.tutor.memory.reset()
+
+def persist_exchange(exchange: Dict) -> None:
+    """Append one exchange to the session store, creating the session on first use"""
+    store = get_session_store()
+    if store is None:
+        return
+    try:
+        if not st.session_state.session_id:
+            st.session_state.session_id = store.create_session()
+            st.query_params["session"] = st.session_state.session_id
+        store.append(st.session_state.session_id, exchange)
+    except sqlite3.Error:
+        # Persistence is best-effort; the conversation continues in memory
+        pass
 
 def initialize_session_state():
     """Initialize Streamlit session state variables"""
+    if "session_id" not in st.session_state:
+        restore_session()
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
     if "selected_subject" not in st.session_state:
@@ -139,41 +387,36 @@ def initialize_session_state():
         st.session_state.tutor = EducationalTutor()
     if "uploaded_files" not in st.session_state:
         st.session_state.uploaded_files = []
-    if "reference_content" not in st.session_state:
-        st.session_state.reference_content = ""
+    if "reference_store" not in st.session_state:
+        st.session_state.reference_store = ReferenceStore()
+    if "duplicate_uploads" not in st.session_state:
+        st.session_state.duplicate_uploads = {}
     if "custom_subjects" not in st.session_state:
         st.session_state.custom_subjects = {}
+    if "chat_render_limit" not in st.session_state:
+        st.session_state.chat_render_limit = UI_CONFIG["chat_page_size"]
 
 def add_custom_subject(name: str, description: str, context: str, icon: str = "📚"):
     """Add a new custom subject to the session state"""
     if name and name not in st.session_state.custom_subjects:
-        st.session_state.custom_subjects[name] = {
-            "description": description or f"Custom subject: {name}",
-            "context": context or f"General knowledge and concepts related to {name}",
-            "icon": icon,
-            "example_questions": [
-                f"What are the basics of {name}?",
-                f"Can you explain key concepts in {name}?",
-                f"What should I know about {name}?",
-                f"How can I get started with {name}?",
-                f"What are common applications of {name}?"
-            ],
-            "study_tips": [
-                "Break down complex topics into smaller parts",
-                "Practice regularly and consistently",
-                "Ask specific questions when you're stuck",
-                "Look for real-world applications",
-                "Review and summarize what you've learned"
-            ],
-            "custom": True  # Flag to identify custom subjects
-        }
+        subject_info = build_custom_subject(name, description, context, icon)
+        st.session_state.custom_subjects[name] = subject_info
+        store = get_answer_store()
+        if store is not None and PREGENERATED_CONFIG.get("collect_custom_subjects", False):
+            try:
+                # The next pre-generation run answers this subject's example questions
+                store.register_custom_subject(name, subject_info)
+            except sqlite3.Error:
+                pass
         return True
     return False
 
 def get_all_subjects():
     """Get combined list of default and custom subjects"""
     all_subjects = dict(SUBJECTS)
-    all_subjects.update(st.session_state.custom_subjects)
+    # Outside a Streamlit script run (batch jobs, benchmarks) only the default subjects exist
+    if get_script_run_ctx(suppress_warning=True) is not None:
+        all_subjects.update(st.session_state.get("custom_subjects", {}))
     return all_subjects
 
 def display_chat_history():
@@ -188,7 +431,50 @@ def display_chat_history():
                 st.markdown(exchange['answer'])
                 st.markdown("---")
 
+def stream_response_to_placeholder(chunks: Iterator[str], placeholder) -> str:
+    """Render streamed chunks into a placeholder and return the full text"""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        placeholder.markdown("".join(parts) + "▌")
+    response = "".join(parts)
+    placeholder.markdown(response)
+    return response
+
+def display_metrics_panel():
+    """Sidebar admin panel with latency percentiles, outcomes and queue state"""
+    metrics = get_metrics()
+    with st.expander("📈 Performance Metrics"):
+        summaries = metrics.phase_summaries()
+        if summaries:
+            st.table([
+                {
+                    "Phase": phase,
+                    "Count": summary["count"],
+                    "p50 (ms)": round(summary["p50"] * 1000, 1),
+                    "p95 (ms)": round(summary["p95"] * 1000, 1),
+                    "p99 (ms)": round(summary["p99"] * 1000, 1),
+                }
+                for phase, summary in summaries.items()
+            ])
+        else:
+            st.caption("No timings recorded yet.")
+        
+        gauges = metrics.gauge_values()
+        col1, col2 = st.columns(2)
+        col1.metric("Queue depth", int(gauges.get("tutor_dispatcher_queue_depth", 0)))
+        col2.metric("In flight", int(gauges.get("tutor_dispatcher_in_flight", 0)))
+        
+        requests = metrics.counter_values("tutor_requests_total")
+        errors = metrics.counter_values("tutor_errors_total")
+        if requests or errors:
+            st.markdown("**Answers:** " + ", ".join(f"{source} {int(count)}" for source, count in requests.items()))
+            st.markdown("**Errors:** " + (", ".join(f"{error_class} {int(count)}" for error_class, count in errors.items()) or "none"))
+        if METRICS_CONFIG.get("port"):
+            st.caption(f"Prometheus: http://{METRICS_CONFIG['host']}:{METRICS_CONFIG['port']}/metrics")
+
 def main():
+    checkpoint("setup")
     # Page configuration
     st.set_page_config(**APP_CONFIG)
     
@@ -198,12 +484,24 @@ def main():
     # Initialize session state
     initialize_session_state()
     
+    # Local Prometheus endpoint, started once per server process
+    start_metrics_server()
+    
     # API Key check
-    if not GOOGLE_API_KEY or GOOGLE_API_KEY == "your_gemini_api_key_here":
+    # .env is read on first use rather than at import time
+    api_key = get_api_key()
+    if not api_key or api_key == "your_gemini_api_key_here":
         st.error(UI_MESSAGES["api_key_missing"])
         return
     
+    # Resolve the model and open the connection once per process, off the script thread
+    st.session_state.tutor.model.start_warm_up()
+    if st.session_state.tutor.model.fallback_error and not st.session_state.get("fallback_warning_shown"):
+        st.warning(f"⚠️ {st.session_state.tutor.model.fallback_error}")
+        st.session_state.fallback_warning_shown = True
+    
     # Sidebar for subject selection and controls
+    checkpoint("sidebar")
     with st.sidebar:
         st.header("🎯 Subject Selection")
         
@@ -220,6 +518,7 @@ def main():
         # Update selected subject in session state
         if selected_subject != st.session_state.selected_subject:
             st.session_state.selected_subject = selected_subject
+            st.session_state.chat_render_limit = UI_CONFIG["chat_page_size"]
             st.rerun()
         
         # Display subject description
@@ -293,6 +592,7 @@ def main():
         st.markdown("---")
         
         # File Upload Section
+        checkpoint("uploads")
         st.header("📄 Reference Materials")
         
         # Determine allowed file types based on available libraries
@@ -312,31 +612,49 @@ def main():
         
         # Process uploaded files
         if uploaded_files:
-            all_content = ""
             processed_files = []
             
+            known_names = {f["name"] for f in st.session_state.uploaded_files}
+            known_hashes = {f.get("hash"): f["name"] for f in st.session_state.uploaded_files}
+            duplicates = st.session_state.duplicate_uploads
+            
             for uploaded_file in uploaded_files:
-                if uploaded_file.name not in [f["name"] for f in st.session_state.uploaded_files]:
+                if uploaded_file.name not in known_names:
+                    # Identify the file by its bytes so renamed copies and re-uploads hit the cache;
+                    # copies already recognized keep their hash instead of being re-read every rerun
+                    content_hash = duplicates.get(uploaded_file.name) or hash_file(uploaded_file)
+                    if content_hash in known_hashes:
+                        duplicates[uploaded_file.name] = content_hash
+                        st.info(f"ℹ️ {uploaded_file.name} is the same file as {known_hashes[content_hash]}, which is already loaded")
+                        continue
+                    duplicates.pop(uploaded_file.name, None)
+                    
                     # Process new file
                     with st.spinner(f"Processing {uploaded_file.name}..."):
-                        if uploaded_file.type == "application/pdf":
-                            content = extract_text_from_pdf(uploaded_file)
-                        elif uploaded_file.type == "text/plain":
-                            content = extract_text_from_txt(uploaded_file)
-                        else:
-                            content = "Unsupported file type"
+                        progress_slot = st.empty()
+                        content = extract_text_cached(
+                            uploaded_file,
+                            uploaded_file.type,
+                            content_hash=content_hash,
+                            progress_callback=lambda done, total: progress_slot.progress(
+                                done / total, text=f"Extracted {done}/{total} pages"
+                            )
+                        )
+                        progress_slot.empty()
                         
+                        # The text lives only in the reference store; the file list keeps metadata
+                        doc_id = st.session_state.reference_store.add(uploaded_file.name, content, content_hash)
                         processed_files.append({
+                            "id": doc_id,
                             "name": uploaded_file.name,
-                            "content": content,
-                            "size": uploaded_file.size
+                            "size": uploaded_file.size,
+                            "hash": content_hash
                         })
-                        all_content += f"\n\n--- Content from {uploaded_file.name} ---\n{content}"
+                        known_hashes[content_hash] = uploaded_file.name
             
             # Add new files to session state
             if processed_files:
                 st.session_state.uploaded_files.extend(processed_files)
-                st.session_state.reference_content += all_content
                 st.success(f"✅ Processed {len(processed_files)} new file(s)")
         
         # Display uploaded files
@@ -348,29 +666,36 @@ def main():
                     st.text(f"📄 {file_info['name']}")
                     st.caption(f"Size: {file_info['size']} bytes")
                 with col2:
-                    if st.button("🗑️", key=f"delete_{i}", help="Remove this file"):
-                        # Remove file from session state
+                    if st.button("🗑️", key=f"delete_{file_info['id']}", help="Remove this file"):
+                        # Remove file from session state and drop only its segment
                         removed_file = st.session_state.uploaded_files.pop(i)
-                        # Rebuild reference content without this file
-                        st.session_state.reference_content = ""
-                        for remaining_file in st.session_state.uploaded_files:
-                            st.session_state.reference_content += f"\n\n--- Content from {remaining_file['name']} ---\n{remaining_file['content']}"
+                        st.session_state.reference_store.remove(removed_file["id"])
                         st.rerun()
             
             # Clear all files button
             if st.button("🗑️ Clear All Files", type="secondary"):
                 st.session_state.uploaded_files = []
-                st.session_state.reference_content = ""
+                st.session_state.reference_store.clear()
                 st.success("All files cleared!")
                 st.rerun()
         
         st.markdown("---")
         
         # Chat controls
+        checkpoint("sidebar")
         st.header("💬 Chat Controls")
         
         if st.button("🗑️ Clear Chat History", type="secondary"):
             st.session_state.chat_history = []
+            st.session_state.chat_render_limit = UI_CONFIG["chat_page_size"]
+            st.session_state.history_cursor = None
+            if st.session_state.session_id:
+                try:
+                    get_session_store().clear_session(st.session_state.session_id)
+                except sqlite3.Error:
+                    pass
+            if st.session_state.tutor.memory:
+                st.session_state.tutor.memory.reset()
             st.success(UI_MESSAGES["chat_cleared"])
             st.rerun()
         
@@ -379,82 +704,80 @@ def main():
             st.metric("Questions Asked", len(st.session_state.chat_history))
             
             # Add export functionality
+            export_format = st.selectbox("Export format", list(EXPORT_FORMATS), format_func=str.upper)
+            export_compression = st.selectbox("Compression", available_compressions())
+            export_new_only = st.checkbox(
+                "Only messages since last export",
+                disabled=not st.session_state.session_id,
+                help="Available once the session has been saved"
+            )
             if st.button("📥 Export Chat History"):
-                export_data = export_chat_history(
-                    st.session_state.chat_history, 
-                    selected_subject
-                )
+                # Serialize exchange by exchange straight into the (compressed) download buffer
+                export_buffer = io.BytesIO()
+                on_download, download_args = None, ()
+                if st.session_state.session_id:
+                    store = get_session_store()
+                    last_row = export_session(
+                        store, st.session_state.session_id, selected_subject, export_buffer,
+                        export_format, export_compression, since_last_export=export_new_only, record=False
+                    )
+                    # Only a download that actually happened counts as the previous export
+                    on_download, download_args = store.set_export_cursor, (st.session_state.session_id, last_row)
+                else:
+                    write_export(
+                        enumerate(st.session_state.chat_history, 1), selected_subject, export_buffer,
+                        export_format, export_compression
+                    )
                 st.download_button(
-                    label="Download JSON",
-                    data=export_data,
-                    file_name=f"tutor_session_{time.strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json"
+                    label=f"Download {export_format.upper()}",
+                    data=export_buffer,
+                    file_name=export_filename(export_format, export_compression),
+                    mime=export_mime(export_format, export_compression),
+                    on_click=on_download,
+                    args=download_args
                 )
+        
+        # Admin panel
+        if METRICS_CONFIG.get("admin_panel", False):
+            display_metrics_panel()
     
     # Main content area - Full width chat interface
+    checkpoint("chat_render")
     
     # Show reference materials indicator
     if st.session_state.uploaded_files:
         st.info(f"📚 **Reference Materials Active**: {len(st.session_state.uploaded_files)} file(s) uploaded - The AI will use these materials to enhance responses")
     
-    # Display chat history in WhatsApp-like format
+    # Display chat history in WhatsApp-like format, windowed to the most recent messages
     if st.session_state.chat_history:
-        for i, exchange in enumerate(st.session_state.chat_history):
-            if exchange["subject"] == selected_subject:
-                # User message (right-aligned, green background like WhatsApp)
-                st.markdown(
-                    f"""
-                    <div style='display: flex; justify-content: flex-end; margin: 15px 0; align-items: flex-end;'>
-                        <div style='
-                            background: linear-gradient(135deg, #dcf8c6 0%, #d4f4aa 100%); 
-                            padding: 12px 16px; 
-                            border-radius: 18px 18px 4px 18px; 
-                            max-width: 80%; 
-                            margin-left: 20%; 
-                            box-shadow: 0 1px 2px rgba(0,0,0,0.1);
-                            position: relative;
-                        '>
-                            <div style='font-size: 0.85em; color: #666; margin-bottom: 6px; font-weight: 500;'>You</div>
-                            <div style='color: #000; line-height: 1.4; word-wrap: break-word;'>{exchange['question']}</div>
-                            <div style='font-size: 0.7em; color: #999; text-align: right; margin-top: 8px;'>
-                                {format_timestamp(exchange['timestamp']).split(' ')[1]}
-                            </div>
-                        </div>
-                    </div>
-                    """, 
-                    unsafe_allow_html=True
-                )
-                
-                # AI response (left-aligned, white background like WhatsApp)
-                st.markdown(
-                    f"""
-                    <div style='display: flex; justify-content: flex-start; margin: 15px 0; align-items: flex-end;'>
-                        <div style='
-                            background: white; 
-                            padding: 12px 16px; 
-                            border-radius: 18px 18px 18px 4px; 
-                            max-width: 80%; 
-                            margin-right: 20%; 
-                            box-shadow: 0 1px 2px rgba(0,0,0,0.1);
-                            position: relative;
-                        '>
-                            <div style='font-size: 0.85em; color: #666; margin-bottom: 6px; font-weight: 500; display: flex; align-items: center;'>
-                                🤖 AI Tutor
-                            </div>
-                            <div style='color: #000; line-height: 1.4; word-wrap: break-word;'>{exchange['answer']}</div>
-                            <div style='font-size: 0.7em; color: #999; text-align: right; margin-top: 8px;'>
-                                {format_timestamp(exchange['timestamp']).split(' ')[1]}
-                            </div>
-                        </div>
-                    </div>
-                    """, 
-                    unsafe_allow_html=True
-                )
+        subject_exchanges = [
+            exchange for exchange in st.session_state.chat_history
+            if exchange["subject"] == selected_subject
+        ]
+        visible_count = st.session_state.chat_render_limit
+        hidden_count = max(len(subject_exchanges) - visible_count, 0)
+        
+        # Older exchanges may still be in the session store rather than in memory
+        if hidden_count or st.session_state.history_cursor is not None:
+            label = f"⬆️ Load earlier messages ({hidden_count} hidden)" if hidden_count else "⬆️ Load earlier messages"
+            if st.button(label, key="load_earlier_messages", use_container_width=True):
+                if hidden_count < UI_CONFIG["chat_page_size"] and st.session_state.history_cursor is not None:
+                    load_earlier_history()
+                st.session_state.chat_render_limit += UI_CONFIG["chat_page_size"]
+                st.rerun()
+        
+        # Each exchange is rendered to HTML once; reruns only join the cached fragments
+        with get_metrics().timed("render"):
+            st.markdown(
+                get_rendered_cache().render_many(subject_exchanges[hidden_count:]),
+                unsafe_allow_html=True
+            )
     else:
         # Empty state - no welcome message, just clean interface
         pass
     
     # Question input section
+    checkpoint("question")
     col_input, col_submit = st.columns([5, 1])
     
     # Get the default value for the input (from selected example or empty)
@@ -494,29 +817,45 @@ def main():
     
     # Process question submission
     if submit_button and question_valid:
-        with st.spinner(UI_MESSAGES["thinking"].format(selected_subject)):
-            response = st.session_state.tutor.get_response(
-                question.strip(), 
-                selected_subject, 
-                st.session_state.chat_history,
-                st.session_state.reference_content
+        if API_CONFIG.get("stream_responses", True):
+            # Render chunks as they arrive instead of waiting for the full answer
+            response = stream_response_to_placeholder(
+                st.session_state.tutor.get_response_stream(
+                    question.strip(), 
+                    selected_subject, 
+                    st.session_state.chat_history,
+                    st.session_state.reference_store
+                ),
+                st.empty()
             )
-            
-            # Add to chat history
-            st.session_state.chat_history.append({
-                "question": question.strip(),
-                "answer": response,
-                "subject": selected_subject,
-                "timestamp": time.time()
-            })
-            
-            # Clear input and rerun to show new conversation
-            st.rerun()
+        else:
+            with st.spinner(UI_MESSAGES["thinking"].format(selected_subject)):
+                response = st.session_state.tutor.get_response(
+                    question.strip(), 
+                    selected_subject, 
+                    st.session_state.chat_history,
+                    st.session_state.reference_store
+                )
+        
+        # Add to chat history and persist it as one appended row
+        exchange = {
+            "id": uuid.uuid4().hex,
+            "question": question.strip(),
+            "answer": response,
+            "subject": selected_subject,
+            "timestamp": time.time()
+        }
+        st.session_state.chat_history.append(exchange)
+        persist_exchange(exchange)
+        
+        # Clear input and rerun to show new conversation
+        st.rerun()
     
     # Footer
     st.markdown("---")
     
     # Display chat statistics if there's history
+    checkpoint("statistics")
     if st.session_state.chat_history:
         st.subheader("📊 Session Statistics")
         display_chat_statistics(st.session_state.chat_history)
@@ -534,4 +873,5 @@ def main():
     )
 
 if __name__ == "__main__":
-    main()
+    with profile_rerun():
+        main()
@@ -0,0 +1,222 @@
+"""
+Headless batch answering for the AI Educational Tutor application.
+
+Reads a question bank (CSV or JSONL with `question`, optional `subject` and
+`id` columns), answers the questions concurrently through the same
+EducationalTutor, rate-limited dispatcher and caches as the Streamlit app, and
+appends one JSON line per result. The output file doubles as the checkpoint:
+rerunning the same command skips every question that already has an answer,
+so an interrupted run resumes where it stopped and failed questions are retried.
+
+    python batch_answer.py questions.csv -o answers.jsonl --workers 8
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Set
+
+from cache import hash_text
+from config import BATCH_CONFIG, DISPATCHER_CONFIG, SUBJECTS
+from dispatcher import classify_error
+from utils import validate_question
+
+def question_id(subject: str, question: str) -> str:
+    """Stable ID for rows without an explicit one"""
+    return hash_text(f"{subject}\x1f{question.strip()}")[:16]
+
+def read_questions(path: str, default_subject: Optional[str] = None) -> Iterator[Dict]:
+    """Yield {'id', 'subject', 'question'} rows from a CSV or JSONL file, one at a time"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            question = (row.get("question") or "").strip()
+            if not question:
+                continue
+            subject = (row.get("subject") or default_subject or "").strip()
+            yield {
+                "id": str(row.get("id") or question_id(subject, question)),
+                "subject": subject,
+                "question": question,
+            }
+
+def load_checkpoint(path: str) -> Set[str]:
+    """IDs already answered in an earlier run of the same output file"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    # A line cut inside a multibyte character must not stop the whole file from being read
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by an interruption; that question is simply asked again
+                continue
+            if "answer" in record:
+                done.add(record["id"])
+    return done
+
+def open_output(path: str):
+    """Open the output for appending, starting on a fresh line after an interrupted write"""
+    needs_newline = False
+    if os.path.exists(path):
+        # Check the last byte in binary: a cut-off line can end inside a multibyte character
+        with open(path, "rb") as f:
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+    output = open(path, "a", encoding="utf-8")
+    if needs_newline:
+        output.write("\n")
+    return output
+
+class BatchRunner:
+    """Answer question rows on a thread pool; the dispatcher enforces the API quota"""
+
+    def __init__(self, tutor, workers: int, reference_content=""):
+        self.tutor = tutor
+        self.workers = workers
+        self.reference_content = reference_content
+
+    def answer_row(self, row: Dict) -> Dict:
+        """Answer one row and return its output record"""
+        record = dict(row)
+        if row["subject"] not in SUBJECTS:
+            record.update({"error": f"Unknown subject: {row['subject'] or '(none)'}", "error_class": "invalid"})
+            return record
+        is_valid, message = validate_question(row["question"])
+        if not is_valid:
+            record.update({"error": message, "error_class": "invalid"})
+            return record
+
+        started = time.perf_counter()
+        try:
+            answer, source = self.tutor.answer(row["question"], row["subject"], [], self.reference_content)
+        except Exception as e:
+            error_class = classify_error(e)
+            self.tutor.metrics.increment("tutor_errors_total", **{"class": error_class})
+            record.update({"error": str(e), "error_class": error_class})
+            return record
+        record.update({
+            "answer": answer,
+            "source": source,
+            "model": self.tutor.model_name,
+            "seconds": round(time.perf_counter() - started, 3),
+            "answered_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+        return record
+
+    def run(self, rows: Iterator[Dict], output, done: Set[str], progress_every: int = 25) -> Dict[str, int]:
+        """Answer every row not in `done`, writing each record as soon as it completes"""
+        counts = {"answered": 0, "cached": 0, "failed": 0, "skipped": 0}
+        max_pending = self.workers * BATCH_CONFIG["pending_per_worker"]
+        started = time.perf_counter()
+        scheduled = set(done)
+        pending = set()
+
+        def write(record: Dict) -> None:
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            # Flushing every line keeps the checkpoint current if the run is killed
+            output.flush()
+            if "error" in record:
+                counts["failed"] += 1
+            else:
+                counts["answered"] += 1
+                # Cached, pre-generated and coalesced answers cost no model call of their own
+                counts["cached"] += record["source"] != "model"
+            finished = counts["answered"] + counts["failed"]
+            if progress_every and finished % progress_every == 0:
+                elapsed = time.perf_counter() - started
+                print(f"{finished} done, {counts['failed']} failed, "
+                      f"{finished / elapsed * 60:.1f} questions/min", file=sys.stderr)
+
+        def drain(block_until: int) -> None:
+            nonlocal pending
+            while len(pending) > block_until:
+                finished, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    write(future.result())
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch")
+        try:
+            for row in rows:
+                if row["id"] in scheduled:
+                    counts["skipped"] += 1
+                    continue
+                scheduled.add(row["id"])
+                # Read ahead only a little so question banks of any size stream through
+                drain(max_pending - 1)
+                pending.add(executor.submit(self.answer_row, row))
+            drain(0)
+        finally:
+            # On Ctrl+C, drop queued rows but keep the answers of calls already in flight
+            executor.shutdown(wait=True, cancel_futures=True)
+            for future in pending:
+                if not future.cancelled():
+                    write(future.result())
+        return counts
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Answer a question bank from the command line"""
+    parser = argparse.ArgumentParser(description="Pre-generate tutor answers for a CSV or JSONL question bank")
+    parser.add_argument("input", help="CSV or JSONL file with a question column and optional subject and id")
+    parser.add_argument("--output", "-o", required=True, help="JSONL results; also the checkpoint for resuming")
+    parser.add_argument("--subject", choices=list(SUBJECTS), help="Subject for rows that do not name one")
+    parser.add_argument("--workers", type=int, default=BATCH_CONFIG["workers"], help="Questions answered concurrently")
+    parser.add_argument("--requests-per-minute", type=float, help="Override the dispatcher's request quota")
+    parser.add_argument("--tokens-per-minute", type=float, help="Override the dispatcher's input-token quota")
+    parser.add_argument("--reference", action="append", default=[], help="Reference document (.txt or .pdf) used for every question")
+    args = parser.parse_args(argv)
+
+    # The dispatcher is created with the first tutor, so quota overrides go in before that
+    DISPATCHER_CONFIG["max_concurrency"] = max(DISPATCHER_CONFIG["max_concurrency"], args.workers)
+    if args.requests_per_minute:
+        DISPATCHER_CONFIG["requests_per_minute"] = args.requests_per_minute
+    if args.tokens_per_minute:
+        DISPATCHER_CONFIG["tokens_per_minute"] = args.tokens_per_minute
+
+    from app import EducationalTutor
+    from documents import read_pdf_text, read_txt_text
+    from model_client import get_api_key
+    from reference_store import ReferenceStore
+
+    if not get_api_key():
+        print("GOOGLE_API_KEY is not set (see .env.sample)", file=sys.stderr)
+        return 1
+
+    references = ReferenceStore()
+    for path in args.reference:
+        with open(path, "rb") as f:
+            text = read_pdf_text(f) if path.lower().endswith(".pdf") else read_txt_text(f)
+        references.add(os.path.basename(path), text)
+
+    done = load_checkpoint(args.output)
+    if done:
+        print(f"Resuming: {len(done)} questions already answered in {args.output}", file=sys.stderr)
+
+    runner = BatchRunner(EducationalTutor(), args.workers, references)
+    started = time.perf_counter()
+    output = open_output(args.output)
+    try:
+        counts = runner.run(read_questions(args.input, args.subject), output, done, BATCH_CONFIG["progress_every"])
+    except KeyboardInterrupt:
+        print(f"Interrupted; rerun the same command to resume from {args.output}", file=sys.stderr)
+        return 130
+    finally:
+        output.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"{counts['answered']} answered ({counts['cached']} without a model call), {counts['failed']} failed, "
+          f"{counts['skipped']} skipped in {elapsed:.1f}s", file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Offline fixtures for the benchmark suite.
+
+A deterministic stand-in for google.generativeai.GenerativeModel (answers are
+derived from a hash of the prompt, so every run does the same work without
+network access) plus generators for documents and chat histories of any size.
+"""
+
+import hashlib
+import time
+from typing import Iterator, List
+
+WORDS = (
+    "the answer explains how each concept builds on the previous one with a worked example "
+    "and a short summary of the key points to remember for the next lesson"
+).split()
+
+class FakeResponse:
+    """Minimal response object exposing .text like the real SDK"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeTokenCount:
+    """Minimal count_tokens result"""
+
+    def __init__(self, total_tokens: int):
+        self.total_tokens = total_tokens
+
+class FakeGenerativeModel:
+    """Offline GenerativeModel with fixed latency and prompt-dependent output"""
+
+    answer_words = 200
+    latency_seconds = 0.0
+
+    def __init__(self, model_name: str = "fake-model", generation_config=None, **kwargs):
+        self.model_name = model_name
+        self.generation_config = generation_config
+
+    def _answer(self, prompt) -> str:
+        """Deterministic answer text for a prompt"""
+        seed = hashlib.sha256(str(prompt).encode("utf-8", "surrogatepass")).digest()
+        return " ".join(WORDS[(seed[i % len(seed)] + i) % len(WORDS)] for i in range(self.answer_words)) + "."
+
+    def _chunks(self, text: str) -> Iterator[FakeResponse]:
+        """Stream the answer in a few pieces"""
+        words = text.split(" ")
+        for start in range(0, len(words), 20):
+            yield FakeResponse(" ".join(words[start:start + 20]) + " ")
+
+    def generate_content(self, prompt, stream: bool = False, **kwargs):
+        """Return (or stream) a deterministic answer"""
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        text = self._answer(prompt)
+        return self._chunks(text) if stream else FakeResponse(text)
+
+    def count_tokens(self, prompt) -> FakeTokenCount:
+        """Roughly one token per four characters"""
+        return FakeTokenCount(max(1, len(str(prompt)) // 4))
+
+    @classmethod
+    def from_cached_content(cls, cached_content=None, generation_config=None, **kwargs):
+        """Cached-content models behave like regular ones here"""
+        return cls(generation_config=generation_config)
+
+def install_fake_model(answer_words: int = 200, latency_seconds: float = 0.0) -> None:
+    """Replace the SDK's GenerativeModel before the application creates its client"""
+    import google.generativeai as genai
+    FakeGenerativeModel.answer_words = answer_words
+    FakeGenerativeModel.latency_seconds = latency_seconds
+    genai.GenerativeModel = FakeGenerativeModel
+
+def make_text_document(paragraphs: int) -> str:
+    """Plain text reference material of a given length"""
+    lines: List[str] = []
+    for i in range(paragraphs):
+        topic = WORDS[i % len(WORDS)]
+        lines.append(
+            f"Section {i + 1}: {topic}. "
+            + " ".join(WORDS[(i + j) % len(WORDS)] for j in range(60))
+            + f". Example {i}: value = {i * 7 % 97}."
+        )
+    return "\n\n".join(lines)
+
+def make_pdf_document(pages: int, lines_per_page: int = 40) -> bytes:
+    """A minimal multi-page PDF with one Helvetica text stream per page"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(pages))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    font_ref = 3 + 2 * pages
+    for page in range(pages):
+        lines = [
+            f"Page {page + 1} line {line}: " + " ".join(WORDS[(page + line + k) % len(WORDS)] for k in range(10))
+            for line in range(lines_per_page)
+        ]
+        stream = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 {font_ref} 0 R >> >> /Contents {4 + 2 * page} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    output = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    output += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    return output
+
+def make_chat_history(exchanges: int, subject: str = "Python Programming") -> List[dict]:
+    """Synthetic chat history with Markdown answers"""
+    history = []
+    for i in range(exchanges):
+        answer = (
+            f"## Step {i}\n\nHere is **an explanation** with `inline code` and $x^{i % 5}$.\n\n"
+            f"- point one\n- point two\n\n```python\nprint({i})\n```\n\n"
+            + " ".join(WORDS[(i + j) % len(WORDS)] for j in range(80))
+        )
+        history.append({
+            "id": f"bench-{i}",
+            "question": f"Question {i}: how does {WORDS[i % len(WORDS)]} work?",
+            "answer": answer,
+            "subject": subject,
+            "timestamp": 1700000000 + i * 60,
+        })
+    return history
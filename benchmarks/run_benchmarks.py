@@ -0,0 +1,287 @@
+"""
+Benchmark suite for the AI Educational Tutor's hot paths.
+
+Runs offline against a deterministic fake model and writes machine-readable
+timings and peak memory, so results can be compared between commits:
+
+    python benchmarks/run_benchmarks.py --output before.json
+    python benchmarks/run_benchmarks.py --compare before.json
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import install_fake_model, make_chat_history, make_pdf_document, make_text_document
+
+BENCHMARKS = []
+
+def benchmark(name: str, **params):
+    """Register a benchmark; the decorated function returns the callable to time"""
+    def register(setup: Callable[..., Callable[[], object]]):
+        BENCHMARKS.append((name, params, setup))
+        return setup
+    return register
+
+def isolate_application_state(state_dir: str) -> None:
+    """Point every on-disk cache at a scratch directory and remove throttling"""
+    import config
+    config.CACHE_CONFIG.update({"enabled": False, "semantic_enabled": False,
+                                "disk_path": os.path.join(state_dir, "responses.sqlite3")})
+    config.DOCUMENT_CACHE_CONFIG.update({"enabled": False, "directory": os.path.join(state_dir, "documents")})
+    config.SESSION_STORE_CONFIG.update({"enabled": False, "path": os.path.join(state_dir, "sessions.sqlite3")})
+    config.PREGENERATED_CONFIG.update({"enabled": False, "path": os.path.join(state_dir, "pregenerated.sqlite3")})
+    config.RETRIEVAL_CONFIG["dense_index_dir"] = os.path.join(state_dir, "dense_index")
+    config.CONTEXT_CACHE_CONFIG.update({"enabled": True, "backend": "local"})
+    config.DISPATCHER_CONFIG.update({"requests_per_minute": 1000000, "tokens_per_minute": 10 ** 12})
+    config.MEMORY_CONFIG["enabled"] = False
+
+class UploadedFile(io.BytesIO):
+    """BytesIO with the name attribute Streamlit uploads carry"""
+
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+
+# --- Prompt assembly -------------------------------------------------------
+
+@benchmark("create_system_prompt", history=5, reference_paragraphs=0)
+@benchmark("create_system_prompt", history=5, reference_paragraphs=200)
+@benchmark("create_system_prompt", history=5, reference_paragraphs=2000)
+def bench_create_system_prompt(history: int, reference_paragraphs: int):
+    from app import EducationalTutor
+    from reference_store import ReferenceStore
+    tutor = EducationalTutor()
+    chat_history = make_chat_history(history)
+    references = ReferenceStore()
+    if reference_paragraphs:
+        references.add("notes.txt", make_text_document(reference_paragraphs))
+    counter = iter(range(10 ** 9))
+    return lambda: tutor.create_system_prompt(
+        "Python Programming", chat_history, references, question=f"How do loops work? ({next(counter)})"
+    )
+
+@benchmark("get_response", history=5, answer_words=200)
+def bench_get_response(history: int, answer_words: int):
+    from app import EducationalTutor
+    from reference_store import ReferenceStore
+    install_fake_model(answer_words=answer_words)
+    tutor = EducationalTutor()
+    chat_history = make_chat_history(history)
+    counter = iter(range(10 ** 9))
+    return lambda: tutor.get_response(
+        f"Explain recursion, attempt {next(counter)}", "Python Programming", chat_history, ReferenceStore()
+    )
+
+# --- Document extraction ---------------------------------------------------
+
+@benchmark("extract_text_from_txt", paragraphs=100)
+@benchmark("extract_text_from_txt", paragraphs=1000)
+@benchmark("extract_text_from_txt", paragraphs=10000)
+def bench_extract_txt(paragraphs: int):
+    from documents import extract_text_from_txt
+    upload = UploadedFile(make_text_document(paragraphs).encode("utf-8"), "notes.txt")
+    return lambda: extract_text_from_txt(upload)
+
+@benchmark("extract_text_from_pdf", pages=4)
+@benchmark("extract_text_from_pdf", pages=32)
+@benchmark("extract_text_from_pdf", pages=128)
+def bench_extract_pdf(pages: int):
+    from documents import extract_text_from_pdf
+    upload = UploadedFile(make_pdf_document(pages), "notes.pdf")
+    return lambda: extract_text_from_pdf(upload)
+
+# --- Chat rendering ----------------------------------------------------------
+
+@benchmark("render_chat_fragments", exchanges=20, warm=False)
+@benchmark("render_chat_fragments", exchanges=20, warm=True)
+@benchmark("render_chat_fragments", exchanges=200, warm=True)
+def bench_render_fragments(exchanges: int, warm: bool):
+    from rendering import RenderedExchangeCache
+    history = make_chat_history(exchanges)
+    cache = RenderedExchangeCache(max_entries=exchanges * 2)
+    if warm:
+        cache.render_many(history)
+        return lambda: cache.render_many(history)
+    # A fresh cache each call measures the first render of every exchange
+    return lambda: RenderedExchangeCache(max_entries=exchanges * 2).render_many(history)
+
+@benchmark("main_rerun", exchanges=0)
+@benchmark("main_rerun", exchanges=100)
+@benchmark("main_rerun", exchanges=1000)
+def bench_main_rerun(exchanges: int):
+    from streamlit.testing.v1 import AppTest
+    app_test = AppTest.from_file(os.path.join(REPO_ROOT, "app.py"), default_timeout=120)
+    app_test.session_state["chat_history"] = make_chat_history(exchanges)
+    app_test.run()
+    if app_test.exception:
+        raise RuntimeError(app_test.exception[0].message)
+    return app_test.run
+
+# --- Export and validation -------------------------------------------------
+
+@benchmark("export_chat_history", exchanges=100)
+@benchmark("export_chat_history", exchanges=1000)
+@benchmark("export_chat_history", exchanges=10000)
+def bench_export(exchanges: int):
+    from utils import export_chat_history
+    history = make_chat_history(exchanges)
+    return lambda: export_chat_history(history, "Python Programming")
+
+@benchmark("export_ndjson_gzip", exchanges=10000)
+def bench_export_stream(exchanges: int):
+    from history_export import write_export
+    history = make_chat_history(exchanges)
+    return lambda: write_export(enumerate(history, 1), "Python Programming", io.BytesIO(), "ndjson", "gzip")
+
+@benchmark("validate_question", length=20)
+@benchmark("validate_question", length=900)
+def bench_validate_question(length: int):
+    from utils import validate_question
+    question = ("What is a list comprehension? " * (length // 30 + 1))[:length]
+    return lambda: validate_question(question)
+
+# --- Runner ------------------------------------------------------------------
+
+def measure(setup: Callable[..., Callable[[], object]], params: Dict, repeat: int, min_time: float) -> Dict:
+    """Time a benchmark, then measure its peak allocation in one traced run"""
+    target = setup(**params)
+    target()  # warm-up: imports, lazy singletons, first-call caches
+
+    # Short operations are looped so each sample is long enough to time reliably
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            target()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 10
+
+    samples = []
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(loops):
+                target()
+            samples.append((time.perf_counter() - start) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        target()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "stdev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "peak_bytes": peak,
+    }
+
+def git_revision() -> Optional[str]:
+    """Current commit of the repository, if available"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def result_key(result: Dict) -> str:
+    """Identity of a benchmark case across runs"""
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+def compare(results: List[Dict], baseline_path: str) -> None:
+    """Print the change in median time and peak memory against a previous run"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {result_key(result): result for result in json.load(f)["results"]}
+    print(f"{'benchmark':<60} {'median':>12} {'change':>9} {'peak KiB':>10} {'change':>9}", file=sys.stderr)
+    for result in results:
+        name = f"{result['name']} {json.dumps(result['params'], sort_keys=True)}"
+        before = baseline.get(result_key(result))
+        if "error" in result:
+            print(f"{name:<60} error: {result['error']}", file=sys.stderr)
+            continue
+        time_change = f"{result['median_s'] / before['median_s'] - 1:+.1%}" if before and "median_s" in before else "new"
+        peak_change = (f"{result['peak_bytes'] / before['peak_bytes'] - 1:+.1%}"
+                       if before and before.get("peak_bytes") else "new")
+        print(f"{name:<60} {result['median_s'] * 1000:>10.3f}ms {time_change:>9} "
+              f"{result['peak_bytes'] / 1024:>10.1f} {peak_change:>9}", file=sys.stderr)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the tutor's hot paths with a fake model")
+    parser.add_argument("--filter", "-k", default="", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed samples per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per sample")
+    parser.add_argument("--quick", action="store_true", help="Fewer, shorter samples")
+    parser.add_argument("--output", "-o", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.repeat, args.min_time = 3, 0.01
+
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+    install_fake_model()
+    with tempfile.TemporaryDirectory(prefix="tutor-bench-") as state_dir:
+        isolate_application_state(state_dir)
+        results = []
+        for name, params, setup in BENCHMARKS:
+            if args.filter not in name:
+                continue
+            print(f"running {name} {params}", file=sys.stderr)
+            result = {"name": name, "params": params}
+            try:
+                result.update(measure(setup, params, args.repeat, args.min_time))
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+            results.append(result)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        compare(results, args.compare)
+    return 1 if any("error" in result for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Cold-start benchmark for the AI Educational Tutor.
+
+Times `import app` in fresh interpreters, lists the slowest imports from
+`python -X importtime`, and checks the result against startup_budget.json:
+the median import time must stay under the budget and none of the deferred
+modules (model SDK, PDF parser, ...) may be loaded at start-up.
+
+    python benchmarks/startup.py                 # report and check the budget
+    python benchmarks/startup.py --output startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+
+# Run in the child interpreter: time the import and report which modules it loaded
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+def _child_env() -> Dict[str, str]:
+    """Environment for child interpreters: offline, no profiling, no bytecode writes"""
+    env = dict(os.environ)
+    env.update({"PYTHONDONTWRITEBYTECODE": "1", "TUTOR_PROFILE": ""})
+    return env
+
+def time_import(module: str) -> Dict:
+    """Import a module in a fresh interpreter and return its time and loaded modules"""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        cwd=REPO_ROOT, env=_child_env(), capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def slowest_imports(module: str, top: int = 15) -> List[Dict]:
+    """Modules with the largest cumulative import time according to -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=_child_env(), capture_output=True, text=True, check=True
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:  self [us] | cumulative | imported package"
+        self_field, cumulative_us, name = line.split("|")
+        self_us = self_field.split(":")[1]
+        timings.append({"module": name.strip(), "self_ms": int(self_us) / 1000,
+                        "cumulative_ms": int(cumulative_us) / 1000})
+    return sorted(timings, key=lambda timing: timing["cumulative_ms"], reverse=True)[:top]
+
+def check_budget(median_seconds: float, loaded: List[str], budget: Dict) -> List[str]:
+    """Budget violations, as human-readable messages"""
+    violations = []
+    if median_seconds > budget["max_import_seconds"]:
+        violations.append(
+            f"import {budget['module']} took {median_seconds:.3f}s (budget {budget['max_import_seconds']:.3f}s)"
+        )
+    for deferred in budget.get("deferred_modules", []):
+        if any(name == deferred or name.startswith(deferred + ".") for name in loaded):
+            violations.append(f"{deferred} is imported at start-up but should load on first use")
+    return violations
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure the tutor's cold-start import time against a budget")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--budget", default=BUDGET_PATH, help="Budget JSON file")
+    parser.add_argument("--output", "-o", help="Write results JSON here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    with open(args.budget, "r", encoding="utf-8") as f:
+        budget = json.load(f)
+    module = budget.get("module", "app")
+
+    # The first run warms the OS file cache and bytecode; it is not counted
+    time_import(module)
+    runs = [time_import(module) for _ in range(args.runs)]
+    samples = [run["seconds"] for run in runs]
+    median_seconds = statistics.median(samples)
+    violations = check_budget(median_seconds, runs[-1]["modules"], budget)
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "module": module,
+        "runs": len(samples),
+        "min_s": min(samples),
+        "median_s": median_seconds,
+        "max_s": max(samples),
+        "budget": budget,
+        "slowest_imports": slowest_imports(module),
+        "violations": violations,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    for violation in violations:
+        print(f"over budget: {violation}", file=sys.stderr)
+    return 1 if violations else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
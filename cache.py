@@ -0,0 +1,174 @@
+"""
+Response caching for the AI Educational Tutor application.
+
+Answers are cached in two tiers: a bounded in-process LRU with a TTL, backed by
+an on-disk SQLite store that every Streamlit worker process on the host shares.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Optional
+
+from config import API_CONFIG, CACHE_CONFIG
+
+def normalize_question(question: str) -> str:
+    """Normalize question text so trivial variations share a cache entry"""
+    normalized = re.sub(r"\s+", " ", question.strip().casefold())
+    return normalized.rstrip("?!. ")
+
+def hash_text(text: str) -> str:
+    """Return a stable hex digest for arbitrary text"""
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+def make_context_fingerprint(subject_context: str, reference_content: str, chat_history: List[Dict]) -> str:
+    """Hash the subject context, reference material and history window that shape an answer"""
+    max_history = API_CONFIG["max_chat_history"]
+    history_window = [
+        [exchange["question"], exchange["answer"]]
+        for exchange in chat_history[-max_history:]
+    ] if chat_history else []
+    return hash_text(
+        hash_text(subject_context or "") + hash_text(reference_content or "")
+        + hash_text(json.dumps(history_window, ensure_ascii=False))
+    )
+
+def make_cache_key(subject: str, subject_context: str, question: str, reference_content: str, chat_history: List[Dict]) -> str:
+    """Build a cache key from subject and its context, question, reference material and history window"""
+    # Custom subjects can share a name across sessions while describing different contexts
+    parts = [
+        subject,
+        normalize_question(question),
+        make_context_fingerprint(subject_context, reference_content, chat_history),
+    ]
+    return hash_text("\x1f".join(parts))
+
+class ResponseCache:
+    """Two-tier (memory LRU + SQLite) cache of model answers"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600, disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        if self.disk_path:
+            self._init_disk()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the shared on-disk tier"""
+        return sqlite3.connect(self.disk_path, timeout=5)
+
+    def _init_disk(self) -> None:
+        """Create the on-disk table if it does not exist yet"""
+        directory = os.path.dirname(self.disk_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, answer TEXT NOT NULL, created REAL NOT NULL)"
+            )
+
+    def _is_fresh(self, created: float) -> bool:
+        """Check whether an entry created at the given time is still valid"""
+        return (time.time() - created) < self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached answer, or None on a miss"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                answer, created = entry
+                if self._is_fresh(created):
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return answer
+                del self._memory[key]
+
+        if self.disk_path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT answer, created FROM responses WHERE key = ?", (key,)
+                    ).fetchone()
+            except sqlite3.Error:
+                row = None
+            if row is not None and self._is_fresh(row[1]):
+                with self._lock:
+                    self._remember(key, row[0], row[1])
+                    self._stats["disk_hits"] += 1
+                return row[0]
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, key: str, answer: str) -> None:
+        """Store an answer in both tiers"""
+        created = time.time()
+        with self._lock:
+            self._remember(key, answer, created)
+            self._stats["stores"] += 1
+
+        if self.disk_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, answer, created) VALUES (?, ?, ?)",
+                        (key, answer, created)
+                    )
+                    conn.execute(
+                        "DELETE FROM responses WHERE created < ?", (created - self.ttl_seconds,)
+                    )
+            except sqlite3.Error:
+                # The disk tier is best-effort; the memory tier still holds the answer
+                pass
+
+    def _remember(self, key: str, answer: str, created: float) -> None:
+        """Insert into the memory tier, evicting the least recently used entries"""
+        self._memory[key] = (answer, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached answer from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters for this process"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["lookups"] = lookups
+        return stats
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache, or None when caching is disabled"""
+    global _response_cache
+    if not CACHE_CONFIG.get("enabled", True):
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                max_entries=CACHE_CONFIG["memory_max_entries"],
+                ttl_seconds=CACHE_CONFIG["ttl_seconds"],
+                disk_path=CACHE_CONFIG.get("disk_path")
+            )
+        return _response_cache
@@ -3,6 +3,8 @@ Configuration file for the AI Educational Tutor application.
 This file contains all the configurable settings and constants.
 """
 
+import os
+
 # Application Configuration
 APP_CONFIG = {
     "page_title": "AI Educational Tutor",
@@ -11,12 +13,176 @@ APP_CONFIG = {
     "initial_sidebar_state": "expanded"
 }
 
+# Chat Display Configuration
+UI_CONFIG = {
+    "chat_page_size": 20,            # Exchanges rendered per rerun; "Load earlier" adds another page
+    "rendered_cache_max_entries": 2000  # Pre-rendered exchange HTML fragments kept in memory
+}
+
+# Session Persistence Configuration
+SESSION_STORE_CONFIG = {
+    "enabled": True,
+    "path": ".cache/sessions.sqlite3",  # Shared by every Streamlit session (WAL mode)
+    "initial_load": 100,             # Most recent exchanges loaded when a session is restored
+    "page_size": 50                  # Older exchanges fetched per "Load earlier" click
+}
+
+# Chat History Export Configuration
+EXPORT_CONFIG = {
+    "buffer_bytes": 65536            # Serialized bytes gathered before each compress/write
+}
+
 # API Configuration
 API_CONFIG = {
     "model_name": "gemini-2.0-flash-exp",
+    "fallback_model_name": "gemini-pro",  # Used when the primary model is not available
     "max_chat_history": 5,  # Number of previous Q&A pairs to include in context
     "max_tokens": 8192,     # Maximum tokens for the model
-    "temperature": 0.7      # Response creativity (0.0 to 1.0)
+    "temperature": 0.7,     # Response creativity (0.0 to 1.0)
+    "stream_responses": True  # Render answers token-by-token as they are generated
+}
+
+# PDF Extraction Configuration
+PDF_CONFIG = {
+    "parallel_min_pages": 16,        # Smaller PDFs are extracted on the script thread
+    "max_pages_per_task": 16,        # Upper bound on pages handed to one worker at a time
+    "max_workers": None              # Worker processes (None uses every CPU core)
+}
+
+# Extracted Document Cache Configuration
+DOCUMENT_CACHE_CONFIG = {
+    "enabled": True,
+    "directory": ".cache/documents"  # Shared by every session and worker process
+}
+
+# Reference Retrieval Configuration
+RETRIEVAL_CONFIG = {
+    "mode": "bm25",                  # "bm25" (lexical), "dense" (vector) or "hybrid" (both, fused)
+    "chunk_size": 500,               # Characters per indexed chunk of reference material
+    "chunk_overlap": 100,            # Characters shared between neighbouring chunks
+    "top_k": 12,                     # Candidate chunks per question (the prompt budget decides how many fit)
+    "bm25_k1": 1.5,
+    "bm25_b": 0.75,
+    "dense_dim": 768,                # Size of the local chunk embeddings
+    "dense_index_dir": ".cache/dense_index"  # Memory-mapped .npy indexes shared across processes
+}
+
+# Prompt Budget Configuration
+PROMPT_CONFIG = {
+    "max_input_tokens": 8000,        # Input-token budget per request
+    "max_reference_share": 0.6,      # Share of the budget left after system prompt and question for references
+    "max_answer_tokens": 150         # Tokens kept from each earlier answer in the history section
+}
+
+# Conversation Summary Memory Configuration
+MEMORY_CONFIG = {
+    "enabled": True,
+    "max_summary_tokens": 300,       # Size cap of the running summary per subject
+    "fold_every": 5,                 # Summarize once this many exchanges are waiting (one model call per N questions)
+    "fold_input_tokens": 4000,       # Exchange tokens sent per summarizer call (below PROMPT_CONFIG's budget)
+    "fold_answer_tokens": 400,       # Tokens kept from each answer handed to the summarizer
+    "max_fold_calls": 2,             # Summarizer calls per fold; a longer backlog is condensed without the model
+    "summary_workers": 2             # Background threads computing summaries per process
+}
+
+SUMMARY_PROMPT_TEMPLATE = """You maintain a running summary of a tutoring conversation about {subject}.
+
+Current summary:
+{previous_summary}
+
+New exchanges to fold in:
+{exchanges}
+
+Write the updated summary in at most {max_words} words. Keep the topics covered, what the student
+struggled with, and any facts or preferences they stated. Use short bullet points and no preamble."""
+
+# Upstream Context Cache Configuration (system prompt + reference material prefix)
+CONTEXT_CACHE_CONFIG = {
+    "enabled": os.getenv("TUTOR_CONTEXT_CACHE") == "1",  # Off unless TUTOR_CONTEXT_CACHE=1; needs google-generativeai>=0.7.0
+    "backend": "gemini",             # "gemini" (provider cached contents) or "local" (offline stand-in)
+    "model_name": "gemini-1.5-flash-002",  # Versioned model with cached-content support (None uses API_CONFIG model)
+    "ttl_seconds": 600,              # Lifetime of a cached prefix, extended while it is in use
+    "refresh_margin_seconds": 60,    # Extend the TTL when less than this remains
+    "min_tokens": 4096,              # Provider minimum; smaller prefixes are sent inline
+    "max_tokens": 16000,             # Budget for the cached prefix; material beyond it is retrieved per question
+    "max_request_tokens": 20000,     # Budget for cached prefix plus per-question suffix together
+    "max_handles": 32                # Live cached prefixes per process (oldest deleted first)
+}
+
+# Request Dispatcher Configuration (keep below the project's Gemini quota)
+DISPATCHER_CONFIG = {
+    "requests_per_minute": 15,       # Requests-per-minute token bucket
+    "tokens_per_minute": 1000000,    # Input-tokens-per-minute token bucket
+    "max_concurrency": 4,            # Model calls in flight at once per process
+    "max_retries": 4,                # Retries for quota, timeout and unavailable errors
+    "base_delay_seconds": 1.0,       # First backoff step (doubled each retry, full jitter)
+    "max_delay_seconds": 30.0,       # Upper bound for a single backoff sleep
+    "request_timeout_seconds": 180   # Give up waiting for a queued call after this long
+}
+
+# Batch Answering Configuration (batch_answer.py command line)
+BATCH_CONFIG = {
+    "workers": 8,                    # Questions answered concurrently (also raises the dispatcher's concurrency)
+    "pending_per_worker": 2,         # Questions read ahead of the workers, so huge inputs are streamed
+    "progress_every": 25             # Print a progress line after this many results
+}
+
+# HTTP API Server Configuration (api_server.py)
+API_SERVER_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8080,
+    "max_concurrent_requests": 32,   # Questions answered at once; each holds a worker thread
+    "max_queued_requests": 512,      # Questions waiting for a slot before new ones get 503
+    "max_sessions": 10000,           # Sessions kept in memory; the least recently used are dropped
+    "session_idle_seconds": 3600,    # Drop in-memory sessions idle this long (persisted history is reloaded)
+    "max_upload_bytes": 20 * 1024 * 1024,  # Largest accepted request body (reference uploads)
+    "token": os.getenv("TUTOR_API_TOKEN")  # When set, every route but /health needs "Authorization: Bearer <token>"
+}
+
+# Metrics Configuration
+METRICS_CONFIG = {
+    "enabled": True,
+    "reservoir_size": 1024,          # Recent samples per phase used for p50/p95/p99
+    "admin_panel": os.getenv("TUTOR_ADMIN_PANEL") == "1",  # Sidebar metrics panel; off unless TUTOR_ADMIN_PANEL=1
+    "host": "127.0.0.1",             # Prometheus endpoint (http://host:port/metrics); local only
+    "port": 9464                     # None disables the endpoint
+}
+
+# Profiling Configuration (opt-in per process through environment variables)
+PROFILING_CONFIG = {
+    "mode": os.getenv("TUTOR_PROFILE", ""),                       # "cprofile" or "sample"; empty disables
+    "directory": os.getenv("TUTOR_PROFILE_DIR", ".cache/profiles"),
+    "keep": int(os.getenv("TUTOR_PROFILE_KEEP", "50")),           # Most recent reruns kept on disk
+    "sample_interval_seconds": 0.005                              # Stack sampling period in "sample" mode
+}
+
+# Response Cache Configuration
+CACHE_CONFIG = {
+    "enabled": True,
+    "memory_max_entries": 256,                   # Answers kept in the in-process LRU
+    "ttl_seconds": 3600,                         # How long a cached answer stays valid
+    "disk_path": ".cache/responses.sqlite3",     # Shared on-disk tier (None to disable)
+    "semantic_enabled": True,                    # Reuse answers for reworded questions
+    "semantic_threshold": 0.95,                  # Minimum cosine similarity for a semantic hit
+    "semantic_excluded_subjects": ["Basic Algebra", "Calculus"],  # Exact matches only: rewordings change the math
+    "semantic_max_entries_per_subject": 128,     # Questions remembered per subject/context
+    "semantic_max_subjects": 64,                 # Subject/context buckets kept in memory
+    "semantic_dim": 512                          # Size of the local hashing embeddings
+}
+
+# Pre-generated Answers Configuration (pregenerate.py fills the store, the app serves from it)
+PREGENERATED_CONFIG = {
+    "enabled": True,
+    "path": ".cache/pregenerated.sqlite3",   # Shared by every session and worker process
+    "serve_with_history": True,      # Also serve stored answers mid-conversation (never with reference documents)
+    "collect_custom_subjects": False,  # Record users' custom subjects for the next pre-generation run (5 model calls each)
+    "max_custom_subjects": 200,      # Most (name, context) pairs recorded; later ones are ignored
+    "workers": 4                     # Example questions generated concurrently
+}
+
+# In-flight Request Coalescing Configuration
+SINGLE_FLIGHT_CONFIG = {
+    "enabled": True                  # Identical questions pending at the same time share one model call
 }
 
 # Subject Configuration
@@ -0,0 +1,260 @@
+"""
+Provider-side context caching for the AI Educational Tutor application.
+
+For a given subject and set of reference material the system prompt and the
+reference text never change between questions. That prefix, with the material
+cut to a token budget, is uploaded once as Gemini cached content and later
+requests send only the changing suffix (chunks retrieved from material beyond
+the budget, summary, history and question). Handles are tracked with their
+TTL, extended before they expire, and deleted when evicted. A local backend
+stands in for the provider so the flow can be exercised offline.
+"""
+
+import datetime
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from config import CONTEXT_CACHE_CONFIG
+from token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+PrefixBuilder = Callable[[], Tuple[str, str, bool]]  # -> (system instruction, cached user content, complete)
+
+class CachedPrefix(NamedTuple):
+    """A model bound to a cached prefix, the prefix size and whether it holds all the material"""
+    model: Any
+    tokens: int
+    complete: bool
+
+class GeminiContextCacheBackend:
+    """Cached contents stored by the Gemini API"""
+
+    def __init__(self, client):
+        self.client = client
+        self.generation_config = client.generation_config
+
+    def create(self, model_name: str, system_instruction: str, content: str, ttl_seconds: float):
+        """Upload the prefix and return a cached-content handle"""
+        from google.generativeai import caching
+        # The client configures the SDK with the API key when its model is first created
+        self.client.model
+        model_path = model_name if model_name.startswith("models/") else f"models/{model_name}"
+        return caching.CachedContent.create(
+            model=model_path,
+            system_instruction=system_instruction,
+            contents=[content] if content else None,
+            ttl=datetime.timedelta(seconds=ttl_seconds)
+        )
+
+    def refresh(self, handle, ttl_seconds: float) -> None:
+        """Extend a handle's TTL"""
+        handle.update(ttl=datetime.timedelta(seconds=ttl_seconds))
+
+    def delete(self, handle) -> None:
+        """Delete a handle on the provider"""
+        handle.delete()
+
+    def model_for(self, handle):
+        """A model that answers with the cached prefix in front of every prompt"""
+        import google.generativeai as genai
+        return genai.GenerativeModel.from_cached_content(
+            cached_content=handle, generation_config=self.generation_config
+        )
+
+class LocalCachedModel:
+    """Stand-in for a cached-content model: prepends the stored prefix locally"""
+
+    def __init__(self, client, system_instruction: str, content: str):
+        self.client = client
+        self.prefix = "\n\n".join(part for part in (system_instruction, content) if part) + "\n\n"
+
+    def generate_content(self, prompt, **kwargs):
+        """Send prefix plus prompt through the regular client"""
+        return self.client.generate_content(self.prefix + prompt, **kwargs)
+
+class LocalContextCacheBackend:
+    """Offline backend with the same lifecycle as the provider's cached contents"""
+
+    def __init__(self, client):
+        self.client = client
+        self.handles = {}
+        self._ids = itertools.count(1)
+
+    def create(self, model_name: str, system_instruction: str, content: str, ttl_seconds: float):
+        """Store the prefix in memory and return a handle name"""
+        name = f"cachedContents/local-{next(self._ids)}"
+        self.handles[name] = (system_instruction, content)
+        return name
+
+    def refresh(self, handle, ttl_seconds: float) -> None:
+        """Local handles never expire on their own"""
+        if handle not in self.handles:
+            raise KeyError(handle)
+
+    def delete(self, handle) -> None:
+        """Forget a stored prefix"""
+        self.handles.pop(handle, None)
+
+    def model_for(self, handle):
+        """A model that prepends the stored prefix"""
+        system_instruction, content = self.handles[handle]
+        return LocalCachedModel(self.client, system_instruction, content)
+
+class ContextCacheManager:
+    """Create, reuse, refresh and evict cached prefixes keyed by their content"""
+
+    def __init__(self, backend, ttl_seconds: float = 600, refresh_margin_seconds: float = 60,
+                 min_tokens: int = 4096, max_tokens: int = 500000, max_handles: int = 32,
+                 retry_after_seconds: float = 300):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.max_handles = max_handles
+        self.retry_after_seconds = retry_after_seconds
+        self._entries = OrderedDict()  # key -> {"handle", "prefix", "expires_at"}
+        self._ineligible = {}          # key -> time after which creation may be retried
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "created": 0, "refreshed": 0, "evicted": 0, "ineligible": 0, "errors": 0}
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        """Per-key lock so only one request uploads a given prefix"""
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _drop_key_lock(self, key: str) -> None:
+        """Forget the lock of a key without a live handle, unless a request holds it"""
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is not None and key not in self._entries and not lock.locked():
+                del self._key_locks[key]
+
+    def get_model(self, key: str, model_name: str, build_prefix: PrefixBuilder) -> Optional[CachedPrefix]:
+        """Return the model bound to the cached prefix, or None to send the full prompt"""
+        try:
+            with self._key_lock(key):
+                return self._get_model(key, model_name, build_prefix)
+        finally:
+            # Ineligible and evicted keys must not keep their locks forever
+            self._drop_key_lock(key)
+
+    def _get_model(self, key: str, model_name: str, build_prefix: PrefixBuilder) -> Optional[CachedPrefix]:
+        """Body of get_model, run under the key's lock"""
+        now = time.time()
+        with self._lock:
+            if self._ineligible.get(key, 0) > now:
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None:
+            if entry["expires_at"] - now > self.refresh_margin_seconds:
+                self._count("hits")
+                return entry["prefix"]
+            try:
+                self.backend.refresh(entry["handle"], self.ttl_seconds)
+                entry["expires_at"] = now + self.ttl_seconds
+                self._count("refreshed")
+                return entry["prefix"]
+            except Exception:
+                # The handle expired or was deleted upstream; create a new one below
+                with self._lock:
+                    self._entries.pop(key, None)
+
+        system_instruction, content, complete = build_prefix()
+        tokens = count_tokens(system_instruction) + count_tokens(content)
+        if not self.min_tokens <= tokens <= self.max_tokens:
+            # The provider rejects prefixes outside these bounds
+            self._mark_ineligible(key, now, "ineligible")
+            return None
+        try:
+            handle = self.backend.create(model_name, system_instruction, content, self.ttl_seconds)
+            model = self.backend.model_for(handle)
+        except Exception as e:
+            logger.warning("Creating cached content on %s failed, sending full prompts for %ss: %s",
+                           model_name, self.retry_after_seconds, e)
+            self._mark_ineligible(key, now, "errors")
+            return None
+
+        prefix = CachedPrefix(model, tokens, complete)
+        with self._lock:
+            self._entries[key] = {"handle": handle, "prefix": prefix, "expires_at": now + self.ttl_seconds}
+            self._stats["created"] += 1
+            evicted = []
+            while len(self._entries) > self.max_handles:
+                evicted.append(self._entries.popitem(last=False))
+        for old_key, old in evicted:
+            self._delete(old)
+            self._drop_key_lock(old_key)
+        return prefix
+
+    def _mark_ineligible(self, key: str, now: float, reason: str) -> None:
+        """Skip caching this prefix for a while"""
+        with self._lock:
+            if len(self._ineligible) >= 1024:
+                self._ineligible = {k: t for k, t in self._ineligible.items() if t > now}
+            self._ineligible[key] = now + self.retry_after_seconds
+            self._stats[reason] += 1
+
+    def _count(self, name: str) -> None:
+        """Increment a counter"""
+        with self._lock:
+            self._stats[name] += 1
+
+    def _delete(self, entry: Dict) -> None:
+        """Best-effort deletion of an evicted handle"""
+        try:
+            self.backend.delete(entry["handle"])
+        except Exception:
+            pass
+        self._count("evicted")
+
+    def clear(self) -> None:
+        """Delete every tracked handle"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._ineligible.clear()
+            self._key_locks = {k: lock for k, lock in self._key_locks.items() if lock.locked()}
+        for entry in entries:
+            self._delete(entry)
+
+    def stats(self) -> Dict[str, int]:
+        """Return lifecycle counters and the number of live handles"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["live_handles"] = len(self._entries)
+            stats["cached_tokens"] = sum(entry["prefix"].tokens for entry in self._entries.values())
+        return stats
+
+_context_cache = None
+_context_cache_lock = threading.Lock()
+
+def get_context_cache(client) -> Optional[ContextCacheManager]:
+    """Return the process-wide context cache manager, or None when disabled"""
+    global _context_cache
+    if not CONTEXT_CACHE_CONFIG.get("enabled", True):
+        return None
+    with _context_cache_lock:
+        if _context_cache is None:
+            if CONTEXT_CACHE_CONFIG.get("backend", "gemini") == "local":
+                backend = LocalContextCacheBackend(client)
+            else:
+                backend = GeminiContextCacheBackend(client)
+            _context_cache = ContextCacheManager(
+                backend,
+                ttl_seconds=CONTEXT_CACHE_CONFIG["ttl_seconds"],
+                refresh_margin_seconds=CONTEXT_CACHE_CONFIG["refresh_margin_seconds"],
+                min_tokens=CONTEXT_CACHE_CONFIG["min_tokens"],
+                max_tokens=CONTEXT_CACHE_CONFIG["max_tokens"],
+                max_handles=CONTEXT_CACHE_CONFIG["max_handles"]
+            )
+        return _context_cache
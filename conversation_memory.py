@@ -0,0 +1,157 @@
+"""
+Rolling conversation summaries for the AI Educational Tutor application.
+
+Exchanges that fall out of the verbatim history window are folded into a
+compact running summary per subject. Folding happens on a background thread,
+so the user never waits for it; the next prompt simply picks up the newer summary.
+Exchanges are folded every few questions rather than on each one, in batches
+that fit an input-token budget, and until then appear in the summary as
+one-line extracts. A long backlog (a restored session) is condensed without
+the model except for its newest batches.
+"""
+
+import concurrent.futures
+import threading
+from typing import Callable, Dict, List, Optional
+
+from config import MEMORY_CONFIG
+from token_counter import count_tokens, truncate_to_tokens
+
+Summarizer = Callable[[str, str, List[Dict]], str]
+
+_summary_executor = None
+_summary_executor_lock = threading.Lock()
+
+def get_summary_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Return the process-wide pool that computes summaries"""
+    global _summary_executor
+    with _summary_executor_lock:
+        if _summary_executor is None:
+            _summary_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=MEMORY_CONFIG["summary_workers"], thread_name_prefix="summary"
+            )
+        return _summary_executor
+
+def extractive_summary(previous_summary: str, exchanges: List[Dict], max_tokens: int) -> str:
+    """Summary without a model: one line per exchange, keeping the newest lines that fit"""
+    lines = previous_summary.splitlines() if previous_summary else []
+    for exchange in exchanges:
+        first_sentence = exchange["answer"].strip().split(". ")[0].replace("\n", " ")
+        lines.append(f"- Asked: {exchange['question']} | Covered: {first_sentence}")
+    summary = "\n".join(lines)
+    while lines and truncate_to_tokens(summary, max_tokens) != summary:
+        lines.pop(0)
+        summary = "\n".join(lines)
+    return summary
+
+class ConversationMemory:
+    """Per-session running summaries of older exchanges, one per subject"""
+
+    def __init__(self, summarizer: Optional[Summarizer] = None, window: int = 5, max_summary_tokens: int = 300,
+                 fold_every: int = 5, fold_input_tokens: int = 4000, fold_answer_tokens: int = 400,
+                 max_fold_calls: int = 2):
+        self.summarizer = summarizer
+        self.window = window
+        self.max_summary_tokens = max_summary_tokens
+        self.fold_every = fold_every
+        self.fold_input_tokens = fold_input_tokens
+        self.fold_answer_tokens = fold_answer_tokens
+        self.max_fold_calls = max_fold_calls
+        self._summaries = {}
+        self._pending = {}        # subject -> exchanges waiting to be folded in
+        self._subject_locks = {}
+        self._folded_upto = 0     # index into chat_history of the first exchange not yet handed off
+        self._generation = 0      # bumped on reset so in-flight folds don't resurrect old summaries
+        self._lock = threading.Lock()
+
+    def get_summary(self, subject: str) -> str:
+        """Return the latest summary for a subject, with one-line extracts of exchanges not yet folded"""
+        with self._lock:
+            summary = self._summaries.get(subject, "")
+            pending = list(self._pending.get(subject, []))
+        if not pending:
+            return summary
+        extracts = extractive_summary("", pending, self.max_summary_tokens)
+        return f"{summary}\n{extracts}" if summary else extracts
+
+    def reset(self) -> None:
+        """Forget every summary (e.g. after the chat history is cleared)"""
+        with self._lock:
+            self._summaries.clear()
+            self._pending.clear()
+            self._folded_upto = 0
+            self._generation += 1
+
+    def update(self, chat_history: List[Dict]) -> None:
+        """Hand exchanges that left the verbatim window to the background summarizer"""
+        cutoff = len(chat_history) - self.window
+        with self._lock:
+            if len(chat_history) < self._folded_upto:
+                # History was cleared or replaced since the last update
+                self._summaries.clear()
+                self._pending.clear()
+                self._folded_upto = 0
+                self._generation += 1
+            if cutoff <= self._folded_upto:
+                return
+            subjects = []
+            for exchange in chat_history[self._folded_upto:cutoff]:
+                subject = exchange.get("subject", "")
+                self._pending.setdefault(subject, []).append(exchange)
+                if subject not in subjects:
+                    subjects.append(subject)
+            self._folded_upto = cutoff
+            # Summarizing costs a model call, so wait until enough exchanges have piled up
+            subjects = [subject for subject in subjects if len(self._pending[subject]) >= self.fold_every]
+
+        executor = get_summary_executor()
+        for subject in subjects:
+            executor.submit(self._fold_pending, subject)
+
+    def _batches(self, exchanges: List[Dict]) -> List[List[Dict]]:
+        """Split exchanges into consecutive batches that each fit the summarizer's input budget"""
+        batches = [[]]
+        used = 0
+        for exchange in exchanges:
+            cost = count_tokens(exchange["question"]) + min(count_tokens(exchange["answer"]), self.fold_answer_tokens) + 4
+            if batches[-1] and used + cost > self.fold_input_tokens:
+                batches.append([])
+                used = 0
+            batches[-1].append(exchange)
+            used += cost
+        return batches
+
+    def _fold_pending(self, subject: str) -> None:
+        """Fold every pending exchange for a subject into its summary"""
+        with self._lock:
+            subject_lock = self._subject_locks.setdefault(subject, threading.Lock())
+        # Serialize folds per subject so exchanges are applied in order
+        with subject_lock:
+            with self._lock:
+                exchanges = self._pending.pop(subject, [])
+                previous_summary = self._summaries.get(subject, "")
+                generation = self._generation
+            if not exchanges:
+                return
+
+            batches = self._batches(exchanges)
+            summary = previous_summary
+            if len(batches) > self.max_fold_calls:
+                # Condense the oldest part of a long backlog without spending model calls on it
+                older = [exchange for batch in batches[:-self.max_fold_calls] for exchange in batch]
+                summary = extractive_summary(summary, older, self.max_summary_tokens)
+                batches = batches[-self.max_fold_calls:]
+            for batch in batches:
+                folded = None
+                if self.summarizer:
+                    try:
+                        folded = self.summarizer(subject, summary, batch)
+                    except Exception:
+                        folded = None
+                if not folded:
+                    folded = extractive_summary(summary, batch, self.max_summary_tokens)
+                summary = truncate_to_tokens(folded.strip(), self.max_summary_tokens)
+
+            with self._lock:
+                if generation == self._generation:
+                    self._summaries[subject] = summary
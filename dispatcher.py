@@ -0,0 +1,246 @@
+"""
+Rate-limited request dispatcher for the AI Educational Tutor application.
+
+Model calls are funnelled through one asyncio event loop per process. Token
+buckets keep us under the requests-per-minute and tokens-per-minute quotas, a
+semaphore bounds concurrency, and retryable errors are retried with jittered
+exponential backoff, so short bursts queue up instead of failing. Streaming
+calls are consumed inside their slot, so the concurrency limit, retries and the
+upstream_call timer cover the whole generation rather than just opening the stream.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from config import DISPATCHER_CONFIG
+from metrics import get_metrics
+
+@functools.lru_cache(maxsize=1)
+def _error_types() -> tuple:
+    """(quota, timeout, unavailable) exception classes, importing google-api-core on first use"""
+    try:
+        from google.api_core import exceptions as google_exceptions
+    except ImportError:
+        return (), (TimeoutError, concurrent.futures.TimeoutError), ()
+    return (
+        (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests),
+        (google_exceptions.DeadlineExceeded, TimeoutError, concurrent.futures.TimeoutError),
+        (google_exceptions.ServiceUnavailable, google_exceptions.InternalServerError),
+    )
+
+def classify_error(error: Exception) -> str:
+    """Classify an API exception as 'quota', 'timeout', 'unavailable' or 'other'"""
+    quota_errors, timeout_errors, unavailable_errors = _error_types()
+    if isinstance(error, quota_errors):
+        return "quota"
+    if isinstance(error, timeout_errors):
+        return "timeout"
+    if isinstance(error, unavailable_errors):
+        return "unavailable"
+    # Fall back to the message for errors raised outside google-api-core
+    error_str = str(error).lower()
+    if "quota" in error_str or "rate limit" in error_str or "429" in error_str:
+        return "quota"
+    if "timeout" in error_str or "timed out" in error_str:
+        return "timeout"
+    return "other"
+
+RETRYABLE_ERROR_CLASSES = {"quota", "timeout", "unavailable"}
+
+# Marks the end of a stream in the chunk queue
+_STREAM_END = object()
+
+class TokenBucket:
+    """Continuously refilled token bucket for per-minute limits"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        """Add the tokens accrued since the last refill"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until the requested number of tokens is available and take them"""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(float(amount), self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+class RequestDispatcher:
+    """Queue model calls behind rate limits, bounded concurrency and retries"""
+
+    def __init__(self, requests_per_minute: float = 15, tokens_per_minute: float = 1_000_000,
+                 max_concurrency: int = 4, max_retries: int = 4,
+                 base_delay: float = 1.0, max_delay: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="model-call"
+        )
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = None
+        self._state_lock = threading.Lock()
+        self._stats = {"queued": 0, "in_flight": 0, "completed": 0, "retries": 0, "failed": 0}
+        self._thread = threading.Thread(target=self._run_loop, name="model-dispatcher", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self) -> None:
+        """Run the dispatcher event loop forever on its own thread"""
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def _update_stats(self, **deltas: int) -> None:
+        """Adjust dispatcher counters"""
+        with self._state_lock:
+            for name, delta in deltas.items():
+                self._stats[name] += delta
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def call(self, fn: Callable, *args: Any, estimated_tokens: int = 0, **kwargs: Any) -> Any:
+        """Run a blocking model call under the rate limits, retrying retryable errors"""
+        return await self._run(functools.partial(fn, *args, **kwargs), estimated_tokens)
+
+    async def _run(self, attempt_fn: Callable[[], Any], estimated_tokens: int = 0,
+                   can_retry: Callable[[], bool] = lambda: True) -> Any:
+        """Run attempt_fn on the worker pool inside a concurrency slot, retrying while can_retry() allows"""
+        if self._semaphore is None:
+            # Created lazily so it binds to the dispatcher loop on every Python version
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        metrics = get_metrics()
+        queued_at = time.perf_counter()
+        self._update_stats(queued=1)
+        async with self._semaphore:
+            self._update_stats(queued=-1, in_flight=1)
+            try:
+                attempt = 0
+                while True:
+                    await self.request_bucket.acquire(1)
+                    if estimated_tokens:
+                        await self.token_bucket.acquire(estimated_tokens)
+                    if attempt == 0:
+                        # Time spent waiting for a concurrency slot and rate-limit tokens
+                        metrics.observe("queue_wait", time.perf_counter() - queued_at)
+                    try:
+                        with metrics.timed("upstream_call"):
+                            result = await self._loop.run_in_executor(self._executor, attempt_fn)
+                        self._update_stats(completed=1)
+                        return result
+                    except Exception as e:
+                        error_class = classify_error(e)
+                        if (error_class not in RETRYABLE_ERROR_CLASSES or attempt >= self.max_retries
+                                or not can_retry()):
+                            self._update_stats(failed=1)
+                            raise
+                        metrics.increment("tutor_upstream_retries_total", **{"class": error_class})
+                        self._update_stats(retries=1)
+                        await asyncio.sleep(self._backoff_delay(attempt))
+                        attempt += 1
+            finally:
+                self._update_stats(in_flight=-1)
+
+    def submit(self, fn: Callable, *args: Any, estimated_tokens: int = 0, **kwargs: Any) -> concurrent.futures.Future:
+        """Schedule a call from any thread and return a concurrent future"""
+        return asyncio.run_coroutine_threadsafe(
+            self.call(fn, *args, estimated_tokens=estimated_tokens, **kwargs), self._loop
+        )
+
+    def call_sync(self, fn: Callable, *args: Any, estimated_tokens: int = 0, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """Schedule a call and block until it finishes or the timeout expires"""
+        future = self.submit(fn, *args, estimated_tokens=estimated_tokens, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stream_sync(self, fn: Callable, *args: Any, estimated_tokens: int = 0, timeout: Optional[float] = None, **kwargs: Any) -> Iterator[Any]:
+        """Start a streaming call and yield its chunks, holding a concurrency slot until the stream ends
+
+        Errors before the first chunk are retried like any other call. The timeout
+        applies to each wait for the next chunk. Closing the iterator early stops
+        the stream and frees the slot.
+        """
+        chunks = queue.Queue()
+        stop = threading.Event()
+        started = threading.Event()
+
+        def consume() -> None:
+            for chunk in fn(*args, **kwargs):
+                if stop.is_set():
+                    return
+                started.set()
+                chunks.put(chunk)
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._run(consume, estimated_tokens, can_retry=lambda: not started.is_set()), self._loop
+        )
+        future.add_done_callback(lambda _: chunks.put(_STREAM_END))
+        try:
+            while True:
+                try:
+                    chunk = chunks.get(timeout=timeout)
+                except queue.Empty:
+                    raise concurrent.futures.TimeoutError("Timed out waiting for the next streamed chunk") from None
+                if chunk is _STREAM_END:
+                    future.result()
+                    return
+                yield chunk
+        finally:
+            stop.set()
+            future.cancel()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of calls waiting for a concurrency slot"""
+        with self._state_lock:
+            return self._stats["queued"]
+
+    def stats(self) -> Dict[str, int]:
+        """Return queue and retry counters"""
+        with self._state_lock:
+            return dict(self._stats)
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher() -> RequestDispatcher:
+    """Return the process-wide dispatcher, starting it on first use"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = RequestDispatcher(
+                requests_per_minute=DISPATCHER_CONFIG["requests_per_minute"],
+                tokens_per_minute=DISPATCHER_CONFIG["tokens_per_minute"],
+                max_concurrency=DISPATCHER_CONFIG["max_concurrency"],
+                max_retries=DISPATCHER_CONFIG["max_retries"],
+                base_delay=DISPATCHER_CONFIG["base_delay_seconds"],
+                max_delay=DISPATCHER_CONFIG["max_delay_seconds"]
+            )
+            dispatcher = _dispatcher
+            metrics = get_metrics()
+            metrics.register_gauge("tutor_dispatcher_queue_depth", "Model calls waiting for a slot", lambda: dispatcher.queue_depth)
+            metrics.register_gauge("tutor_dispatcher_in_flight", "Model calls in progress", lambda: dispatcher.stats()["in_flight"])
+        return _dispatcher
@@ -0,0 +1,242 @@
+"""
+Reference document text extraction for the AI Educational Tutor application.
+
+Large PDFs are split into page ranges that are extracted in parallel by a
+process pool, then joined once at the end. Extracted text is cached on disk
+under a hash of the file bytes, so repeat uploads skip parsing entirely.
+"""
+
+import concurrent.futures
+import hashlib
+import importlib.util
+import io
+import math
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional
+
+from config import PDF_CONFIG, DOCUMENT_CACHE_CONFIG
+from metrics import get_metrics
+
+# PyPDF2 is imported on the first PDF upload; at start-up only check that it is installed
+PDF_AVAILABLE = importlib.util.find_spec("PyPDF2") is not None
+
+def _pypdf2():
+    """Import PyPDF2 on first use"""
+    import PyPDF2
+    return PyPDF2
+
+ProgressCallback = Callable[[int, int], None]
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def get_process_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """Return the process-wide pool used for PDF extraction"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # Spawn rather than fork: the server process runs gRPC, the dispatcher loop and
+            # other threads by now, and forking it can deadlock or abort the children
+            _process_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=PDF_CONFIG.get("max_workers") or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _process_pool
+
+def _reset_process_pool() -> None:
+    """Drop a broken pool so the next extraction starts a fresh one"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False)
+            _process_pool = None
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """Extract the text of pages [start, end) in a worker process"""
+    reader = _pypdf2().PdfReader(pdf_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+def _read_file_bytes(uploaded_file) -> bytes:
+    """Return the full contents of an uploaded or regular file object"""
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    uploaded_file.seek(0)
+    return uploaded_file.read()
+
+def _extract_pages_parallel(pdf_bytes: bytes, page_count: int,
+                            progress_callback: Optional[ProgressCallback]) -> List[str]:
+    """Extract all pages with the process pool, reporting progress as ranges finish"""
+    workers = PDF_CONFIG.get("max_workers") or os.cpu_count()
+    # Several ranges per worker keeps cores busy and progress updates frequent
+    pages_per_task = max(1, min(PDF_CONFIG["max_pages_per_task"], math.ceil(page_count / (workers * 4))))
+
+    # Workers read the PDF from disk instead of receiving a pickled copy per task
+    fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_bytes)
+
+        pool = get_process_pool()
+        futures = {
+            pool.submit(_extract_page_range, pdf_path, start, min(start + pages_per_task, page_count)): start
+            for start in range(0, page_count, pages_per_task)
+        }
+        pages = [""] * page_count
+        pages_done = 0
+        for future in concurrent.futures.as_completed(futures):
+            start = futures[future]
+            texts = future.result()
+            pages[start:start + len(texts)] = texts
+            pages_done += len(texts)
+            if progress_callback:
+                progress_callback(pages_done, page_count)
+        return pages
+    finally:
+        os.unlink(pdf_path)
+
+def read_pdf_text(pdf_file, progress_callback: Optional[ProgressCallback] = None) -> str:
+    """Extract text from a PDF file, raising on failure"""
+    pdf_bytes = _read_file_bytes(pdf_file)
+    pdf_reader = _pypdf2().PdfReader(io.BytesIO(pdf_bytes))
+    page_count = len(pdf_reader.pages)
+
+    pages = None
+    workers = PDF_CONFIG.get("max_workers") or os.cpu_count() or 1
+    if workers > 1 and page_count >= PDF_CONFIG["parallel_min_pages"]:
+        try:
+            pages = _extract_pages_parallel(pdf_bytes, page_count, progress_callback)
+        except BrokenProcessPool:
+            # A crashed worker shouldn't fail the upload; redo it on this thread
+            _reset_process_pool()
+
+    if pages is None:
+        pages = []
+        for page in pdf_reader.pages:
+            pages.append(page.extract_text() or "")
+            if progress_callback:
+                progress_callback(len(pages), page_count)
+
+    return "\n".join(pages) + "\n" if pages else ""
+
+def read_txt_text(txt_file) -> str:
+    """Decode a text file, trying several encodings and raising if none fits"""
+    for encoding in ['utf-8', 'latin-1', 'cp1252']:
+        try:
+            txt_file.seek(0)
+            return txt_file.read().decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("Could not decode the text file")
+
+def extract_text_from_pdf(pdf_file, progress_callback: Optional[ProgressCallback] = None):
+    """Extract text from uploaded PDF file"""
+    if not PDF_AVAILABLE:
+        return "PDF processing not available. Please install PyPDF2: pip install PyPDF2"
+    
+    try:
+        return read_pdf_text(pdf_file, progress_callback)
+    except Exception as e:
+        return f"Error reading PDF: {str(e)}"
+
+def extract_text_from_txt(txt_file):
+    """Extract text from uploaded TXT file"""
+    try:
+        return read_txt_text(txt_file)
+    except ValueError:
+        return "Error: Could not decode the text file"
+    except Exception as e:
+        return f"Error reading TXT file: {str(e)}"
+
+def hash_file(file_obj, block_size: int = 1 << 20) -> str:
+    """Stream a file object through SHA-256 without loading it all at once"""
+    digest = hashlib.sha256()
+    file_obj.seek(0)
+    while True:
+        block = file_obj.read(block_size)
+        if not block:
+            break
+        digest.update(block)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+class DocumentCache:
+    """Content-addressed on-disk store of extracted document text"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        """Fan entries out into subdirectories by key prefix"""
+        return os.path.join(self.directory, key[:2], key + ".txt")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached text for a key, or None on a miss"""
+        try:
+            with open(self._path(key), "r", encoding="utf-8", newline="") as f:
+                return f.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def set(self, key: str, text: str) -> None:
+        """Store text atomically so concurrent readers never see a partial file"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+def get_document_cache() -> Optional[DocumentCache]:
+    """Return the shared document cache, or None when it is disabled"""
+    if not DOCUMENT_CACHE_CONFIG.get("enabled", True):
+        return None
+    return DocumentCache(DOCUMENT_CACHE_CONFIG["directory"])
+
+def extraction_cache_key(content_hash: str, file_type: str) -> str:
+    """Combine the content hash with the extractor so library upgrades re-extract"""
+    extractor = f"pypdf2-{_pypdf2().__version__}" if file_type == "application/pdf" and PDF_AVAILABLE else "text"
+    return hashlib.sha256(f"{content_hash}:{file_type}:{extractor}".encode("utf-8")).hexdigest()
+
+def extract_text_cached(uploaded_file, file_type: str, content_hash: Optional[str] = None,
+                        progress_callback: Optional[ProgressCallback] = None) -> str:
+    """Extract text from an uploaded file, reusing earlier results for identical bytes"""
+    if file_type == "application/pdf":
+        if not PDF_AVAILABLE:
+            return "PDF processing not available. Please install PyPDF2: pip install PyPDF2"
+        read_text = lambda f: read_pdf_text(f, progress_callback)
+        error_prefix = "Error reading PDF"
+    elif file_type == "text/plain":
+        read_text = read_txt_text
+        error_prefix = "Error reading TXT file"
+    else:
+        return "Unsupported file type"
+
+    cache = get_document_cache()
+    key = None
+    if cache:
+        key = extraction_cache_key(content_hash or hash_file(uploaded_file), file_type)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    try:
+        with get_metrics().timed("extraction"):
+            text = read_text(uploaded_file)
+    except Exception as e:
+        # Failures are not cached so a retry after fixing the environment works
+        return f"{error_prefix}: {str(e)}"
+
+    if cache:
+        try:
+            cache.set(key, text)
+        except OSError:
+            pass
+    return text
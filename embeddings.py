@@ -0,0 +1,99 @@
+"""
+Local text embeddings for the AI Educational Tutor application.
+
+Vectors are built with the hashing trick over word and character n-grams, so
+they need nothing beyond NumPy and are stable across processes and restarts.
+"""
+
+import re
+import zlib
+from typing import List, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Numbers, operators, negations and question words: questions differing in any of these are
+# different questions. "What" and "which" are left out since "What is X?" asks the same as "X?"
+SIGNATURE_PATTERN = re.compile(
+    r"\d+(?:\.\d+)?|[+*/^=<>%]|-(?![a-z])|(?<![a-z])-"
+    r"|\b(?:not|no|never|none|nor|without|cannot|how|why|when|where|who|whom)\b|n't\b"
+)
+
+# "A to B" conversions, whose direction the bag-of-words embedding cannot see
+DIRECTION_PATTERN = re.compile(r"\b([a-z0-9]+) (?:to|into) (?:an? |the )?([a-z0-9]+)")
+
+# Very common words that carry little meaning for matching questions
+STOPWORDS = frozenset("""
+a an the and or but if of to in on at by for with from about into over as is are was were be been
+being do does did doing i me my we our you your it its this that these those there here can could
+would should will shall may might must please tell explain show give some any what whats how why
+when where which who whom get
+""".split())
+
+# Words students use interchangeably when phrasing the same question
+SYNONYMS = {
+    "make": "create", "build": "create", "define": "create", "declare": "create", "write": "create",
+    "difference": "compare", "differences": "compare", "vs": "compare", "versus": "compare",
+    "using": "use", "usage": "use", "work": "use", "working": "use",
+    "handling": "handle", "catch": "handle",
+    "func": "function", "fn": "function", "method": "function",
+}
+
+def question_signature(text: str) -> Tuple[str, ...]:
+    """Numbers, operators, negations, question words and conversion directions of a text, in order"""
+    text = text.lower()
+    aliases = {"n't": "not", "cannot": "not", "whom": "who"}
+    signature = [aliases.get(item, item) for item in SIGNATURE_PATTERN.findall(text)]
+    for source, target in DIRECTION_PATTERN.findall(text):
+        # "how to make ..." and "want to ..." are not conversions
+        if source not in STOPWORDS and target not in STOPWORDS:
+            signature.append(f"{_normalize(source)}>{_normalize(target)}")
+    return tuple(signature)
+
+def _stem(word: str) -> str:
+    """Strip a few common English suffixes"""
+    for suffix in ("ing", "es", "s", "ed"):
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+def _normalize(word: str) -> str:
+    """Map a word to its synonym group and stem"""
+    return _stem(SYNONYMS.get(word, word))
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, drop stopwords, map synonyms and stem"""
+    return [_normalize(word) for word in TOKEN_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+def _features(text: str) -> List[str]:
+    """Word unigrams plus character trigrams of each word"""
+    features = []
+    for token in tokenize(text):
+        features.append(token)
+        padded = f"<{token}>"
+        features.extend("#" + padded[i:i + 3] for i in range(len(padded) - 2))
+    return features
+
+def embed_texts(texts: List[str], dim: int = 1024) -> np.ndarray:
+    """Embed a batch of texts into an L2-normalized float32 matrix of shape (len(texts), dim)"""
+    rows, cols, values = [], [], []
+    for row, text in enumerate(texts):
+        for feature in _features(text):
+            digest = zlib.crc32(feature.encode("utf-8"))
+            rows.append(row)
+            cols.append(digest % dim)
+            # Word features count more than the character n-grams that back them up
+            weight = 0.5 if feature.startswith("#") else 1.0
+            values.append(weight if (digest >> 31) & 1 else -weight)
+
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    if rows:
+        np.add.at(matrix, (np.asarray(rows), np.asarray(cols)), np.asarray(values, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+def embed_text(text: str, dim: int = 1024) -> np.ndarray:
+    """Embed a single text into an L2-normalized float32 vector"""
+    return embed_texts([text], dim)[0]
@@ -0,0 +1,177 @@
+"""
+Streaming chat history export for the AI Educational Tutor application.
+
+Exchanges are serialized one at a time as JSON or NDJSON and passed through an
+optional gzip or zstd compressor, so an export never holds more than one
+exchange and one output buffer in memory. Exports from the session store can
+be limited to the exchanges added since the previous export.
+"""
+
+import argparse
+import json
+import sys
+import zlib
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
+
+from config import EXPORT_CONFIG
+
+# zstd compression needs the zstandard package
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+EXPORT_FORMATS = {
+    "json": ("application/json", ".json"),
+    "ndjson": ("application/x-ndjson", ".ndjson"),
+}
+COMPRESSIONS = {
+    "none": ("", None),
+    "gzip": (".gz", "application/gzip"),
+    "zstd": (".zst", "application/zstd"),
+}
+
+Row = Tuple[int, Dict]  # (session store row number, exchange)
+
+def available_compressions() -> list:
+    """Compression options usable in this environment"""
+    return [name for name in COMPRESSIONS if name != "zstd" or ZSTD_AVAILABLE]
+
+def _conversation(number: int, exchange: Dict, session_id: Optional[str] = None) -> Dict:
+    """Exported form of one exchange"""
+    conversation = {"session_id": session_id} if session_id else {}
+    conversation.update({
+        "question_number": number,
+        "question": exchange["question"],
+        "answer": exchange["answer"],
+        "subject": exchange["subject"],
+        "timestamp": datetime.fromtimestamp(exchange["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
+    })
+    return conversation
+
+def iter_json(exchanges: Iterable[Dict], subject: str) -> Iterator[str]:
+    """Yield an indented JSON document piece by piece"""
+    yield "{\n"
+    yield f'  "subject": {json.dumps(subject)},\n'
+    yield f'  "export_timestamp": {json.dumps(datetime.now().isoformat())},\n'
+    yield '  "conversations": ['
+    count = 0
+    for count, exchange in enumerate(exchanges, 1):
+        body = json.dumps(_conversation(count, exchange), indent=2).replace("\n", "\n    ")
+        yield ("," if count > 1 else "") + "\n    " + body
+    # The count is only known at the end, so it follows the conversations
+    yield ("\n  ]" if count else "]") + f',\n  "total_questions": {count}\n}}'
+
+def iter_ndjson(exchanges: Iterable[Dict], session_id: Optional[str] = None) -> Iterator[str]:
+    """Yield one JSON object per line, one line per exchange"""
+    for number, exchange in enumerate(exchanges, 1):
+        yield json.dumps(_conversation(number, exchange, session_id), ensure_ascii=False) + "\n"
+
+def _compressor(compression: str):
+    """A streaming compressor with compress()/flush(), or None for plain output"""
+    if compression == "gzip":
+        return zlib.compressobj(level=6, wbits=31)
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ValueError("zstd compression requires the zstandard package")
+        return zstandard.ZstdCompressor().compressobj()
+    if compression in (None, "none"):
+        return None
+    raise ValueError(f"Unknown compression: {compression}")
+
+def iter_export_bytes(exchanges: Iterable[Dict], subject: str, fmt: str = "ndjson",
+                      compression: str = "none", session_id: Optional[str] = None) -> Iterator[bytes]:
+    """Yield the encoded (and optionally compressed) export in buffer-sized blocks"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    pieces = iter_json(exchanges, subject) if fmt == "json" else iter_ndjson(exchanges, session_id)
+    compressor = _compressor(compression)
+    buffer_size = EXPORT_CONFIG["buffer_bytes"]
+    buffer = []
+    buffered = 0
+    for piece in pieces:
+        data = piece.encode("utf-8")
+        buffer.append(data)
+        buffered += len(data)
+        if buffered >= buffer_size:
+            block = b"".join(buffer)
+            buffer, buffered = [], 0
+            block = compressor.compress(block) if compressor else block
+            if block:
+                yield block
+    block = b"".join(buffer)
+    if compressor:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
+
+def write_export(rows: Iterable[Row], subject: str, output: BinaryIO, fmt: str = "ndjson",
+                 compression: str = "none", since_row: int = 0, session_id: Optional[str] = None) -> int:
+    """Stream rows into a binary file and return the last row exported"""
+    last_row = since_row
+
+    def exchanges():
+        nonlocal last_row
+        for row, exchange in rows:
+            last_row = row
+            yield exchange
+
+    for block in iter_export_bytes(exchanges(), subject, fmt, compression, session_id):
+        output.write(block)
+    return last_row
+
+def export_filename(fmt: str, compression: str = "none", prefix: str = "tutor_session") -> str:
+    """File name with the extensions for a format and compression"""
+    extension = EXPORT_FORMATS[fmt][1] + COMPRESSIONS[compression][0]
+    return f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}"
+
+def export_mime(fmt: str, compression: str = "none") -> str:
+    """MIME type of an export"""
+    return COMPRESSIONS[compression][1] or EXPORT_FORMATS[fmt][0]
+
+def export_session(store, session_id: str, subject: str, output: BinaryIO, fmt: str = "ndjson",
+                   compression: str = "none", since_last_export: bool = False, record: bool = True) -> int:
+    """Export a stored session (or only its new exchanges); record=False leaves the export cursor to the caller"""
+    since_row = store.get_export_cursor(session_id) if since_last_export else 0
+    last_row = write_export(
+        store.iter_exchanges(session_id, after=since_row), subject, output, fmt, compression, since_row, session_id
+    )
+    if record:
+        store.set_export_cursor(session_id, last_row)
+    return last_row
+
+def main(argv: Optional[list] = None) -> int:
+    """Export stored sessions from the command line"""
+    from session_store import get_session_store
+
+    parser = argparse.ArgumentParser(description="Export tutor chat sessions from the session store")
+    parser.add_argument("session_ids", nargs="*", help="Sessions to export (default: every session)")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--compression", choices=list(COMPRESSIONS), default="none")
+    parser.add_argument("--since-last-export", action="store_true", help="Only exchanges added since the previous export")
+    parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    store = get_session_store()
+    if store is None:
+        print("Session persistence is disabled", file=sys.stderr)
+        return 1
+    session_ids = args.session_ids or list(store.iter_session_ids())
+    if args.format == "json" and len(session_ids) > 1:
+        print("JSON exports hold one session; use --format ndjson for several", file=sys.stderr)
+        return 1
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        # Each session becomes its own gzip member / zstd frame; decompressors read them as one stream
+        for session_id in session_ids:
+            export_session(store, session_id, "", output, args.format, args.compression, args.since_last_export)
+    finally:
+        if args.output:
+            output.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+Latency and throughput metrics for the AI Educational Tutor application.
+
+Each instrumented phase (prompt build, retrieval, upstream call, extraction,
+render, ...) feeds a histogram with fixed Prometheus buckets plus a reservoir
+of recent samples for p50/p95/p99. Counters track outcomes and error classes,
+and gauges read live values such as the dispatcher queue depth. Everything is
+process-wide, shown in the sidebar admin panel and served in Prometheus text
+format from a small local HTTP endpoint.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import METRICS_CONFIG
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PHASE_METRIC = "tutor_phase_seconds"
+METRIC_HELP = {
+    PHASE_METRIC: "Time spent in each instrumented phase",
+    "tutor_requests_total": "Answered questions by where the answer came from",
+    "tutor_errors_total": "Failed questions by error class",
+    "tutor_upstream_retries_total": "Retried model calls by error class",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def _escape_label_value(value: str) -> str:
+    """Escape backslashes, quotes and newlines in a label value"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Labels) -> str:
+    """Prometheus label set, e.g. {phase="render"}"""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels) + "}"
+
+class Histogram:
+    """Cumulative bucket counts for export plus recent samples for percentiles"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, reservoir_size: int = 1024):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=reservoir_size)
+
+    def observe(self, value: float) -> None:
+        """Record one sample (callers hold the registry lock)"""
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def summary(self) -> Dict[str, float]:
+        """Count, mean and recent percentiles"""
+        recent = sorted(self.recent)
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": _percentile(recent, 0.50),
+            "p95": _percentile(recent, 0.95),
+            "p99": _percentile(recent, 0.99),
+        }
+
+class MetricsRegistry:
+    """Process-wide histograms, counters and gauges (recording is a no-op when disabled)"""
+
+    def __init__(self, enabled: bool = True, reservoir_size: int = 1024):
+        self.enabled = enabled
+        self.reservoir_size = reservoir_size
+        self._phases = {}    # phase -> Histogram
+        self._counters = {}  # (name, labels) -> value
+        self._gauges = {}    # name -> (help, callback)
+        self._lock = threading.Lock()
+
+    def observe(self, phase: str, seconds: float) -> None:
+        """Record how long a phase took"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._phases.get(phase)
+            if histogram is None:
+                histogram = self._phases[phase] = Histogram(reservoir_size=self.reservoir_size)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, phase: str) -> Iterator[None]:
+        """Time the enclosed block as one sample of a phase, even if it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start)
+
+    def increment(self, name: str, amount: float = 1, **labels: str) -> None:
+        """Add to a labelled counter"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def register_gauge(self, name: str, help_text: str, callback: Callable[[], float]) -> None:
+        """Expose a live value that is read at scrape time"""
+        with self._lock:
+            self._gauges[name] = (help_text, callback)
+
+    def phase_summaries(self) -> Dict[str, Dict[str, float]]:
+        """Per-phase count, mean and p50/p95/p99 in seconds"""
+        with self._lock:
+            return {phase: histogram.summary() for phase, histogram in sorted(self._phases.items())}
+
+    def counter_values(self, name: str) -> Dict[str, float]:
+        """Values of one counter keyed by its label values"""
+        with self._lock:
+            return {
+                ",".join(value for _, value in labels) or "total": value
+                for (counter, labels), value in sorted(self._counters.items())
+                if counter == name
+            }
+
+    def gauge_values(self) -> Dict[str, float]:
+        """Current value of every gauge"""
+        with self._lock:
+            gauges = list(self._gauges.items())
+        values = {}
+        for name, (_, callback) in gauges:
+            try:
+                values[name] = float(callback())
+            except Exception:
+                values[name] = float("nan")
+        return values
+
+    def render_prometheus(self) -> str:
+        """Everything in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            phases = [(phase, list(h.bucket_counts), h.buckets, h.count, h.sum) for phase, h in sorted(self._phases.items())]
+            counters = sorted(self._counters.items())
+            gauge_help = {name: help_text for name, (help_text, _) in self._gauges.items()}
+
+        lines.append(f"# HELP {PHASE_METRIC} {METRIC_HELP[PHASE_METRIC]}")
+        lines.append(f"# TYPE {PHASE_METRIC} histogram")
+        for phase, bucket_counts, buckets, count, total in phases:
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{PHASE_METRIC}_bucket{_format_labels((('phase', phase), ('le', repr(bound))))} {cumulative}")
+            lines.append(f"{PHASE_METRIC}_bucket{_format_labels((('phase', phase), ('le', '+Inf')))} {count}")
+            lines.append(f"{PHASE_METRIC}_sum{_format_labels((('phase', phase),))} {total}")
+            lines.append(f"{PHASE_METRIC}_count{_format_labels((('phase', phase),))} {count}")
+
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for name, value in sorted(self.gauge_values().items()):
+            lines.append(f"# HELP {name} {gauge_help.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry(
+                enabled=METRICS_CONFIG.get("enabled", True),
+                reservoir_size=METRICS_CONFIG["reservoir_size"]
+            )
+        return _metrics
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serve /metrics in Prometheus text format"""
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = get_metrics().render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        """Keep scrapes out of the Streamlit log"""
+
+_metrics_server = None
+_metrics_server_started = False
+
+def start_metrics_server() -> Optional[ThreadingHTTPServer]:
+    """Start the local /metrics endpoint once per process, if configured"""
+    global _metrics_server, _metrics_server_started
+    with _metrics_lock:
+        if _metrics_server_started or not METRICS_CONFIG.get("enabled", True) or not METRICS_CONFIG.get("port"):
+            return _metrics_server
+        _metrics_server_started = True
+        try:
+            _metrics_server = ThreadingHTTPServer((METRICS_CONFIG["host"], METRICS_CONFIG["port"]), _MetricsHandler)
+        except OSError:
+            # Port taken (e.g. by another server process); the admin panel still works
+            return None
+        _metrics_server.daemon_threads = True
+        threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _metrics_server
@@ -0,0 +1,124 @@
+"""
+Shared Gemini model client for the AI Educational Tutor application.
+
+One client is created per server process and reused by every browser session,
+so the model is resolved once and the underlying gRPC channel stays open.
+"""
+
+import os
+import threading
+from functools import lru_cache
+from typing import Optional
+
+from config import API_CONFIG, SYSTEM_PROMPT_TEMPLATE
+from token_counter import calibrate
+
+def load_genai():
+    """Import the Gemini SDK on first use; it dominates start-up time"""
+    import google.generativeai as genai
+    return genai
+
+@lru_cache(maxsize=1)
+def get_api_key() -> Optional[str]:
+    """Read the API key, loading .env the first time it is needed"""
+    from dotenv import load_dotenv
+    load_dotenv()
+    return os.getenv("GOOGLE_API_KEY")
+
+def build_generation_config() -> dict:
+    """Generation parameters shared by every request"""
+    return {
+        "temperature": API_CONFIG.get("temperature", 0.7),
+        "top_p": 0.95,
+        "top_k": 40,
+        "max_output_tokens": API_CONFIG.get("max_tokens", 8192),
+    }
+
+class ModelClient:
+    """Thread-safe, process-wide wrapper around a Gemini GenerativeModel"""
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key
+        self.generation_config = build_generation_config()
+        self.model_name = API_CONFIG["model_name"]
+        self.fallback_error = None
+        self.warm_up_error = None
+        self.warmed_up = False
+        self._warm_up_thread = None
+        # The SDK is imported and configured when the model is first needed
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The model currently in use (primary or fallback), created on first access"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    genai = load_genai()
+                    if self.api_key:
+                        # gRPC keeps one long-lived HTTP/2 channel that all requests share
+                        genai.configure(api_key=self.api_key, transport="grpc")
+                    self._model = genai.GenerativeModel(
+                        model_name=self.model_name,
+                        generation_config=self.generation_config
+                    )
+        return self._model
+
+    def _switch_to_fallback(self, error: Exception) -> None:
+        """Replace the primary model with the stable fallback"""
+        fallback_model = API_CONFIG.get("fallback_model_name", "gemini-pro")
+        self._model = load_genai().GenerativeModel(
+            model_name=fallback_model,
+            generation_config=self.generation_config
+        )
+        self.fallback_error = f"{self.model_name} not available, using {fallback_model} instead. Error: {str(error)}"
+        self.model_name = fallback_model
+
+    def warm_up(self) -> None:
+        """Resolve the model and open the connection before the first real question"""
+        with self._lock:
+            if self.warmed_up:
+                return
+            from google.api_core import exceptions as google_exceptions
+            try:
+                # count_tokens is free, resolves the model name and performs the TLS handshake
+                self.model.count_tokens("warm-up")
+                # Fit the local token counter to the model's tokenizer while we're connected
+                calibrate(self, [SYSTEM_PROMPT_TEMPLATE])
+            except google_exceptions.NotFound as e:
+                self._switch_to_fallback(e)
+            except Exception as e:
+                # Network or auth problems surface on the first real question instead
+                self.warm_up_error = str(e)
+            self.warmed_up = True
+
+    def start_warm_up(self) -> None:
+        """Warm up on a background thread, at most once per process"""
+        # A separate lock: warm_up() holds self._lock for the whole network round trip
+        with self._start_lock:
+            if self.warmed_up or self._warm_up_thread is not None:
+                return
+            self._warm_up_thread = threading.Thread(target=self.warm_up, name="model-warm-up", daemon=True)
+            self._warm_up_thread.start()
+
+    def generate_content(self, prompt, **kwargs):
+        """Send a prompt to the current model"""
+        return self.model.generate_content(prompt, **kwargs)
+
+    def count_tokens(self, prompt):
+        """Count tokens for a prompt with the current model"""
+        return self.model.count_tokens(prompt)
+
+_model_client = None
+_model_client_lock = threading.Lock()
+
+def get_model_client() -> ModelClient:
+    """Return the process-wide model client, creating it on first use"""
+    global _model_client
+    with _model_client_lock:
+        if _model_client is None:
+            _model_client = ModelClient(api_key=get_api_key())
+        return _model_client
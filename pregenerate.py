@@ -0,0 +1,125 @@
+"""
+Pre-generate answers to example questions for the AI Educational Tutor application.
+
+Answers the example questions of every built-in subject and of the custom
+subjects listed in a JSON file (or recorded by the app when
+collect_custom_subjects is on), and stores them in the answer store the app
+serves from. Run it at deploy time or on a schedule. Questions that already
+have an answer for the current model, subject context and prompt are skipped,
+so repeated runs only pay for what changed.
+
+    python pregenerate.py                      # fill in missing answers
+    python pregenerate.py --refresh            # regenerate every answer
+    python pregenerate.py --custom-subjects custom_subjects.json
+"""
+
+import argparse
+import concurrent.futures
+import json
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from answer_store import get_answer_store, pregenerated_key
+from config import DISPATCHER_CONFIG, PREGENERATED_CONFIG, SUBJECTS
+from utils import build_custom_subject
+
+def collect_subjects(store, custom_subjects_path: Optional[str] = None) -> List[Dict[str, Dict]]:
+    """Built-in subjects plus recorded and file-supplied custom subjects, in groups without repeated names
+
+    Users can create custom subjects with the same name but different contexts.
+    Each context gets its own answers, so those entries go into separate groups.
+    """
+    custom = list(store.iter_custom_subjects())
+    if custom_subjects_path:
+        with open(custom_subjects_path, "r", encoding="utf-8") as f:
+            custom.extend(json.load(f))
+    groups = [dict(SUBJECTS)]
+    seen = set()
+    for entry in custom:
+        name = entry.get("name")
+        if not name or name in SUBJECTS:
+            continue
+        info = build_custom_subject(name, entry.get("description", ""), entry.get("context", ""), entry.get("icon", "📚"))
+        if (name, info["context"]) in seen:
+            continue
+        seen.add((name, info["context"]))
+        group = next((group for group in groups if name not in group), None)
+        if group is None:
+            group = {}
+            groups.append(group)
+        group[name] = info
+    return groups
+
+def generate(tutor, subject: str, question: str, refresh: bool) -> Tuple[str, str]:
+    """Answer one example question; a refresh bypasses the response caches"""
+    if not refresh:
+        return tutor.answer(question, subject, [])
+    return "".join(tutor.generate_answer(question, subject, [], "", False, time.perf_counter())), "model"
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Fill the answer store from the command line"""
+    parser = argparse.ArgumentParser(description="Pre-generate answers for the subjects' example questions")
+    parser.add_argument("--subject", action="append", default=[], help="Only these subjects (repeatable)")
+    parser.add_argument("--custom-subjects", help="JSON list of {name, description, context, icon} to include")
+    parser.add_argument("--refresh", action="store_true", help="Regenerate answers that are already stored")
+    parser.add_argument("--workers", type=int, default=PREGENERATED_CONFIG["workers"], help="Questions answered concurrently")
+    parser.add_argument("--requests-per-minute", type=float, help="Override the dispatcher's request quota")
+    args = parser.parse_args(argv)
+
+    store = get_answer_store()
+    if store is None:
+        print("Pre-generated answers are disabled (PREGENERATED_CONFIG['enabled'])", file=sys.stderr)
+        return 1
+
+    DISPATCHER_CONFIG["max_concurrency"] = max(DISPATCHER_CONFIG["max_concurrency"], args.workers)
+    if args.requests_per_minute:
+        DISPATCHER_CONFIG["requests_per_minute"] = args.requests_per_minute
+
+    from app import EducationalTutor
+    from model_client import get_api_key
+
+    if not get_api_key():
+        print("GOOGLE_API_KEY is not set (see .env.sample)", file=sys.stderr)
+        return 1
+
+    jobs = []
+    subject_count = 0
+    for subjects in collect_subjects(store, args.custom_subjects):
+        if args.subject:
+            subjects = {name: info for name, info in subjects.items() if name in args.subject}
+        # One tutor per group, so each resolves a subject name to that group's context
+        tutor = EducationalTutor()
+        tutor.subjects = subjects
+        subject_count += len(subjects)
+        for subject, info in subjects.items():
+            for question in info.get("example_questions", []):
+                key = pregenerated_key(subject, tutor.get_subject_context(subject), question, tutor.model_name)
+                if args.refresh or not store.has(key):
+                    jobs.append((key, tutor, subject, question))
+    print(f"{len(jobs)} example questions to answer across {subject_count} subjects", file=sys.stderr)
+
+    failed = 0
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="pregenerate") as executor:
+        futures = {
+            executor.submit(generate, tutor, subject, question, args.refresh): (key, tutor, subject, question)
+            for key, tutor, subject, question in jobs
+        }
+        for future in concurrent.futures.as_completed(futures):
+            key, tutor, subject, question = futures[future]
+            try:
+                answer, source = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"failed  [{subject}] {question}: {e}", file=sys.stderr)
+                continue
+            store.put(key, subject, question, answer, tutor.model_name)
+            print(f"stored  [{subject}] {question} ({source})", file=sys.stderr)
+
+    print(f"{len(jobs) - failed} answers stored, {failed} failed in {time.perf_counter() - started:.1f}s; "
+          f"{store.count()} answers in {PREGENERATED_CONFIG['path']}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Opt-in per-rerun profiling for the AI Educational Tutor application.
+
+Set TUTOR_PROFILE=cprofile (deterministic, .prof files for pstats/snakeviz) or
+TUTOR_PROFILE=sample (low-overhead stack sampling, .folded files for flame
+graphs) before `streamlit run app.py`. Every rerun of the script is then
+profiled, a wall-time breakdown of its phases is written next to the profile,
+and only the newest TUTOR_PROFILE_KEEP reruns are kept in TUTOR_PROFILE_DIR.
+"""
+
+import cProfile
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import PROFILING_CONFIG
+
+PROFILE_MODES = ("cprofile", "sample")
+
+_active = threading.local()
+_rerun_ids = itertools.count(1)
+_prune_lock = threading.Lock()
+
+class StackSampler(threading.Thread):
+    """Periodically record the call stack of one thread as folded stacks"""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread"""
+        self._stop_event.set()
+        self.join()
+
+    def write(self, path: str) -> None:
+        """Write 'stack count' lines for flamegraph.pl, speedscope or similar"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class RerunProfile:
+    """Wall-time breakdown of one script rerun, split at named checkpoints"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self._phase = "startup"
+        self._phase_started = self.started
+
+    def checkpoint(self, name: str) -> None:
+        """End the current phase and start a new one"""
+        now = time.perf_counter()
+        if self._phase is not None:
+            self.phases.append((self._phase, now - self._phase_started))
+        self._phase = name
+        self._phase_started = now
+
+    def finish(self) -> Dict:
+        """Close the last phase and return the breakdown"""
+        self.checkpoint(None)
+        totals = {}
+        for name, seconds in self.phases:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "total_seconds": time.perf_counter() - self.started,
+            "phases": totals,
+        }
+
+def profiling_mode() -> Optional[str]:
+    """The configured profiler, or None when profiling is off"""
+    mode = (PROFILING_CONFIG.get("mode") or "").lower()
+    if mode in ("1", "true", "yes"):
+        return "cprofile"
+    return mode if mode in PROFILE_MODES else None
+
+def checkpoint(name: str) -> None:
+    """Mark the start of a phase in the rerun being profiled (no-op otherwise)"""
+    profile = getattr(_active, "profile", None)
+    if profile is not None:
+        profile.checkpoint(name)
+
+def prune_profiles(directory: str, keep: int) -> None:
+    """Delete the files of all but the newest `keep` reruns"""
+    with _prune_lock:
+        try:
+            entries = [entry for entry in os.scandir(directory) if entry.is_file()]
+        except FileNotFoundError:
+            return
+        reruns = {}
+        for entry in entries:
+            stem = entry.name.split(".", 1)[0]
+            reruns.setdefault(stem, []).append(entry)
+        ordered = sorted(reruns.values(), key=lambda files: max(f.stat().st_mtime for f in files), reverse=True)
+        for files in ordered[keep:]:
+            for entry in files:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+@contextmanager
+def profile_rerun() -> Iterator[None]:
+    """Profile the enclosed script run when TUTOR_PROFILE is set"""
+    mode = profiling_mode()
+    if mode is None:
+        yield
+        return
+
+    directory = PROFILING_CONFIG["directory"]
+    os.makedirs(directory, exist_ok=True)
+    profile = RerunProfile()
+    _active.profile = profile
+    profiler = sampler = None
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Only one cProfile can run at a time; concurrent reruns get the breakdown only
+            profiler = None
+    else:
+        sampler = StackSampler(threading.get_ident(), PROFILING_CONFIG["sample_interval_seconds"])
+        sampler.start()
+
+    try:
+        # st.rerun() and st.stop() end the script with an exception; still write the profile
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        if sampler:
+            sampler.stop()
+        _active.profile = None
+
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_rerun_ids)}"
+        summary = profile.finish()
+        summary["mode"] = mode
+        if profiler:
+            summary["profile"] = f"{stem}.prof"
+            profiler.dump_stats(os.path.join(directory, summary["profile"]))
+        if sampler:
+            summary["profile"] = f"{stem}.folded"
+            summary["samples"] = sum(sampler.stacks.values())
+            sampler.write(os.path.join(directory, summary["profile"]))
+        with open(os.path.join(directory, f"{stem}.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        prune_profiles(directory, PROFILING_CONFIG["keep"])
@@ -0,0 +1,169 @@
+"""
+Token-budget-aware prompt assembly for the AI Educational Tutor application.
+
+Each request gets a fixed input-token budget. The system prompt and the
+question always go in; retrieved reference chunks come next, up to a share of
+what is left; the running conversation summary and the most recent
+conversation history fill the remainder.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from config import API_CONFIG, PROMPT_CONFIG, RETRIEVAL_CONFIG, SYSTEM_PROMPT_TEMPLATE
+from reference_store import ReferenceStore
+from retrieval import format_retrieved_chunks
+from token_counter import count_tokens, truncate_to_tokens
+
+REFERENCE_SECTION_TEMPLATE = (
+    "\n\nReference Material:\nThe user has provided the following reference material to help answer questions:"
+    "\n\n{reference_text}\n\nPlease use this reference material when relevant to answer questions."
+)
+RETRIEVED_SECTION_TEMPLATE = "\n\nMore reference material relevant to this question:\n\n{reference_text}"
+SUMMARY_SECTION_TEMPLATE = "\n\nSummary of the earlier conversation:\n{summary}"
+HISTORY_SECTION_HEADER = "\n\nPrevious conversation context:\n"
+QUESTION_TEMPLATE = "\n\nCurrent question: {question}\n\nPlease provide a comprehensive answer:"
+
+class PromptBuilder:
+    """Assemble prompts that fit an input-token budget, filling sections by priority"""
+
+    def __init__(self, max_input_tokens: int = 8000, max_reference_share: float = 0.6,
+                 max_answer_tokens: int = 150, max_history: int = 5, candidate_chunks: int = 12):
+        self.max_input_tokens = max_input_tokens
+        self.max_reference_share = max_reference_share
+        self.max_answer_tokens = max_answer_tokens
+        self.max_history = max_history
+        self.candidate_chunks = candidate_chunks
+
+    def format_question(self, question: str) -> str:
+        """The question suffix appended after the system prompt"""
+        return QUESTION_TEMPLATE.format(question=question)
+
+    def select_references(self, references: ReferenceStore, question: str, budget: int, fall_back_to_head: bool = True) -> str:
+        """Fit the whole material if small, otherwise the best retrieved chunks"""
+        if not references or budget <= 0:
+            return ""
+        # Character count bounds the token count cheaply before counting exactly
+        if references.total_chars <= budget * 8:
+            full_text = references.text()
+            if count_tokens(full_text) <= budget:
+                return full_text
+
+        selected = []
+        used = 0
+        for result in (references.search(question, self.candidate_chunks) if question else []):
+            cost = count_tokens(format_retrieved_chunks([result])) + 1
+            if used + cost <= budget:
+                selected.append(result)
+                used += cost
+        if selected:
+            return format_retrieved_chunks(selected)
+        if not fall_back_to_head:
+            return ""
+
+        # Nothing matched the question, so fall back to the start of the material
+        return truncate_to_tokens(references.head(budget * 8), budget)
+
+    def select_history(self, chat_history: List[Dict], budget: int) -> str:
+        """Keep as many recent exchanges as fit, newest first, in chronological order"""
+        if not chat_history or budget <= 0:
+            return ""
+        budget -= count_tokens(HISTORY_SECTION_HEADER)
+        kept = []
+        for exchange in reversed(chat_history[-self.max_history:]):
+            answer = truncate_to_tokens(exchange["answer"], self.max_answer_tokens)
+            entry = (exchange["question"], answer)
+            cost = count_tokens(entry[0]) + count_tokens(entry[1]) + 6
+            if cost > budget:
+                break
+            kept.append(entry)
+            budget -= cost
+        if not kept:
+            return ""
+
+        section = HISTORY_SECTION_HEADER
+        for i, (question, answer) in enumerate(reversed(kept)):
+            section += f"Q{i+1}: {question}\n"
+            section += f"A{i+1}: {answer}\n\n"
+        return section
+
+    def build_system_prompt(self, subject: str, subject_context: str, chat_history: List[Dict],
+                            references: ReferenceStore, question: str = "", summary: str = "") -> str:
+        """Build the system prompt, leaving room for the question suffix"""
+        system_prompt = SYSTEM_PROMPT_TEMPLATE.format(
+            subject=subject,
+            subject_context=subject_context
+        )
+        remaining = self.max_input_tokens - count_tokens(system_prompt) - count_tokens(self.format_question(question))
+
+        reference_text = self.select_references(references, question, int(remaining * self.max_reference_share))
+        if reference_text:
+            reference_section = REFERENCE_SECTION_TEMPLATE.format(reference_text=reference_text)
+            system_prompt += reference_section
+            remaining -= count_tokens(reference_section)
+
+        # The running summary stands in for exchanges older than the verbatim window
+        if summary:
+            summary_section = SUMMARY_SECTION_TEMPLATE.format(summary=truncate_to_tokens(summary, max(remaining // 2, 0)))
+            system_prompt += summary_section
+            remaining -= count_tokens(summary_section)
+
+        system_prompt += self.select_history(chat_history, remaining)
+        return system_prompt
+
+    def build_cached_prefix(self, subject: str, subject_context: str, references: ReferenceStore,
+                            max_tokens: int) -> Tuple[str, str, bool]:
+        """The stable (system instruction, reference material, complete) prefix for context caching
+
+        The material is cached whole when it fits in max_tokens. Otherwise only its
+        beginning is, and complete is False so each question also retrieves chunks.
+        """
+        system_prompt = SYSTEM_PROMPT_TEMPLATE.format(
+            subject=subject,
+            subject_context=subject_context
+        )
+        if not references:
+            return system_prompt, "", True
+        budget = max_tokens - count_tokens(system_prompt) - count_tokens(REFERENCE_SECTION_TEMPLATE.format(reference_text=""))
+        parts = []
+        complete = True
+        for piece in references.iter_text():
+            # Character count bounds the token count cheaply before counting exactly
+            cost = count_tokens(piece) if len(piece) <= budget * 8 else budget + 1
+            if cost > budget:
+                parts.append(truncate_to_tokens(piece[:max(budget, 0) * 8], budget))
+                complete = False
+                break
+            parts.append(piece)
+            budget -= cost
+        reference_section = REFERENCE_SECTION_TEMPLATE.format(reference_text="".join(parts)).lstrip()
+        return system_prompt, reference_section, complete
+
+    def build_uncached_suffix(self, chat_history: List[Dict], question: str, summary: str = "",
+                              references: Optional[ReferenceStore] = None, max_tokens: Optional[int] = None) -> str:
+        """The per-question part sent alongside a cached prefix, with retrieved chunks when the prefix holds only part of the material"""
+        budget = self.max_input_tokens if max_tokens is None else min(max_tokens, self.max_input_tokens)
+        remaining = budget - count_tokens(self.format_question(question))
+        suffix = ""
+        if references:
+            reference_text = self.select_references(
+                references, question, int(remaining * self.max_reference_share), fall_back_to_head=False
+            )
+            if reference_text:
+                suffix += RETRIEVED_SECTION_TEMPLATE.format(reference_text=reference_text)
+                remaining -= count_tokens(suffix)
+        if summary:
+            summary_section = SUMMARY_SECTION_TEMPLATE.format(summary=truncate_to_tokens(summary, remaining // 2))
+            suffix += summary_section
+            remaining -= count_tokens(summary_section)
+        suffix += self.select_history(chat_history, remaining)
+        return (suffix + self.format_question(question)).lstrip()
+
+def get_prompt_builder() -> PromptBuilder:
+    """Create a prompt builder from the configured budget"""
+    return PromptBuilder(
+        max_input_tokens=PROMPT_CONFIG["max_input_tokens"],
+        max_reference_share=PROMPT_CONFIG["max_reference_share"],
+        max_answer_tokens=PROMPT_CONFIG["max_answer_tokens"],
+        max_history=API_CONFIG["max_chat_history"],
+        candidate_chunks=RETRIEVAL_CONFIG["top_k"]
+    )
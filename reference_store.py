@@ -0,0 +1,156 @@
+"""
+Segmented reference material store for the AI Educational Tutor application.
+
+Each uploaded document is kept as its own segment under a stable ID, with the
+retrieval indexes updated per document. Adding or removing a document never
+touches the others, and no concatenated copy of all material is ever built.
+"""
+
+import heapq
+import itertools
+import threading
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from cache import hash_text
+from config import RETRIEVAL_CONFIG
+from metrics import get_metrics
+from retrieval import BM25Index, fuse_results, split_reference_sources
+
+# Dense retrieval needs NumPy for the chunk embeddings
+try:
+    from vector_index import get_dense_index_for_text
+    DENSE_RETRIEVAL_AVAILABLE = True
+except ImportError:
+    DENSE_RETRIEVAL_AVAILABLE = False
+
+SOURCE_HEADER = "\n\n--- Content from {name} ---\n"
+
+class ReferenceStore:
+    """Per-session collection of reference documents stored as separate segments"""
+
+    def __init__(self):
+        self._segments = {}  # doc_id -> {"name", "content", "hash"}, in upload order
+        self._next_id = itertools.count(1)
+        self._bm25 = BM25Index(k1=RETRIEVAL_CONFIG["bm25_k1"], b=RETRIEVAL_CONFIG["bm25_b"])
+        self._dense = {}     # doc_id -> DenseIndex, built on demand
+        self._total_chars = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    def __bool__(self) -> bool:
+        return self._total_chars > 0
+
+    @property
+    def total_chars(self) -> int:
+        """Total characters of reference text across all segments"""
+        return self._total_chars
+
+    def add(self, name: str, content: str, content_hash: Optional[str] = None) -> str:
+        """Add a document and index it, returning its stable ID"""
+        with self._lock:
+            doc_id = f"doc-{next(self._next_id)}"
+            self._segments[doc_id] = {
+                "name": name,
+                "content": content,
+                "hash": content_hash or hash_text(content),
+            }
+            self._total_chars += len(content)
+            self._bm25.add_document(
+                doc_id, content, name,
+                chunk_size=RETRIEVAL_CONFIG["chunk_size"],
+                overlap=RETRIEVAL_CONFIG["chunk_overlap"]
+            )
+            if self._uses_dense():
+                self._dense[doc_id] = self._build_dense(name, content)
+            return doc_id
+
+    def remove(self, doc_id: str) -> None:
+        """Remove a document and its index entries"""
+        with self._lock:
+            segment = self._segments.pop(doc_id, None)
+            if segment is None:
+                return
+            self._total_chars -= len(segment["content"])
+            self._bm25.remove_document(doc_id)
+            self._dense.pop(doc_id, None)
+
+    def clear(self) -> None:
+        """Remove every document"""
+        with self._lock:
+            for doc_id in list(self._segments):
+                self.remove(doc_id)
+
+    def get(self, doc_id: str) -> Optional[Dict[str, str]]:
+        """Return the segment for a document ID"""
+        return self._segments.get(doc_id)
+
+    def iter_text(self) -> Iterator[str]:
+        """Yield the reference material piece by piece in upload order"""
+        for segment in list(self._segments.values()):
+            yield SOURCE_HEADER.format(name=segment["name"])
+            yield segment["content"]
+
+    def text(self) -> str:
+        """Join all segments into one string (only for small amounts of material)"""
+        return "".join(self.iter_text())
+
+    def head(self, max_chars: int) -> str:
+        """Return the first max_chars characters without joining everything"""
+        parts = []
+        remaining = max_chars
+        for piece in self.iter_text():
+            if remaining <= 0:
+                break
+            parts.append(piece[:remaining])
+            remaining -= len(parts[-1])
+        return "".join(parts)
+
+    def fingerprint(self) -> str:
+        """Stable identity of the current material, for cache keys"""
+        with self._lock:
+            return hash_text(",".join(segment["hash"] for segment in self._segments.values()))
+
+    def _uses_dense(self) -> bool:
+        """Whether the configured retrieval mode needs dense indexes"""
+        return DENSE_RETRIEVAL_AVAILABLE and RETRIEVAL_CONFIG.get("mode", "bm25") in ("dense", "hybrid")
+
+    def _build_dense(self, name: str, content: str):
+        """Load or build the persisted dense index for one document"""
+        return get_dense_index_for_text(SOURCE_HEADER.format(name=name) + content)
+
+    def _search_dense(self, question: str, top_k: int) -> List[Tuple[float, str, str]]:
+        """Search every document's dense index and keep the overall best chunks"""
+        for doc_id, segment in self._segments.items():
+            if doc_id not in self._dense:
+                self._dense[doc_id] = self._build_dense(segment["name"], segment["content"])
+        results = itertools.chain.from_iterable(
+            index.search(question, top_k) for index in self._dense.values()
+        )
+        return heapq.nlargest(top_k, results, key=lambda result: result[0])
+
+    def search(self, question: str, top_k: int = 4) -> List[Tuple[float, str, str]]:
+        """Return (score, source, chunk text) using the configured retrieval mode"""
+        with self._lock, get_metrics().timed("retrieval"):
+            if not self._uses_dense():
+                return self._bm25.search(question, top_k)
+            dense_results = self._search_dense(question, top_k)
+            if RETRIEVAL_CONFIG["mode"] == "dense":
+                return dense_results
+            return fuse_results([self._bm25.search(question, top_k), dense_results], top_k)
+
+@lru_cache(maxsize=8)
+def get_store_for_text(reference_content: str) -> ReferenceStore:
+    """Build (or reuse) a store from concatenated reference text, for non-UI callers"""
+    store = ReferenceStore()
+    for source, text in split_reference_sources(reference_content):
+        store.add(source, text)
+    return store
+
+def as_reference_store(reference: Union[str, ReferenceStore, None]) -> ReferenceStore:
+    """Accept either a ReferenceStore or plain reference text"""
+    if isinstance(reference, ReferenceStore):
+        return reference
+    return get_store_for_text(reference or "")
@@ -0,0 +1,282 @@
+"""
+Chat message rendering for the AI Educational Tutor application.
+
+Each exchange is converted once into sanitized HTML (Markdown, fenced code and
+math included) and kept in a bounded cache keyed by exchange ID, so a rerun
+only concatenates fragments that were already built.
+"""
+
+import html
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import Dict, List, Tuple
+
+from cache import hash_text
+from config import UI_CONFIG
+
+# Optional dependencies: full Markdown support and TeX-to-MathML conversion
+try:
+    import markdown
+    MARKDOWN_AVAILABLE = True
+except ImportError:
+    MARKDOWN_AVAILABLE = False
+
+try:
+    from latex2mathml.converter import convert as latex_to_mathml
+    MATHML_AVAILABLE = True
+except ImportError:
+    MATHML_AVAILABLE = False
+
+USER_BUBBLE_TEMPLATE = (
+    "<div style='display: flex; justify-content: flex-end; margin: 15px 0; align-items: flex-end;'>"
+    "<div style='background: linear-gradient(135deg, #dcf8c6 0%, #d4f4aa 100%); padding: 12px 16px; "
+    "border-radius: 18px 18px 4px 18px; max-width: 80%; margin-left: 20%; "
+    "box-shadow: 0 1px 2px rgba(0,0,0,0.1); position: relative;'>"
+    "<div style='font-size: 0.85em; color: #666; margin-bottom: 6px; font-weight: 500;'>You</div>"
+    "<div style='color: #000; line-height: 1.4; word-wrap: break-word;'>{body}</div>"
+    "<div style='font-size: 0.7em; color: #999; text-align: right; margin-top: 8px;'>{time}</div>"
+    "</div></div>"
+)
+TUTOR_BUBBLE_TEMPLATE = (
+    "<div style='display: flex; justify-content: flex-start; margin: 15px 0; align-items: flex-end;'>"
+    "<div style='background: white; padding: 12px 16px; border-radius: 18px 18px 18px 4px; max-width: 80%; "
+    "margin-right: 20%; box-shadow: 0 1px 2px rgba(0,0,0,0.1); position: relative;'>"
+    "<div style='font-size: 0.85em; color: #666; margin-bottom: 6px; font-weight: 500; "
+    "display: flex; align-items: center;'>🤖 AI Tutor</div>"
+    "<div style='color: #000; line-height: 1.4; word-wrap: break-word;'>{body}</div>"
+    "<div style='font-size: 0.7em; color: #999; text-align: right; margin-top: 8px;'>{time}</div>"
+    "</div></div>"
+)
+
+CODE_PATTERN = re.compile(r"(```.*?(?:```|$)|`[^`\n]+`)", re.DOTALL)
+MATH_PATTERN = re.compile(
+    r"\$\$(.+?)\$\$|\\\[(.+?)\\\]|\\\((.+?)\\\)|(?<![\\$\w])\$(?!\s)([^$\n]+?)(?<!\s)\$(?!\d)",
+    re.DOTALL
+)
+MATH_PLACEHOLDER = "@@MATH{}@@"
+URL_ATTRIBUTE_PATTERN = re.compile(r"""\b(href|src)\s*=\s*(["'])(.*?)\2""", re.IGNORECASE)
+SAFE_URL_PATTERN = re.compile(r"^(https?:|mailto:|#|/)", re.IGNORECASE)
+MATHML_TAGS = frozenset("""
+math semantics annotation mrow mi mn mo ms mtext mspace msub msup msubsup mfrac msqrt mroot mstyle
+merror mpadded mphantom menclose munder mover munderover mtable mtr mtd mlabeledtr mmultiscripts
+mprescripts none mfenced
+""".split())
+MATHML_ATTRIBUTES = frozenset("""
+xmlns display mathvariant mathsize mathcolor mathbackground displaystyle scriptlevel stretchy fence
+separator separators open close form accent accentunder largeop movablelimits symmetric lspace rspace
+minsize maxsize width height depth linethickness notation columnalign rowalign columnspacing
+rowspacing columnlines rowlines frame align encoding
+""".split())
+PRE_BLOCK_PATTERN = re.compile(r"<pre\b.*?</pre>", re.DOTALL)
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*)$")
+BULLET_PATTERN = re.compile(r"^\s*[-*+]\s+")
+NUMBERED_PATTERN = re.compile(r"^\s*\d+[.)]\s+")
+
+_markdown_lock = threading.Lock()
+_markdown = None
+
+def _get_markdown():
+    """Shared Markdown converter with raw HTML disabled"""
+    global _markdown
+    if _markdown is None:
+        _markdown = markdown.Markdown(extensions=["fenced_code", "tables", "sane_lists"])
+        # Raw HTML in answers is escaped rather than passed through
+        _markdown.preprocessors.deregister("html_block")
+        _markdown.inlinePatterns.deregister("html")
+    return _markdown
+
+def _render_math(tex: str, display: bool) -> str:
+    """MathML for a TeX expression, or the escaped source when no converter is installed"""
+    if MATHML_AVAILABLE:
+        try:
+            # The converter passes \text{} and \href{} arguments through unescaped
+            return _sanitize_mathml(latex_to_mathml(tex.strip(), display="block" if display else "inline"))
+        except Exception:
+            pass
+    style = " style='display: block; text-align: center;'" if display else ""
+    return f"<span class='math'{style}><code>{html.escape(tex.strip())}</code></span>"
+
+class _MathMLSanitizer(HTMLParser):
+    """Rebuild a MathML fragment from allowlisted elements and attributes, escaping all text"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skipped = 0  # Depth inside script or style, whose content is dropped too
+
+    def _tag(self, tag: str, attrs, self_closing: bool) -> None:
+        if tag in ("script", "style"):
+            self.skipped += not self_closing
+        elif tag in MATHML_TAGS and not self.skipped:
+            # Links (href) and event handlers (on*) are not in the allowlist
+            kept = "".join(
+                f' {name}="{html.escape(value or "")}"' for name, value in attrs if name in MATHML_ATTRIBUTES
+            )
+            self.parts.append(f"<{tag}{kept}{' /' if self_closing else ''}>")
+
+    def handle_starttag(self, tag, attrs):
+        self._tag(tag, attrs, False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._tag(tag, attrs, True)
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self.skipped = max(0, self.skipped - 1)
+        elif tag in MATHML_TAGS and not self.skipped:
+            self.parts.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        if not self.skipped:
+            self.parts.append(html.escape(data, quote=False))
+
+def _sanitize_mathml(fragment: str) -> str:
+    """Drop non-MathML elements and unsafe attributes from converter output"""
+    parser = _MathMLSanitizer()
+    parser.feed(fragment)
+    parser.close()
+    return "".join(parser.parts)
+
+def _extract_math(text: str) -> Tuple[str, List[str]]:
+    """Swap math spans outside of code for placeholders so Markdown leaves them alone"""
+    rendered = []
+
+    def replace(match):
+        display_tex = match.group(1) or match.group(2)
+        tex = display_tex if display_tex is not None else (match.group(3) or match.group(4))
+        rendered.append(_render_math(tex, display_tex is not None))
+        return MATH_PLACEHOLDER.format(len(rendered) - 1)
+
+    parts = CODE_PATTERN.split(text)
+    # Odd indexes are code spans and fenced blocks
+    for i in range(0, len(parts), 2):
+        parts[i] = MATH_PATTERN.sub(replace, parts[i])
+    return "".join(parts), rendered
+
+def _inline_markdown(text: str) -> str:
+    """Inline code, bold and italic on already-escaped text"""
+    pieces = re.split(r"(`[^`\n]+`)", text)
+    for i, piece in enumerate(pieces):
+        if i % 2:
+            pieces[i] = f"<code>{piece[1:-1]}</code>"
+        else:
+            piece = re.sub(r"\*\*(.+?)\*\*|__(.+?)__", lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", piece)
+            pieces[i] = re.sub(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])", r"<em>\1</em>", piece)
+    return "".join(pieces)
+
+def _basic_markdown(text: str) -> str:
+    """Small Markdown subset used when the markdown package is not installed"""
+    blocks = []
+    for i, part in enumerate(re.split(r"^```[^\n]*\n(.*?)(?:^```[^\n]*$|\Z)", text, flags=re.DOTALL | re.MULTILINE)):
+        if i % 2:
+            code = html.escape(part.rstrip("\n"))
+            blocks.append(f"<pre><code>{code}</code></pre>")
+            continue
+        for paragraph in re.split(r"\n\s*\n", html.escape(part, quote=False).strip()):
+            if not paragraph:
+                continue
+            lines = paragraph.split("\n")
+            heading = HEADING_PATTERN.match(lines[0])
+            if heading:
+                level = len(heading.group(1))
+                blocks.append(f"<h{level}>{_inline_markdown(heading.group(2))}</h{level}>")
+                lines = lines[1:]
+            if not lines:
+                continue
+            if all(BULLET_PATTERN.match(line) for line in lines):
+                items = "".join(f"<li>{_inline_markdown(BULLET_PATTERN.sub('', line))}</li>" for line in lines)
+                blocks.append(f"<ul>{items}</ul>")
+            elif all(NUMBERED_PATTERN.match(line) for line in lines):
+                items = "".join(f"<li>{_inline_markdown(NUMBERED_PATTERN.sub('', line))}</li>" for line in lines)
+                blocks.append(f"<ol>{items}</ol>")
+            else:
+                blocks.append(f"<p>{'<br>'.join(_inline_markdown(line) for line in lines)}</p>")
+    return "".join(blocks)
+
+def _sanitize_urls(fragment: str) -> str:
+    """Neutralize link and image targets with unsafe schemes such as javascript:"""
+    def replace(match):
+        url = html.unescape(match.group(3)).strip()
+        return match.group(0) if SAFE_URL_PATTERN.match(url) else f'{match.group(1)}="#"'
+    return URL_ATTRIBUTE_PATTERN.sub(replace, fragment)
+
+def _single_line(fragment: str) -> str:
+    """Keep a fragment on one line so st.markdown treats it as a single HTML block"""
+    fragment = PRE_BLOCK_PATTERN.sub(lambda m: m.group(0).replace("\n", "&#10;"), fragment)
+    return fragment.replace("\n", " ")
+
+def markdown_to_html(text: str) -> str:
+    """Convert Markdown with fenced code and math into sanitized HTML"""
+    text, math_fragments = _extract_math(text or "")
+    if MARKDOWN_AVAILABLE:
+        with _markdown_lock:
+            converter = _get_markdown()
+            converter.reset()
+            body = converter.convert(text)
+    else:
+        body = _basic_markdown(text)
+    for i, fragment in enumerate(math_fragments):
+        body = body.replace(MATH_PLACEHOLDER.format(i), fragment)
+    # Checked after the math is put back so no fragment skips it
+    return _single_line(_sanitize_urls(body))
+
+def exchange_id(exchange: Dict) -> str:
+    """Stable ID of an exchange; older exchanges without one are identified by content"""
+    if exchange.get("id"):
+        return exchange["id"]
+    return hash_text(f"{exchange.get('timestamp')}|{exchange['question']}|{exchange['answer']}")
+
+def render_exchange(exchange: Dict) -> str:
+    """Build the HTML for one question/answer pair"""
+    time_text = datetime.fromtimestamp(exchange["timestamp"]).strftime("%H:%M:%S")
+    question = html.escape(exchange["question"]).replace("\n", "<br>")
+    return (
+        USER_BUBBLE_TEMPLATE.format(body=question, time=time_text)
+        + TUTOR_BUBBLE_TEMPLATE.format(body=markdown_to_html(exchange["answer"]), time=time_text)
+    )
+
+class RenderedExchangeCache:
+    """Bounded cache of rendered exchange HTML keyed by exchange ID"""
+
+    def __init__(self, max_entries: int = 2000):
+        self.max_entries = max_entries
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, exchange: Dict) -> str:
+        """Return the rendered HTML for an exchange, rendering it on first use"""
+        key = exchange_id(exchange)
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                return fragment
+        fragment = render_exchange(exchange)
+        with self._lock:
+            self._fragments[key] = fragment
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+        return fragment
+
+    def render_many(self, exchanges: List[Dict]) -> str:
+        """Concatenate the rendered HTML of several exchanges"""
+        return "".join(self.get(exchange) for exchange in exchanges)
+
+    def clear(self) -> None:
+        """Drop every rendered fragment"""
+        with self._lock:
+            self._fragments.clear()
+
+_rendered_cache = None
+_rendered_cache_lock = threading.Lock()
+
+def get_rendered_cache() -> RenderedExchangeCache:
+    """Return the process-wide rendered exchange cache"""
+    global _rendered_cache
+    with _rendered_cache_lock:
+        if _rendered_cache is None:
+            _rendered_cache = RenderedExchangeCache(max_entries=UI_CONFIG["rendered_cache_max_entries"])
+        return _rendered_cache
@@ -0,0 +1,144 @@
+"""
+Reference material retrieval for the AI Educational Tutor application.
+
+Uploaded documents are split into overlapping chunks and indexed in an
+in-memory inverted index. Questions are scored against it with Okapi BM25 so
+only the most relevant chunks are placed in the prompt.
+"""
+
+import heapq
+import itertools
+import math
+import re
+from collections import Counter, defaultdict
+from typing import List, Tuple
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+SOURCE_HEADER_PATTERN = re.compile(r"\n*--- Content from (.+?) ---\n")
+
+STOPWORDS = frozenset("""
+a an the and or but if of to in on at by for with from about into as is are was were be been being
+do does did i me my we you your it its this that these those there here can could would should will
+what how why when where which who
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed"""
+    return [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+def chunk_text(text: str, chunk_size: int = 500, overlap: int = 100) -> List[str]:
+    """Split text into roughly chunk_size-character chunks that overlap slightly"""
+    text = text.strip()
+    if len(text) <= chunk_size:
+        return [text] if text else []
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            # Prefer to break at a paragraph, sentence or word boundary
+            window = text[start:end]
+            for separator in ("\n\n", ". ", "\n", " "):
+                cut = window.rfind(separator)
+                if cut > chunk_size // 2:
+                    end = start + cut + len(separator)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+class BM25Index:
+    """Inverted index over text chunks with Okapi BM25 scoring"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {chunk_id: term frequency}
+        self.chunks = {}                   # chunk_id -> (doc_id, source, text, length)
+        self.doc_chunks = {}               # doc_id -> [chunk_id, ...]
+        self.total_length = 0
+        self._next_chunk_id = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add_document(self, doc_id: str, text: str, source: str = "",
+                     chunk_size: int = 500, overlap: int = 100) -> int:
+        """Chunk and index a document, returning the number of chunks added"""
+        if doc_id in self.doc_chunks:
+            self.remove_document(doc_id)
+        chunk_ids = []
+        for chunk in chunk_text(text, chunk_size, overlap):
+            terms = Counter(tokenize(chunk))
+            if not terms:
+                continue
+            chunk_id = next(self._next_chunk_id)
+            length = sum(terms.values())
+            self.chunks[chunk_id] = (doc_id, source, chunk, length)
+            self.total_length += length
+            for term, frequency in terms.items():
+                self.postings[term][chunk_id] = frequency
+            chunk_ids.append(chunk_id)
+        self.doc_chunks[doc_id] = chunk_ids
+        return len(chunk_ids)
+
+    def remove_document(self, doc_id: str) -> None:
+        """Remove every chunk belonging to a document"""
+        for chunk_id in self.doc_chunks.pop(doc_id, []):
+            _, _, chunk, length = self.chunks.pop(chunk_id)
+            self.total_length -= length
+            for term in set(tokenize(chunk)):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self.postings[term]
+
+    def search(self, query: str, top_k: int = 4) -> List[Tuple[float, str, str]]:
+        """Return (score, source, chunk text) for the best matching chunks"""
+        if not self.chunks:
+            return []
+        chunk_count = len(self.chunks)
+        average_length = self.total_length / chunk_count
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            document_frequency = len(postings)
+            idf = math.log(1 + (chunk_count - document_frequency + 0.5) / (document_frequency + 0.5))
+            for chunk_id, frequency in postings.items():
+                length = self.chunks[chunk_id][3]
+                norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                scores[chunk_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(score, self.chunks[chunk_id][1], self.chunks[chunk_id][2]) for chunk_id, score in best]
+
+def split_reference_sources(reference_content: str) -> List[Tuple[str, str]]:
+    """Split concatenated reference content back into (source name, text) pairs"""
+    parts = SOURCE_HEADER_PATTERN.split(reference_content)
+    sources = []
+    if parts[0].strip():
+        sources.append(("Reference", parts[0]))
+    for i in range(1, len(parts) - 1, 2):
+        sources.append((parts[i], parts[i + 1]))
+    return sources
+
+def fuse_results(result_lists: List[List[Tuple[float, str, str]]], top_k: int = 4, k: int = 60) -> List[Tuple[float, str, str]]:
+    """Merge ranked result lists with reciprocal rank fusion"""
+    fused = defaultdict(float)
+    for results in result_lists:
+        for rank, (_, source, text) in enumerate(results):
+            fused[(source, text)] += 1.0 / (k + rank + 1)
+    best = heapq.nlargest(top_k, fused.items(), key=lambda item: item[1])
+    return [(score, source, text) for (source, text), score in best]
+
+def format_retrieved_chunks(results: List[Tuple[float, str, str]]) -> str:
+    """Render retrieved chunks for inclusion in the prompt"""
+    return "\n\n".join(f"[From {source}]\n{text}" for _, source, text in results)
@@ -0,0 +1,139 @@
+"""
+Semantic answer cache for the AI Educational Tutor application.
+
+Questions are embedded locally and compared against earlier questions for the
+same subject and context, so rephrasings of an answered question reuse its answer.
+A hit also needs the same numbers, operators, negations, question words and
+conversion directions as the stored question, since "2+3" and "2*3" or "how"
+and "why" questions embed almost identically. Subjects where that is not
+enough (math) can be excluded.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from config import CACHE_CONFIG
+from embeddings import embed_text, question_signature
+
+class _Bucket:
+    """Fixed-capacity embedding matrix and answers for one subject/context"""
+
+    def __init__(self, capacity: int, dim: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.answers = [None] * capacity
+        self.signatures = [None] * capacity
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.size = 0
+
+    def lookup(self, vector: np.ndarray, signature: Tuple[str, ...]) -> Tuple[int, float]:
+        """Return the index and cosine similarity of the closest stored question with the same signature"""
+        if self.size == 0:
+            return -1, 0.0
+        # Rows are L2-normalized, so one matrix-vector product gives every cosine similarity
+        scores = self.vectors[:self.size] @ vector
+        mismatched = [i for i, stored in enumerate(self.signatures[:self.size]) if stored != signature]
+        scores[mismatched] = -np.inf
+        best = int(np.argmax(scores))
+        if scores[best] == -np.inf:
+            return -1, 0.0
+        return best, float(scores[best])
+
+    def store(self, vector: np.ndarray, signature: Tuple[str, ...], answer: str) -> None:
+        """Add an entry, overwriting the least recently used slot when full"""
+        if self.size < len(self.answers):
+            slot = self.size
+            self.size += 1
+        else:
+            slot = int(np.argmin(self.last_used))
+        self.vectors[slot] = vector
+        self.answers[slot] = answer
+        self.signatures[slot] = signature
+        self.last_used[slot] = time.monotonic()
+
+class SemanticCache:
+    """Near-duplicate question cache using cosine similarity of local embeddings"""
+
+    def __init__(self, threshold: float = 0.95, max_entries_per_bucket: int = 128,
+                 max_buckets: int = 64, dim: int = 512, excluded_subjects: Iterable[str] = ()):
+        self.threshold = threshold
+        self.excluded_subjects = frozenset(excluded_subjects)
+        self.max_entries_per_bucket = max_entries_per_bucket
+        self.max_buckets = max_buckets
+        self.dim = dim
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0}
+
+    def get(self, subject: str, context: str, question: str) -> Optional[str]:
+        """Return the answer to a sufficiently similar earlier question, if any"""
+        if subject in self.excluded_subjects:
+            return None
+        vector = embed_text(question, self.dim)
+        signature = question_signature(question)
+        with self._lock:
+            bucket = self._buckets.get((subject, context))
+            if bucket is not None:
+                self._buckets.move_to_end((subject, context))
+                index, score = bucket.lookup(vector, signature)
+                if index >= 0 and score >= self.threshold:
+                    bucket.last_used[index] = time.monotonic()
+                    self._stats["hits"] += 1
+                    return bucket.answers[index]
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, subject: str, context: str, question: str, answer: str) -> None:
+        """Remember an answer for later near-duplicate lookups"""
+        if subject in self.excluded_subjects:
+            return
+        vector = embed_text(question, self.dim)
+        signature = question_signature(question)
+        with self._lock:
+            key = (subject, context)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = _Bucket(self.max_entries_per_bucket, self.dim)
+                self._buckets[key] = bucket
+                # Drop whole buckets for the least recently used subject/context
+                while len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            bucket.store(vector, signature, answer)
+            self._stats["stores"] += 1
+
+    def clear(self) -> None:
+        """Forget every stored question"""
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["buckets"] = len(self._buckets)
+            stats["entries"] = sum(bucket.size for bucket in self._buckets.values())
+        return stats
+
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Return the process-wide semantic cache, or None when it is disabled"""
+    global _semantic_cache
+    if not CACHE_CONFIG.get("semantic_enabled", True):
+        return None
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            _semantic_cache = SemanticCache(
+                threshold=CACHE_CONFIG["semantic_threshold"],
+                max_entries_per_bucket=CACHE_CONFIG["semantic_max_entries_per_subject"],
+                max_buckets=CACHE_CONFIG["semantic_max_subjects"],
+                dim=CACHE_CONFIG["semantic_dim"],
+                excluded_subjects=CACHE_CONFIG.get("semantic_excluded_subjects", ())
+            )
+        return _semantic_cache
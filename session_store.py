@@ -0,0 +1,160 @@
+"""
+Persistent chat sessions for the AI Educational Tutor application.
+
+Every exchange is appended as a single row to a SQLite database in WAL mode,
+so saving costs the same no matter how long the conversation is, and readers
+in other Streamlit sessions are never blocked by a writer. History is read
+back in pages, newest first, only as far as the user scrolls.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import SESSION_STORE_CONFIG
+
+class SessionStore:
+    """Append-only SQLite store of chat exchanges grouped by session"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, created REAL NOT NULL, updated REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS exchanges ("
+            "row INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, exchange_id TEXT NOT NULL, "
+            "subject TEXT NOT NULL, question TEXT NOT NULL, answer TEXT NOT NULL, timestamp REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS exchanges_by_session ON exchanges (session_id, row);"
+            "CREATE TABLE IF NOT EXISTS exports ("
+            "session_id TEXT PRIMARY KEY, last_row INTEGER NOT NULL, exported REAL NOT NULL);"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection (Streamlit runs each session's script on its own thread)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # With WAL, NORMAL only risks the last commits on power loss, never corruption
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create_session(self) -> str:
+        """Start a new session and return its ID"""
+        session_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute("INSERT INTO sessions (id, created, updated) VALUES (?, ?, ?)", (session_id, now, now))
+        return session_id
+
+    def has_session(self, session_id: str) -> bool:
+        """Check whether a session exists"""
+        row = self._connection().execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row is not None
+
+    def append(self, session_id: str, exchange: Dict) -> int:
+        """Write one exchange and return its row number"""
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO exchanges (session_id, exchange_id, subject, question, answer, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, exchange.get("id") or uuid.uuid4().hex, exchange["subject"],
+                 exchange["question"], exchange["answer"], exchange["timestamp"])
+            )
+            conn.execute("UPDATE sessions SET updated = ? WHERE id = ?", (time.time(), session_id))
+        return cursor.lastrowid
+
+    def load_page(self, session_id: str, before: Optional[int] = None,
+                  limit: int = 50) -> Tuple[List[Dict], Optional[int]]:
+        """Return up to limit exchanges older than row `before`, oldest first, and the cursor for the next page"""
+        query = "SELECT row, exchange_id, subject, question, answer, timestamp FROM exchanges WHERE session_id = ?"
+        params = [session_id]
+        if before is not None:
+            query += " AND row < ?"
+            params.append(before)
+        query += " ORDER BY row DESC LIMIT ?"
+        params.append(limit + 1)
+        rows = self._connection().execute(query, params).fetchall()
+
+        # The extra row only tells us whether another page exists
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        exchanges = [
+            {"id": exchange_id, "question": question, "answer": answer, "subject": subject, "timestamp": timestamp}
+            for _, exchange_id, subject, question, answer, timestamp in reversed(rows)
+        ]
+        next_cursor = rows[-1][0] if has_more else None
+        return exchanges, next_cursor
+
+    def iter_exchanges(self, session_id: str, after: int = 0, page_size: int = 500) -> Iterator[Tuple[int, Dict]]:
+        """Yield (row, exchange) for a session in order, reading one page at a time"""
+        conn = self._connection()
+        while True:
+            rows = conn.execute(
+                "SELECT row, exchange_id, subject, question, answer, timestamp FROM exchanges "
+                "WHERE session_id = ? AND row > ? ORDER BY row LIMIT ?",
+                (session_id, after, page_size)
+            ).fetchall()
+            for row, exchange_id, subject, question, answer, timestamp in rows:
+                yield row, {"id": exchange_id, "question": question, "answer": answer,
+                            "subject": subject, "timestamp": timestamp}
+            if len(rows) < page_size:
+                return
+            after = rows[-1][0]
+
+    def iter_session_ids(self) -> Iterator[str]:
+        """Yield every session ID, oldest session first"""
+        for (session_id,) in self._connection().execute("SELECT id FROM sessions ORDER BY created").fetchall():
+            yield session_id
+
+    def get_export_cursor(self, session_id: str) -> int:
+        """Last row included in the previous export of a session (0 if never exported)"""
+        row = self._connection().execute(
+            "SELECT last_row FROM exports WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def set_export_cursor(self, session_id: str, last_row: int) -> None:
+        """Remember the last row included in an export"""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO exports (session_id, last_row, exported) VALUES (?, ?, ?)",
+                (session_id, last_row, time.time())
+            )
+
+    def count(self, session_id: str) -> int:
+        """Number of exchanges stored for a session"""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM exchanges WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+
+    def clear_session(self, session_id: str) -> None:
+        """Delete every exchange of a session but keep the session itself"""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM exchanges WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM exports WHERE session_id = ?", (session_id,))
+            conn.execute("UPDATE sessions SET updated = ? WHERE id = ?", (time.time(), session_id))
+
+_session_store = None
+_session_store_lock = threading.Lock()
+
+def get_session_store() -> Optional[SessionStore]:
+    """Return the process-wide session store, or None when persistence is disabled"""
+    global _session_store
+    if not SESSION_STORE_CONFIG.get("enabled", True):
+        return None
+    with _session_store_lock:
+        if _session_store is None:
+            _session_store = SessionStore(SESSION_STORE_CONFIG["path"])
+        return _session_store
@@ -0,0 +1,169 @@
+"""
+In-flight request coalescing for the AI Educational Tutor application.
+
+When many sessions ask the same question at once (a class clicking the same
+example question), only the first caller sends it to the model. Everyone else
+with the same key (subject, normalized question, reference and history
+fingerprint, i.e. the response cache key) attaches to that call while it is
+pending. Followers receive the leader's chunks as they stream in, and then the
+same answer or the same exception. Once the call completes, the response cache
+takes over.
+
+Coalescing is per process. Streamlit serves every session from one process,
+so this covers the classroom case. When several processes or hosts serve the
+tutor (API replicas behind a load balancer), the design extends as follows:
+
+1. Route by key. A balancer that hashes the question key sends identical
+   requests to the same process, where this module coalesces them. No shared
+   state is needed; a replica restart only costs a cache miss.
+2. Lease in shared storage. Otherwise a leader claims the key before calling
+   the model with a short lease:
+   - on one host: INSERT OR IGNORE into an `inflight(key, owner, expires)`
+     table in the response cache's SQLite file;
+   - across hosts: Redis `SET key owner NX PX <lease>`.
+   Followers that fail to claim the key poll the shared response cache tier,
+   or subscribe to a pub/sub channel named after the key, until the answer
+   lands. If the lease expires first (the leader crashed), a follower takes
+   it over. The leader renews the lease while streaming and deletes it after
+   storing the answer.
+   Cross-process followers get the finished answer rather than live chunks,
+   and an in-process SingleFlight still sits in front, so each process waits
+   on the shared lease at most once per key.
+"""
+
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import SINGLE_FLIGHT_CONFIG
+from metrics import get_metrics
+
+class FlightAbandoned(RuntimeError):
+    """The leading caller stopped before its answer was complete"""
+
+class Flight:
+    """One pending call: the chunks produced so far and, once finished, its outcome"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+        self._condition = threading.Condition()
+
+    def publish(self, text: str) -> None:
+        """Hand a chunk to every follower"""
+        with self._condition:
+            self.chunks.append(text)
+            self._condition.notify_all()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """Mark the call complete, successfully or with an error"""
+        with self._condition:
+            self.done = True
+            self.error = error
+            self._condition.notify_all()
+
+    def follow(self, timeout: Optional[float] = None) -> Iterator[str]:
+        """Yield every chunk from the first, waiting for new ones until the call finishes"""
+        position = 0
+        while True:
+            with self._condition:
+                if not self._condition.wait_for(lambda: self.done or len(self.chunks) > position, timeout):
+                    raise TimeoutError("Timed out waiting for an identical request in flight")
+                new_chunks = self.chunks[position:]
+                done, error = self.done, self.error
+            position += len(new_chunks)
+            yield from new_chunks
+            if done and position == len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+class SingleFlight:
+    """Share one model call among concurrent callers asking with the same key"""
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "followers": 0, "abandoned": 0}
+
+    def _join(self, key: str) -> Tuple[Flight, bool]:
+        """Return the pending flight for a key and whether the caller leads it"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self._stats["followers"] += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            self._stats["leaders"] += 1
+            return flight, True
+
+    def _leave(self, key: str, flight: Flight) -> None:
+        """Forget a finished flight so the next caller starts a new one"""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def stream(self, key: str, produce: Callable[[], Iterator[str]], timeout: Optional[float] = None) -> Iterator[str]:
+        """Yield produce()'s chunks, calling it only if no identical call is already pending"""
+        while True:
+            flight, leader = self._join(key)
+            if leader:
+                break
+            received = False
+            try:
+                for text in flight.follow(timeout):
+                    received = True
+                    yield text
+                return
+            except FlightAbandoned:
+                # The leader went away before sending anything; lead or join a new call instead
+                if received:
+                    raise
+
+        outcome = None
+        try:
+            for text in produce():
+                flight.publish(text)
+                yield text
+        except Exception as e:
+            outcome = e
+            raise
+        except BaseException:
+            # GeneratorExit (the leader's consumer stopped reading), KeyboardInterrupt, ...
+            with self._lock:
+                self._stats["abandoned"] += 1
+            outcome = FlightAbandoned("The original request for this question was cancelled")
+            raise
+        finally:
+            # Callers arriving from now on start a new call (or hit the response cache)
+            self._leave(key, flight)
+            flight.finish(outcome)
+
+    def in_flight(self) -> int:
+        """Number of distinct calls currently pending"""
+        with self._lock:
+            return len(self._flights)
+
+    def stats(self) -> Dict[str, int]:
+        """Leader, follower and abandoned call counts"""
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._flights))
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+def get_single_flight() -> Optional[SingleFlight]:
+    """Return the process-wide coalescer, or None when coalescing is disabled"""
+    global _single_flight
+    if not SINGLE_FLIGHT_CONFIG.get("enabled", True):
+        return None
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight()
+            get_metrics().register_gauge(
+                "tutor_coalesced_calls_pending", "Distinct questions waiting on a shared model call",
+                _single_flight.in_flight
+            )
+        return _single_flight
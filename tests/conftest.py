@@ -0,0 +1,9 @@
+"""
+Shared test setup for the AI Educational Tutor application.
+"""
+
+import os
+import sys
+
+# The application modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
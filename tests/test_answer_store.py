@@ -0,0 +1,32 @@
+"""
+Tests for the pre-generated answer store.
+"""
+
+import sqlite3
+
+from answer_store import AnswerStore, pregenerated_key
+from utils import build_custom_subject
+
+def test_custom_subjects_are_deduplicated_by_name_and_context_and_capped(tmp_path):
+    store = AnswerStore(str(tmp_path / "answers.sqlite3"), max_custom_subjects=2)
+    assert store.register_custom_subject("Chess", build_custom_subject("Chess", context="openings"))
+    assert not store.register_custom_subject("Chess", build_custom_subject("Chess", context="openings"))
+    assert store.register_custom_subject("Chess", build_custom_subject("Chess", context="endgames"))
+    assert not store.register_custom_subject("Go", build_custom_subject("Go"))
+    assert [(entry["name"], entry["context"]) for entry in store.iter_custom_subjects()] == [
+        ("Chess", "openings"), ("Chess", "endgames")
+    ]
+
+def test_keys_depend_on_the_model():
+    question = "What are the basics of Chess?"
+    assert pregenerated_key("Chess", "openings", question, "model-a") != pregenerated_key("Chess", "openings", question, "model-b")
+
+def test_stores_from_before_model_keys_are_cleared(tmp_path):
+    path = str(tmp_path / "answers.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE custom_subjects (name TEXT PRIMARY KEY, description TEXT NOT NULL, "
+                     "context TEXT NOT NULL, icon TEXT NOT NULL, created REAL NOT NULL)")
+        conn.execute("INSERT INTO custom_subjects VALUES ('Chess', '', 'openings', '', 0)")
+    store = AnswerStore(path)
+    assert list(store.iter_custom_subjects()) == []
+    assert store.register_custom_subject("Chess", build_custom_subject("Chess", context="endgames"))
@@ -0,0 +1,49 @@
+"""
+Tests for resuming a batch run from its output file.
+"""
+
+import json
+
+import pytest
+
+from batch_answer import BatchRunner, load_checkpoint, open_output
+
+class FakeTutor:
+    model_name = "fake-model"
+
+    def __init__(self):
+        self.asked = []
+
+    def answer(self, question, subject, chat_history, reference_content=""):
+        self.asked.append(question)
+        return f"answer to {question}", "model"
+
+def row(row_id: str, question: str) -> dict:
+    return {"id": row_id, "subject": "Basic Algebra", "question": question}
+
+@pytest.mark.parametrize("cut", [2, 3, 4], ids=["before", "inside", "after"])
+def test_resume_after_truncated_multibyte_line(tmp_path, cut):
+    path = tmp_path / "answers.jsonl"
+    done_line = json.dumps({**row("1", "What is 2 × 3?"), "answer": "6 ×", "source": "model"}, ensure_ascii=False)
+    failed_line = json.dumps({**row("2", "What is 4 × 5?"), "error": "quota", "error_class": "quota"})
+    # The run was killed around writing "×" (0xC3 0x97) in question 3's answer
+    cut_line = json.dumps({**row("3", "What is 6 × 7?"), "answer": "x ×"}, ensure_ascii=False).encode("utf-8")
+    cut_line = cut_line[:cut_line.index("x ×".encode("utf-8")) + cut]
+    path.write_bytes((done_line + "\n" + failed_line + "\n").encode("utf-8") + cut_line)
+
+    done = load_checkpoint(str(path))
+    assert done == {"1"}
+
+    tutor = FakeTutor()
+    with open_output(str(path)) as output:
+        counts = BatchRunner(tutor, workers=2).run(
+            iter([row("1", "What is 2 × 3?"), row("2", "What is 4 × 5?"), row("3", "What is 6 × 7?")]),
+            output, done, progress_every=0
+        )
+
+    assert counts == {"answered": 2, "cached": 0, "failed": 0, "skipped": 1}
+    assert sorted(tutor.asked) == ["What is 4 × 5?", "What is 6 × 7?"]
+    assert load_checkpoint(str(path)) == {"1", "2", "3"}
+    # Every line written after the resume is whole JSON
+    lines = path.read_bytes().split(b"\n")
+    assert [json.loads(line)["id"] for line in lines[3:] if line] in (["2", "3"], ["3", "2"])
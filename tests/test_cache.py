@@ -0,0 +1,14 @@
+"""
+Tests for response cache keys.
+"""
+
+from cache import make_cache_key, make_context_fingerprint
+
+def test_subject_context_is_part_of_the_key():
+    question = "What are the basics of Chess?"
+    assert make_cache_key("Chess", "openings", question, "", []) != make_cache_key("Chess", "endgames", question, "", [])
+    assert make_context_fingerprint("openings", "", []) != make_context_fingerprint("endgames", "", [])
+
+def test_trivial_question_variations_share_a_key():
+    assert make_cache_key("Chess", "openings", "What is castling?", "", []) == \
+        make_cache_key("Chess", "openings", "  what is CASTLING ", "", [])
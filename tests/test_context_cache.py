@@ -0,0 +1,27 @@
+"""
+Tests for the cached-prefix lifecycle and its per-key locks.
+"""
+
+from context_cache import ContextCacheManager, LocalContextCacheBackend
+
+def make_manager(**kwargs) -> ContextCacheManager:
+    return ContextCacheManager(LocalContextCacheBackend(object()), min_tokens=1, max_tokens=1000, **kwargs)
+
+def test_evicted_keys_release_their_locks():
+    manager = make_manager(max_handles=2)
+    for i in range(50):
+        assert manager.get_model(f"key-{i}", "model", lambda: ("System prompt.", f"Material {i}.", True))
+    assert manager.stats()["live_handles"] == 2
+    assert set(manager._key_locks) == {"key-48", "key-49"}
+
+def test_ineligible_and_failed_keys_release_their_locks():
+    manager = make_manager()
+    assert manager.get_model("too-big", "model", lambda: ("System prompt.", "word " * 5000, True)) is None
+
+    def fail(*args):
+        raise RuntimeError("model does not support cached content")
+    manager.backend.create = fail
+    assert manager.get_model("failing", "model", lambda: ("System prompt.", "Material.", True)) is None
+    assert manager._key_locks == {}
+    assert manager.stats()["ineligible"] == 1
+    assert manager.stats()["errors"] == 1
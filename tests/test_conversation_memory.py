@@ -0,0 +1,61 @@
+"""
+Tests for rolling conversation summaries.
+"""
+
+import pytest
+
+import conversation_memory
+from conversation_memory import ConversationMemory
+from token_counter import count_tokens
+
+class InlineExecutor:
+    """Runs folds on the calling thread so tests see their result immediately"""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+@pytest.fixture(autouse=True)
+def inline_folds(monkeypatch):
+    monkeypatch.setattr(conversation_memory, "get_summary_executor", lambda: InlineExecutor())
+
+def exchange(i: int) -> dict:
+    return {"subject": "Biology", "question": f"Question {i} about cells?", "answer": f"Answer {i}. " + "Cells divide. " * 300}
+
+class RecordingSummarizer:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, subject, previous_summary, exchanges):
+        self.batches.append(exchanges)
+        return f"summary after {exchanges[-1]['question']}"
+
+def batch_tokens(batch, answer_tokens):
+    return sum(count_tokens(e["question"]) + min(count_tokens(e["answer"]), answer_tokens) + 4 for e in batch)
+
+def test_restored_backlog_is_folded_in_budgeted_batches():
+    summarizer = RecordingSummarizer()
+    memory = ConversationMemory(summarizer, window=5, fold_input_tokens=4000, fold_answer_tokens=400, max_fold_calls=2)
+    memory.update([exchange(i) for i in range(100)])
+    assert 1 <= len(summarizer.batches) <= 2
+    assert all(batch_tokens(batch, 400) <= 4000 for batch in summarizer.batches)
+    # The newest folded exchange is the last one outside the verbatim window
+    assert summarizer.batches[-1][-1]["question"] == "Question 94 about cells?"
+    assert memory.get_summary("Biology") == "summary after Question 94 about cells?"
+
+def test_folds_happen_every_few_questions():
+    summarizer = RecordingSummarizer()
+    memory = ConversationMemory(summarizer, window=5, fold_every=5)
+    history = []
+    for i in range(20):
+        history.append(exchange(i))
+        memory.update(history)
+    # 15 exchanges have left the window: three folds of five, not fifteen of one
+    assert [len(batch) for batch in summarizer.batches] == [5, 5, 5]
+
+def test_unfolded_exchanges_still_reach_the_prompt():
+    summarizer = RecordingSummarizer()
+    memory = ConversationMemory(summarizer, window=5, fold_every=5)
+    memory.update([exchange(i) for i in range(7)])
+    assert summarizer.batches == []
+    summary = memory.get_summary("Biology")
+    assert "Question 0 about cells?" in summary and "Question 1 about cells?" in summary
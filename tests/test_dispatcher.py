@@ -0,0 +1,64 @@
+"""
+Tests for the rate-limited request dispatcher.
+"""
+
+import threading
+import time
+
+from dispatcher import RequestDispatcher
+
+def test_streamed_generations_hold_a_slot_until_exhausted():
+    dispatcher = RequestDispatcher(requests_per_minute=6000, max_concurrency=2)
+    lock = threading.Lock()
+    active = [0, 0]  # current, peak
+
+    def generate(prompt, stream=False):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        try:
+            for i in range(3):
+                time.sleep(0.02)
+                yield f"{prompt}{i}"
+        finally:
+            with lock:
+                active[0] -= 1
+
+    results = {}
+    def ask(n):
+        results[n] = "".join(dispatcher.stream_sync(generate, str(n), stream=True, timeout=5))
+
+    threads = [threading.Thread(target=ask, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {n: f"{n}0{n}1{n}2" for n in range(6)}
+    assert active[1] == 2
+
+def test_closing_a_stream_frees_its_slot():
+    dispatcher = RequestDispatcher(requests_per_minute=6000, max_concurrency=1)
+
+    def generate(prompt, stream=False):
+        while True:
+            time.sleep(0.01)
+            yield prompt
+
+    stream = dispatcher.stream_sync(generate, "a", stream=True, timeout=5)
+    assert next(stream) == "a"
+    stream.close()
+    assert next(dispatcher.stream_sync(generate, "b", stream=True, timeout=5)) == "b"
+
+def test_errors_before_the_first_chunk_are_retried():
+    dispatcher = RequestDispatcher(requests_per_minute=6000, base_delay=0.01)
+    attempts = []
+
+    def generate(prompt, stream=False):
+        attempts.append(prompt)
+        if len(attempts) == 1:
+            raise TimeoutError("timed out")
+        yield prompt
+
+    assert list(dispatcher.stream_sync(generate, "a", stream=True, timeout=5)) == ["a"]
+    assert len(attempts) == 2
@@ -0,0 +1,43 @@
+"""
+Tests for incremental session exports and their cursor.
+"""
+
+import io
+import json
+
+from history_export import export_session
+from session_store import SessionStore
+
+def make_store(tmp_path, exchanges: int):
+    store = SessionStore(str(tmp_path / "sessions.sqlite3"))
+    session_id = store.create_session()
+    for i in range(exchanges):
+        store.append(session_id, {"question": f"Q{i}", "answer": f"A{i}", "subject": "Calculus", "timestamp": 0})
+    return store, session_id
+
+def exported_questions(output: io.BytesIO) -> list:
+    return [json.loads(line)["question"] for line in output.getvalue().decode("utf-8").splitlines()]
+
+def test_unrecorded_export_leaves_the_cursor(tmp_path):
+    store, session_id = make_store(tmp_path, exchanges=3)
+    first = io.BytesIO()
+    last_row = export_session(store, session_id, "", first, since_last_export=True, record=False)
+    assert store.get_export_cursor(session_id) == 0
+
+    # A prepared but never downloaded export does not hide those exchanges from the next one
+    second = io.BytesIO()
+    export_session(store, session_id, "", second, since_last_export=True, record=False)
+    assert exported_questions(second) == ["Q0", "Q1", "Q2"]
+
+    store.set_export_cursor(session_id, last_row)
+    third = io.BytesIO()
+    export_session(store, session_id, "", third, since_last_export=True, record=False)
+    assert exported_questions(third) == []
+
+def test_recorded_export_moves_the_cursor(tmp_path):
+    store, session_id = make_store(tmp_path, exchanges=2)
+    export_session(store, session_id, "", io.BytesIO(), since_last_export=True)
+    store.append(session_id, {"question": "Q2", "answer": "A2", "subject": "Calculus", "timestamp": 0})
+    output = io.BytesIO()
+    export_session(store, session_id, "", output, since_last_export=True)
+    assert exported_questions(output) == ["Q2"]
@@ -0,0 +1,44 @@
+"""
+Tests for prompt assembly with a cached prefix.
+"""
+
+from prompt_builder import PromptBuilder
+from reference_store import ReferenceStore
+from token_counter import count_tokens
+
+def make_references(paragraphs: int) -> ReferenceStore:
+    references = ReferenceStore()
+    filler = "\n".join(f"Paragraph {i} covers cell membranes and enzyme reactions in detail." for i in range(paragraphs))
+    references.add("biology.txt", filler + "\nChlorophyll absorbs red and blue light for photosynthesis.")
+    return references
+
+def test_small_material_is_cached_whole():
+    builder = PromptBuilder()
+    system_prompt, content, complete = builder.build_cached_prefix("Biology", "biology", make_references(20), 16000)
+    assert complete
+    assert "Chlorophyll absorbs" in content
+    suffix = builder.build_uncached_suffix([], "What does chlorophyll absorb?")
+    assert "Chlorophyll absorbs" not in suffix
+
+def test_large_material_is_sliced_and_retrieved_per_question():
+    builder = PromptBuilder()
+    references = make_references(5000)
+    system_prompt, content, complete = builder.build_cached_prefix("Biology", "biology", references, 4000)
+    assert not complete
+    assert count_tokens(system_prompt) + count_tokens(content) <= 4000
+    assert "Chlorophyll absorbs" not in content
+    suffix = builder.build_uncached_suffix([], "What does chlorophyll absorb?", references=references)
+    assert "Chlorophyll absorbs" in suffix
+    assert count_tokens(suffix) <= builder.max_input_tokens
+
+def test_prefix_and_suffix_share_the_request_budget():
+    builder = PromptBuilder()
+    references = make_references(5000)
+    system_prompt, content, complete = builder.build_cached_prefix("Biology", "biology", references, 16000)
+    cached_tokens = count_tokens(system_prompt) + count_tokens(content)
+    history = [{"question": f"Question {i} about enzymes?", "answer": "Enzymes speed up reactions. " * 40} for i in range(5)]
+    suffix = builder.build_uncached_suffix(
+        history, "What does chlorophyll absorb?", "Earlier we covered cell membranes. " * 200, references, 20000 - cached_tokens
+    )
+    assert "Chlorophyll absorbs" in suffix
+    assert cached_tokens + count_tokens(suffix) <= 20000
@@ -0,0 +1,31 @@
+"""
+Tests for sanitizing rendered answers, math included.
+"""
+
+import pytest
+
+import rendering
+from rendering import markdown_to_html
+
+@pytest.mark.skipif(not rendering.MATHML_AVAILABLE, reason="latex2mathml is not installed")
+@pytest.mark.parametrize("answer", [
+    r"$\text{<img src=x onerror=alert(1)>}$",
+    r"$$\href{javascript:alert(1)}{x}$$",
+    r"$\text{<script>alert(1)</script>}$",
+])
+def test_math_fragments_are_sanitized(answer):
+    body = markdown_to_html(answer)
+    assert "<math" in body
+    assert "<img" not in body and "<script" not in body
+    assert "javascript:" not in body and "onerror" not in body and "href" not in body
+
+@pytest.mark.skipif(not rendering.MATHML_AVAILABLE, reason="latex2mathml is not installed")
+def test_math_markup_is_kept():
+    body = markdown_to_html(r"$$\frac{a}{b} \le \sqrt{x}, \quad \color{red}{y}$$")
+    assert '<math xmlns="http://www.w3.org/1998/Math/MathML" display="block">' in body
+    assert "<mfrac>" in body and "<msqrt>" in body and 'mathcolor="red"' in body
+
+def test_unsafe_link_targets_are_neutralized():
+    body = markdown_to_html("[x](javascript:alert(1)) and [docs](https://docs.python.org)")
+    assert 'href="#"' in body
+    assert 'href="https://docs.python.org"' in body
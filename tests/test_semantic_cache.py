@@ -0,0 +1,40 @@
+"""
+Tests for the semantic answer cache.
+"""
+
+import pytest
+
+from semantic_cache import SemanticCache
+
+DIFFERENT_QUESTIONS = [
+    ("What is 2+3?", "What is 2*3?"),
+    ("solve 3x + 5 = 20", "3x - 5 = 20"),
+    ("convert Celsius to Fahrenheit", "Fahrenheit to Celsius"),
+    ("Why does a list work?", "Why does a list not work?"),
+    ("convert Celsius to Fahrenheit", "convert Fahrenheit to Celsius"),
+    ("How does photosynthesis work?", "Why does photosynthesis work?"),
+    ("Where is the mitochondria?", "What is the mitochondria?"),
+]
+
+@pytest.mark.parametrize("stored, asked", DIFFERENT_QUESTIONS)
+def test_different_questions_miss(stored, asked):
+    cache = SemanticCache()
+    cache.set("Python Programming", "", stored, "stored answer")
+    assert cache.get("Python Programming", "", asked) is None
+
+@pytest.mark.parametrize("asked", ["how to make a python class", "How to make a class in Python"])
+def test_rephrased_question_hits(asked):
+    cache = SemanticCache()
+    cache.set("Python Programming", "", "How do I create a class in Python?", "stored answer")
+    assert cache.get("Python Programming", "", asked) == "stored answer"
+
+def test_same_numbers_still_hit():
+    cache = SemanticCache()
+    cache.set("Data Science", "", "What does a p-value of 0.05 mean?", "stored answer")
+    assert cache.get("Data Science", "", "what does a p-value of 0.05 mean") == "stored answer"
+
+def test_excluded_subject_is_never_served():
+    cache = SemanticCache(excluded_subjects=["Basic Algebra"])
+    cache.set("Basic Algebra", "", "How do I solve linear equations?", "stored answer")
+    assert cache.get("Basic Algebra", "", "How do I solve linear equations?") is None
+    assert cache.stats()["entries"] == 0
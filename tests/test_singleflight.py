@@ -0,0 +1,101 @@
+"""
+Tests for in-flight request coalescing.
+"""
+
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+CALLERS = 20
+
+def wait_for_followers(flight: SingleFlight, count: int) -> None:
+    deadline = time.monotonic() + 5
+    while flight.stats()["followers"] < count:
+        assert time.monotonic() < deadline, "followers never joined"
+        time.sleep(0.001)
+
+def run_callers(flight: SingleFlight, produce, count: int = CALLERS):
+    """Stream the same key from `count` threads; return each caller's answer or exception"""
+    outcomes = [None] * count
+    def caller(i):
+        try:
+            outcomes[i] = "".join(flight.stream("key", produce, timeout=5))
+        except BaseException as e:
+            outcomes[i] = e
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def produce():
+        calls.append(1)
+        wait_for_followers(flight, CALLERS - 1)
+        yield "shared "
+        yield "answer"
+
+    assert run_callers(flight, produce) == ["shared answer"] * CALLERS
+    assert len(calls) == 1
+    assert flight.stats() == {"leaders": 1, "followers": CALLERS - 1, "abandoned": 0, "in_flight": 0}
+
+def test_every_caller_gets_the_same_exception():
+    flight = SingleFlight()
+    error = RuntimeError("quota exhausted")
+    calls = []
+
+    def produce():
+        calls.append(1)
+        wait_for_followers(flight, CALLERS - 1)
+        yield "partial"
+        raise error
+
+    assert all(outcome is error for outcome in run_callers(flight, produce))
+    assert len(calls) == 1
+
+def test_follower_retries_after_leader_abandons_without_chunks():
+    class Stopped(BaseException):
+        """Stands in for a rerun interrupting the leader's script thread"""
+
+    flight = SingleFlight()
+    calls = []
+
+    def produce():
+        calls.append(1)
+        if len(calls) == 1:
+            wait_for_followers(flight, 1)
+            raise Stopped()
+        yield "answer"
+
+    outcomes = run_callers(flight, produce, count=2)
+    assert sum(isinstance(outcome, Stopped) for outcome in outcomes) == 1
+    assert outcomes.count("answer") == 1
+    assert len(calls) == 2
+    assert flight.stats()["abandoned"] == 1
+    assert flight.in_flight() == 0
+
+def test_follower_times_out_waiting_for_a_stalled_leader():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def produce():
+        release.wait(5)
+        yield "late answer"
+
+    leader = threading.Thread(target=lambda: "".join(flight.stream("key", produce)))
+    leader.start()
+    while flight.in_flight() == 0:
+        time.sleep(0.001)
+    try:
+        with pytest.raises(TimeoutError):
+            "".join(flight.stream("key", produce, timeout=0.05))
+    finally:
+        release.set()
+        leader.join()
@@ -0,0 +1,107 @@
+"""
+Local token counting for the AI Educational Tutor application.
+
+Gemini uses a SentencePiece tokenizer that is not available offline, so text is
+pre-tokenized with a regex and each piece is costed the way SentencePiece tends
+to split it. A scale factor can be calibrated against the model's own
+count_tokens endpoint, and results are memoized because the same system prompt,
+chunks and answers are counted on every request.
+"""
+
+import math
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, List
+
+PIECE_PATTERN = re.compile(r"\n+|[^\S\n]+|[A-Za-z]+|[0-9]+|[^\x00-\x7f]|[^\w\s]", re.UNICODE)
+
+# Texts longer than this are counted without memoization to keep the cache small
+MAX_CACHED_TEXT_LENGTH = 20000
+
+_scale = 1.0
+_scale_lock = threading.Lock()
+
+def _piece_tokens(piece: str) -> int:
+    """Approximate SentencePiece tokens for one regex piece"""
+    first = piece[0]
+    if first == "\n":
+        return 1
+    if first.isspace():
+        # Single spaces are folded into the following word
+        return 0 if len(piece) == 1 else math.ceil(len(piece) / 4)
+    if first.isascii() and first.isalpha():
+        # Common short words are one token; longer words split every ~4 characters
+        return 1 if len(piece) <= 6 else math.ceil(len(piece) / 4)
+    if first.isdigit():
+        return math.ceil(len(piece) / 3)
+    # Punctuation, symbols and non-ASCII characters are roughly one token each
+    return 1
+
+def _count_raw(text: str) -> int:
+    """Uncalibrated token count"""
+    return sum(_piece_tokens(match.group()) for match in PIECE_PATTERN.finditer(text))
+
+@lru_cache(maxsize=4096)
+def _count_raw_cached(text: str) -> int:
+    """Memoized uncalibrated token count"""
+    return _count_raw(text)
+
+def count_tokens(text: str) -> int:
+    """Estimate the number of model tokens in text"""
+    if not text:
+        return 0
+    raw = _count_raw_cached(text) if len(text) <= MAX_CACHED_TEXT_LENGTH else _count_raw(text)
+    return int(math.ceil(raw * _scale))
+
+def get_scale() -> float:
+    """Current calibration factor applied to local counts"""
+    return _scale
+
+def set_scale(scale: float) -> None:
+    """Set the calibration factor applied to local counts"""
+    global _scale
+    with _scale_lock:
+        _scale = scale
+
+def compare_with_model(client, texts: List[str]) -> Dict[str, float]:
+    """Compare local and model token counts for sample texts"""
+    local_total = sum(_count_raw(text) for text in texts)
+    model_total = sum(client.count_tokens(text).total_tokens for text in texts)
+    return {
+        "local_tokens": local_total,
+        "model_tokens": model_total,
+        "ratio": (model_total / local_total) if local_total else 1.0,
+    }
+
+def calibrate(client, texts: List[str]) -> float:
+    """Fit the calibration factor so local counts match the model on sample texts"""
+    comparison = compare_with_model(client, texts)
+    if comparison["local_tokens"]:
+        set_scale(comparison["ratio"])
+    return get_scale()
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to fit a token budget, preferring to end at a sentence or line break"""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    # Leave room for the ellipsis appended below
+    raw_budget = max(0, max_tokens - 2) / _scale
+    used = 0
+    end = 0
+    for match in PIECE_PATTERN.finditer(text):
+        cost = _piece_tokens(match.group())
+        if used + cost > raw_budget:
+            break
+        used += cost
+        end = match.end()
+    cut = text[:end]
+
+    # Back off to the last sentence or line end if one is reasonably close
+    boundary = max(cut.rfind(". "), cut.rfind("\n"), cut.rfind("? "), cut.rfind("! "))
+    if boundary > len(cut) * 0.6:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + " ..."
@@ -2,7 +2,6 @@
 Utility functions for the AI Educational Tutor application.
 """
 
-import streamlit as st
 import time
 from datetime import datetime
 from typing import List, Dict, Any
@@ -20,28 +19,14 @@ def truncate_text(text: str, max_length: int = 100) -> str:
     return text[:max_length] + "..."
 
 def count_tokens_estimate(text: str) -> int:
-    """Rough estimate of tokens in text (approximately 4 characters per token)"""
-    return len(text) // 4
+    """Estimate tokens in text with the local (calibrated) token counter"""
+    from token_counter import count_tokens
+    return count_tokens(text)
 
 def export_chat_history(chat_history: List[Dict], subject: str) -> str:
     """Export chat history to JSON format"""
-    export_data = {
-        "subject": subject,
-        "export_timestamp": datetime.now().isoformat(),
-        "total_questions": len(chat_history),
-        "conversations": []
-    }
-    
-    for i, exchange in enumerate(chat_history):
-        export_data["conversations"].append({
-            "question_number": i + 1,
-            "question": exchange["question"],
-            "answer": exchange["answer"],
-            "subject": exchange["subject"],
-            "timestamp": format_timestamp(exchange["timestamp"])
-        })
-    
-    return json.dumps(export_data, indent=2)
+    from history_export import iter_json
+    return "".join(iter_json(chat_history, subject))
 
 def validate_question(question: str) -> tuple[bool, str]:
     """Validate user question input"""
@@ -58,6 +43,7 @@ def validate_question(question: str) -> tuple[bool, str]:
 
 def display_loading_animation():
     """Display a loading animation"""
+    import streamlit as st
     with st.empty():
         for i in range(3):
             st.text("Thinking" + "." * (i + 1))
@@ -77,6 +63,7 @@ def display_chat_statistics(chat_history: List[Dict]) -> None:
     """Display statistics about the chat session"""
     if not chat_history:
         return
+    import streamlit as st
     
     total_questions = len(chat_history)
     subjects_used = set(exchange.get("subject", "Unknown") for exchange in chat_history)
@@ -134,6 +121,7 @@ class SessionManager:
             
             return True
         except Exception as e:
+            import streamlit as st
             st.error(f"Failed to save session: {str(e)}")
             return False
     
@@ -149,6 +137,7 @@ class SessionManager:
             
             return session_data.get("chat_history", [])
         except Exception as e:
+            import streamlit as st
             st.error(f"Failed to load session: {str(e)}")
             return []
 
@@ -156,6 +145,29 @@ def display_subject_icon(subject: str, subjects: Dict) -> str:
     """Get the icon for a subject"""
     return safe_get_subject_info(subjects, subject, "icon", "📚")
 
+def build_custom_subject(name: str, description: str = "", context: str = "", icon: str = "📚") -> Dict[str, Any]:
+    """Subject entry for a user-defined subject, with generated example questions and study tips"""
+    return {
+        "description": description or f"Custom subject: {name}",
+        "context": context or f"General knowledge and concepts related to {name}",
+        "icon": icon,
+        "example_questions": [
+            f"What are the basics of {name}?",
+            f"Can you explain key concepts in {name}?",
+            f"What should I know about {name}?",
+            f"How can I get started with {name}?",
+            f"What are common applications of {name}?"
+        ],
+        "study_tips": [
+            "Break down complex topics into smaller parts",
+            "Practice regularly and consistently",
+            "Ask specific questions when you're stuck",
+            "Look for real-world applications",
+            "Review and summarize what you've learned"
+        ],
+        "custom": True  # Flag to identify custom subjects
+    }
+
 def format_response_with_sections(response: str) -> str:
     """Format AI response with better section headers"""
     # This could be enhanced to parse and format different sections
@@ -0,0 +1,116 @@
+"""
+Dense vector index over reference material for the AI Educational Tutor application.
+
+Chunk embeddings are stored as one contiguous float32 matrix and saved as a
+.npy file, so other sessions and worker processes memory-map it instead of
+re-embedding the same documents.
+"""
+
+import json
+import os
+import tempfile
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from cache import hash_text
+from config import RETRIEVAL_CONFIG
+from embeddings import embed_text, embed_texts
+from retrieval import chunk_text, split_reference_sources
+
+class DenseIndex:
+    """Cosine-similarity search over an (n_chunks, dim) float32 matrix"""
+
+    def __init__(self, vectors: np.ndarray, chunks: List[Tuple[str, str]]):
+        self.vectors = vectors
+        self.chunks = chunks  # (source, text) per matrix row
+        self.dim = vectors.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    @classmethod
+    def build(cls, chunks: List[Tuple[str, str]], dim: int = 768, batch_size: int = 256) -> "DenseIndex":
+        """Embed chunks in batches into a preallocated matrix"""
+        vectors = np.empty((len(chunks), dim), dtype=np.float32)
+        for start in range(0, len(chunks), batch_size):
+            batch = [text for _, text in chunks[start:start + batch_size]]
+            vectors[start:start + len(batch)] = embed_texts(batch, dim)
+        return cls(vectors, chunks)
+
+    def search(self, query: str, top_k: int = 4) -> List[Tuple[float, str, str]]:
+        """Return (score, source, chunk text) for the most similar chunks"""
+        if not self.chunks:
+            return []
+        scores = self.vectors @ embed_text(query, self.dim)
+        top_k = min(top_k, len(scores))
+        # argpartition finds the top-k in linear time; only those k get sorted
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = candidates[np.argsort(-scores[candidates])]
+        return [
+            (float(scores[i]), self.chunks[i][0], self.chunks[i][1])
+            for i in best if scores[i] > 0
+        ]
+
+    def save(self, directory: str, key: str) -> None:
+        """Write the matrix and chunk metadata atomically under the given key"""
+        os.makedirs(directory, exist_ok=True)
+        for suffix, write in (
+            (".json", lambda f: f.write(json.dumps(self.chunks, ensure_ascii=False).encode("utf-8"))),
+            (".npy", lambda f: np.save(f, np.ascontiguousarray(self.vectors))),
+        ):
+            # Write to a temporary file first so readers never see a partial index
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=suffix + ".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    write(f)
+                os.replace(tmp_path, os.path.join(directory, key + suffix))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+    @classmethod
+    def load(cls, directory: str, key: str) -> Optional["DenseIndex"]:
+        """Memory-map a saved index, or return None if it does not exist"""
+        matrix_path = os.path.join(directory, key + ".npy")
+        chunks_path = os.path.join(directory, key + ".json")
+        if not (os.path.exists(matrix_path) and os.path.exists(chunks_path)):
+            return None
+        try:
+            with open(chunks_path, "r", encoding="utf-8") as f:
+                chunks = [tuple(chunk) for chunk in json.load(f)]
+            vectors = np.load(matrix_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if vectors.shape[0] != len(chunks):
+            return None
+        return cls(vectors, chunks)
+
+def reference_chunks(reference_content: str) -> List[Tuple[str, str]]:
+    """Split reference content into (source, chunk text) pairs"""
+    chunks = []
+    for source, text in split_reference_sources(reference_content):
+        for chunk in chunk_text(text, RETRIEVAL_CONFIG["chunk_size"], RETRIEVAL_CONFIG["chunk_overlap"]):
+            chunks.append((source, chunk))
+    return chunks
+
+@lru_cache(maxsize=8)
+def get_dense_index_for_text(reference_content: str) -> DenseIndex:
+    """Load the persisted dense index for this content, building and saving it if needed"""
+    dim = RETRIEVAL_CONFIG["dense_dim"]
+    key = hash_text(f"{dim}:{RETRIEVAL_CONFIG['chunk_size']}:{RETRIEVAL_CONFIG['chunk_overlap']}:{reference_content}")
+    directory = RETRIEVAL_CONFIG.get("dense_index_dir")
+    if directory:
+        index = DenseIndex.load(directory, key)
+        if index is not None:
+            return index
+
+    index = DenseIndex.build(reference_chunks(reference_content), dim)
+    if directory:
+        try:
+            index.save(directory, key)
+        except OSError:
+            # Persistence is an optimization; the in-memory index is still usable
+            pass
+    return index